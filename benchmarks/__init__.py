@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of the plum hot paths.  Run them from the root of the repository
+with::
+
+    python -m benchmarks --output results.json
+
+and compare against a previous run with::
+
+    python -m benchmarks --baseline results.json
+
+which exits with a non-zero status if any benchmark got slower by more than
+the tolerance.  See ``python -m benchmarks --help`` for all the options.
+"""
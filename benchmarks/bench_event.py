@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+
+from benchmarks.runner import benchmark, Stopwatch
+from plum.event import EventEmitter
+
+NUM_LISTENERS = 100
+
+
+def _listener(emitter, event, body):
+    pass
+
+
+@benchmark('event.wildcard_listeners', number=1000)
+def wildcard_listeners(number):
+    emitter = EventEmitter()
+    for i in range(NUM_LISTENERS):
+        # Half of them match the event
+        emitter.start_listening(_listener, "process.{}.*".format(
+            'a' if i % 2 else i))
+
+    with Stopwatch() as sw:
+        for i in xrange(number):
+            emitter.event_occurred("process.a.finish")
+    return sw.elapsed
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import tempfile
+
+from benchmarks.runner import benchmark, Stopwatch
+from plum.persistence.pickle_persistence import PicklePersistence
+from plum.process_monitor import MONITOR
+from plum.test_utils import DummyProcessWithOutput
+
+
+class _Persistence(object):
+    """
+    Context manager giving a pickle persistence in a temporary directory.
+    """
+
+    def __enter__(self):
+        self._directory = tempfile.mkdtemp()
+        self.persistence = PicklePersistence(
+            running_directory=self._directory)
+        return self.persistence
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        MONITOR.stop_listening(self.persistence)
+        shutil.rmtree(self._directory)
+
+
+@benchmark('persistence.pickle.save', number=500)
+def save(number):
+    procs = [DummyProcessWithOutput.new() for i in xrange(number)]
+    with _Persistence() as persistence:
+        with Stopwatch() as sw:
+            for proc in procs:
+                persistence.save(proc)
+    return sw.elapsed
+
+
+@benchmark('persistence.pickle.load_all_checkpoints', number=500)
+def load_all_checkpoints(number):
+    with _Persistence() as persistence:
+        for i in xrange(number):
+            persistence.save(DummyProcessWithOutput.new())
+        with Stopwatch() as sw:
+            persistence.load_all_checkpoints()
+    return sw.elapsed
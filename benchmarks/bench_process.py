@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from benchmarks.runner import benchmark, Stopwatch
+from plum.process import Process
+from plum.test_utils import DummyProcess, DummyProcessWithOutput
+from plum.wait_ons import Checkpoint
+
+
+class ManyCheckpoints(Process):
+    """
+    A process that goes through a checkpoint (a wait followed by a resume)
+    the number of times given by its input.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super(ManyCheckpoints, cls).define(spec)
+        spec.input('num_checkpoints')
+
+    def _run(self, num_checkpoints):
+        self._remaining = num_checkpoints
+        return self.step(None)
+
+    def step(self, wait_on):
+        if self._remaining == 0:
+            return
+        self._remaining -= 1
+        return Checkpoint(), self.step
+
+
+@benchmark('process.new', number=2000)
+def new(number):
+    with Stopwatch() as sw:
+        for i in xrange(number):
+            DummyProcess.new()
+    return sw.elapsed
+
+
+@benchmark('process.new_play', number=2000)
+def new_play(number):
+    with Stopwatch() as sw:
+        for i in xrange(number):
+            DummyProcessWithOutput.new().play()
+    return sw.elapsed
+
+
+@benchmark('process.transition', number=5000)
+def transition(number):
+    # Each checkpoint is two transitions: wait and resume
+    proc = ManyCheckpoints.new({'num_checkpoints': number // 2})
+    with Stopwatch() as sw:
+        proc.play()
+    return sw.elapsed
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+from benchmarks.runner import benchmark, Stopwatch
+from plum.process_manager import ProcessManager
+from plum.test_utils import DummyProcess
+
+
+@benchmark('process_manager.launch', number=1000)
+def launch(number):
+    manager = ProcessManager(max_threads=8)
+    try:
+        with Stopwatch() as sw:
+            futures = [manager.launch(DummyProcess) for i in xrange(number)]
+            for future in futures:
+                future.result()
+    finally:
+        manager.shutdown()
+    return sw.elapsed
+
+
+@benchmark('process_manager.launch_no_block_on_wait', number=1000)
+def launch_no_block_on_wait(number):
+    manager = ProcessManager(max_threads=8, block_on_wait=False)
+    try:
+        with Stopwatch() as sw:
+            futures = [manager.launch(DummyProcess) for i in xrange(number)]
+            for future in futures:
+                future.result()
+    finally:
+        manager.shutdown()
+    return sw.elapsed
+
+
+@benchmark('process_manager.launch_many', number=1000)
+def launch_many(number):
+    manager = ProcessManager(max_threads=8, block_on_wait=False)
+    try:
+        with Stopwatch() as sw:
+            manager.launch_many(DummyProcess, [None] * number).results()
+    finally:
+        manager.shutdown()
+    return sw.elapsed
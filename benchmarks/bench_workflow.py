@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+from benchmarks.runner import benchmark, Stopwatch
+from plum.process import Process
+from plum.workflow import Workflow
+
+
+class Add(Process):
+    @classmethod
+    def define(cls, spec):
+        super(Add, cls).define(spec)
+        spec.input('a')
+        spec.input('b')
+        spec.output('value')
+
+    def _run(self, a, b):
+        self.out('value', a + b)
+
+
+class Diamond(Workflow):
+    """
+    A diamond shaped DAG: two adds feeding in to a third.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        super(Diamond, cls).define(spec)
+        spec.process(Add, 'left')
+        spec.process(Add, 'right')
+        spec.process(Add, 'bottom')
+        spec.exposed_inputs('left')
+        spec.link('left:value', 'right:a')
+        spec.link(':b', 'right:b')
+        spec.link('left:value', 'bottom:a')
+        spec.link('right:value', 'bottom:b')
+        spec.exposed_outputs('bottom')
+
+
+@benchmark('workflow.diamond', number=100)
+def diamond(number):
+    with Stopwatch() as sw:
+        for i in xrange(number):
+            Diamond.run(a=1, b=2)
+    return sw.elapsed
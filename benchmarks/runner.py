@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import collections
+import importlib
+import json
+import platform
+import sys
+import time
+
+# The modules containing the benchmarks, they register themselves on import
+BENCHMARK_MODULES = [
+    'benchmarks.bench_process',
+    'benchmarks.bench_process_manager',
+    'benchmarks.bench_persistence',
+    'benchmarks.bench_event',
+    'benchmarks.bench_workflow',
+]
+
+_BENCHMARKS = collections.OrderedDict()
+
+
+class Skip(Exception):
+    """
+    Raised by a benchmark that cannot be run, the message gives the reason.
+    """
+    pass
+
+
+class Benchmark(object):
+    def __init__(self, name, fn, number):
+        """
+        :param name: The name of the benchmark
+        :param fn: The benchmark function.  It is called with the number of
+            operations to perform and should return the time in seconds that
+            they took, this way any setup and tear down can be excluded.
+        :param number: The default number of operations per run
+        """
+        self.name = name
+        self.fn = fn
+        self.number = number
+
+    def run(self, repeat=3, scale=1.0):
+        """
+        Run the benchmark.
+
+        :param repeat: The number of times to repeat the measurement
+        :param scale: Scale factor for the number of operations per run
+        :return: A dictionary of the results
+        :rtype: dict
+        """
+        number = max(1, int(self.number * scale))
+        try:
+            times = [self.fn(number) for i in range(repeat)]
+        except Skip as e:
+            return {'skipped': str(e)}
+
+        best = min(times)
+        return {
+            'number': number,
+            'times': times,
+            'best': best,
+            'per_op': best / number,
+            'ops_per_sec': number / best if best > 0 else None
+        }
+
+
+def benchmark(name, number=1000):
+    """
+    Decorator to register a benchmark function, see :class:`Benchmark`.
+
+    :param name: The name of the benchmark
+    :param number: The default number of operations per run
+    """
+
+    def wrapper(fn):
+        assert name not in _BENCHMARKS, \
+            "Benchmark '{}' already registered".format(name)
+        _BENCHMARKS[name] = Benchmark(name, fn, number)
+        return fn
+
+    return wrapper
+
+
+class Stopwatch(object):
+    """
+    Context manager to time a block of code e.g.::
+
+        with Stopwatch() as sw:
+            ...
+        return sw.elapsed
+    """
+
+    def __init__(self):
+        self._start = None
+        self.elapsed = None
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.elapsed = time.time() - self._start
+
+
+def get_benchmarks():
+    """
+    Get all the registered benchmarks.
+
+    :return: An ordered dictionary of {name: :class:`Benchmark`}
+    """
+    for module in BENCHMARK_MODULES:
+        importlib.import_module(module)
+    return _BENCHMARKS
+
+
+def run_benchmarks(names=None, repeat=3, scale=1.0, log=None):
+    """
+    Run benchmarks and gather the results.
+
+    :param names: The names of the benchmarks to run, all if None
+    :param repeat: The number of times to repeat each measurement
+    :param scale: Scale factor for the number of operations per run
+    :param log: (optional) Function called with a message as each benchmark
+        completes
+    :return: A dictionary with the 'meta' information about the run and the
+        'results' of each benchmark
+    :rtype: dict
+    """
+    benchmarks = get_benchmarks()
+    if names is None:
+        names = benchmarks.keys()
+
+    results = collections.OrderedDict()
+    for name in names:
+        try:
+            bench = benchmarks[name]
+        except KeyError:
+            raise ValueError("Unknown benchmark '{}'".format(name))
+        results[name] = bench.run(repeat, scale)
+        if log is not None:
+            log(format_result(name, results[name]))
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'time': time.time(),
+            'repeat': repeat,
+            'scale': scale
+        },
+        'results': results
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare results against a baseline.
+
+    :param results: The results, as returned by :func:`run_benchmarks`
+    :param baseline: The baseline results in the same format
+    :param tolerance: The fraction by which the time per operation can grow
+        before it is considered a regression
+    :return: A list of (name, baseline per op, current per op, ratio) tuples
+        for each of the benchmarks that regressed
+    :rtype: list
+    """
+    regressions = []
+    for name, result in results['results'].iteritems():
+        base = baseline['results'].get(name, None)
+        if base is None or 'per_op' not in base or 'per_op' not in result:
+            continue
+
+        ratio = result['per_op'] / base['per_op'] if base['per_op'] else None
+        if ratio is not None and ratio > 1.0 + tolerance:
+            regressions.append(
+                (name, base['per_op'], result['per_op'], ratio))
+
+    return regressions
+
+
+def format_result(name, result):
+    if 'skipped' in result:
+        return "{:<40} skipped: {}".format(name, result['skipped'])
+    return "{:<40} {:>12.2f} us/op {:>12.1f} ops/s".format(
+        name, result['per_op'] * 1e6, result['ops_per_sec'] or 0.)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the plum benchmarks")
+    parser.add_argument('benchmarks', nargs='*',
+                        help="The benchmarks to run, all if none are given")
+    parser.add_argument('--list', action='store_true',
+                        help="List the benchmarks and exit")
+    parser.add_argument('--output', help="Write the results to this file")
+    parser.add_argument('--baseline',
+                        help="Compare the results against this results file")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Fractional slowdown allowed before a benchmark "
+                             "is considered to have regressed")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Number of times to repeat each measurement")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Scale the number of operations per run")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in get_benchmarks():
+            print(name)
+        return 0
+
+    def log(msg):
+        print(msg)
+        sys.stdout.flush()
+
+    results = run_benchmarks(
+        args.benchmarks or None, args.repeat, args.scale, log)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, base, current, ratio in regressions:
+            log("REGRESSION {}: {:.2f} us/op -> {:.2f} us/op ({:.0%})".format(
+                name, base * 1e6, current * 1e6, ratio - 1))
+        if regressions:
+            return 1
+
+    return 0
@@ -1,35 +1,6 @@
-import time
-import threading
 from plum.process import Process
 from plum.util import override
-from plum.wait import WaitOn
-
-
-class WaitUntil(WaitOn):
-    END_TIME = 'end_time'
-
-    @override
-    def init(self, wait_for):
-        self._end_time = time.time() + wait_for
-        self._timer = threading.Timer(wait_for, self._timeout)
-        self._timer.start()
-
-    @override
-    def load_instance_state(self, bundle):
-        self._end_time = bundle[self.END_TIME]
-        self._timer = threading.Timer(
-            time.time() - self._end_time, self._timeout)
-        self._timer.start()
-
-    @override
-    def save_instance_state(self, out_state):
-        super(WaitUntil, self).save_instance_state(out_state)
-        out_state[self.END_TIME] = self._end_time
-
-    def _timeout(self):
-        self._timer.join()
-        self._timer = None
-        self.done(True)
+from plum.wait_ons import Sleep
 
 
 class Add(Process):
@@ -48,7 +19,7 @@ class Add(Process):
     def _run(self, a, b):
         self._a = a
         self._b = b
-        return WaitUntil(2, self._finish.__name__)
+        return Sleep(2), self._finish
 
     def _finish(self, wait_on):
         self.out('value', self._a + self._b)
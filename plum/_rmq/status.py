@@ -4,6 +4,8 @@ import uuid
 import pika
 
 from plum._rmq import Defaults, Subscriber
+from plum.process import ProcessState
+from plum.process_monitor import MONITOR
 
 
 def status_decode(msg):
@@ -126,9 +128,19 @@ class StatusProvider(Subscriber):
     def _on_request(self, ch, method, props, body):
         # d = self._decode(body)
 
+        # Use the monitor's state index rather than asking every process for
+        # its state, only the processes that are there get looked at
         response = {}
-        for p in self._manager.get_processes():
-            response[p.pid] = self._get_status(p)
+        for state in ProcessState:
+            if not MONITOR.get_num_processes(state=state):
+                continue
+            for pid in MONITOR.find_pids(state=state):
+                if self._manager is not None and \
+                        not self._manager.has_process(pid):
+                    continue
+                status = self._get_status(pid, state)
+                if status is not None:
+                    response[pid] = status
 
         if response:
             ch.basic_publish(
@@ -139,8 +151,13 @@ class StatusProvider(Subscriber):
         # Always acknowledge
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
-    def _get_status(self, process):
+    def _get_status(self, pid, state):
+        try:
+            process = MONITOR.get_process(pid)
+        except ValueError:
+            # It has gone in the mean time
+            return None
         return {
-            'state': process.state,
+            'state': state,
             'playing': process.is_playing()
         }
@@ -1,9 +1,10 @@
 from abc import ABCMeta, abstractmethod
 import re
 import threading
+import concurrent.futures
 from plum.process_monitor import ProcessMonitorListener, MONITOR
 from plum.util import override, protected, ListenContext
-from plum.wait import WaitOn, Unsavable
+from plum.wait import WaitOn, Unsavable, get_timer_wheel
 
 
 class EventEmitter(object):
@@ -297,18 +298,52 @@ class ProcessMonitorEmitter(EventEmitter, WithProcessEvents, ProcessMonitorListe
         self.process_event_occurred(process.pid, "failed")
 
 
+_POLL_THREADS = 4
+_POLL_EXECUTOR = None
+_POLL_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_poll_executor():
+    global _POLL_EXECUTOR
+    if _POLL_EXECUTOR is None:
+        with _POLL_EXECUTOR_LOCK:
+            if _POLL_EXECUTOR is None:
+                _POLL_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+                    _POLL_THREADS)
+    return _POLL_EXECUTOR
+
+
 class PollingEmitter(EventEmitter):
+    """
+    An emitter that calls :func:`poll` every poll interval while anyone is
+    listening.  The polls are timed by a timer wheel but run on an executor
+    so a slow poll doesn't hold up the wheel's other timers.  A poll is
+    never called while the previous one is still running.
+    """
     __metaclass__ = ABCMeta
 
-    def __init__(self, poll_interval):
+    def __init__(self, poll_interval, timer_wheel=None, executor=None):
         """
         :param poll_interval: A poll interval specified as a float representing
             the number of seconds between polls
+        :param timer_wheel: The (optional) timer wheel used to schedule the
+            polls, defaults to the shared one
+        :type timer_wheel: :class:`plum.wait.TimerWheel`
+        :param executor: The (optional) executor to poll on, defaults to a
+            thread pool shared by all polling emitters
+        :type executor: :class:`concurrent.futures.Executor`
         """
         super(PollingEmitter, self).__init__()
         self._poll_interval = poll_interval
+        self._timer_wheel = timer_wheel
+        self._executor = executor
         self._polling = False
         self._timer = None
+        # Goes up each time polling is started so that polls left over from
+        # before it was stopped don't carry on
+        self._generation = 0
+        # Held while polling so that polls don't overlap
+        self._poll_lock = threading.Lock()
         # Any internal reads/writes of state should use this lock
         # need to use an rlock 'cause poll may call, e.g., stop_listening()
         # which will reacquire the lock
@@ -346,10 +381,15 @@ class PollingEmitter(EventEmitter):
         """
         pass
 
+    def _get_timer_wheel(self):
+        if self._timer_wheel is None:
+            return get_timer_wheel()
+        return self._timer_wheel
+
     def _start_polling(self):
         self._polling = True
-        self._timer = threading.Timer(0, self._poll)
-        self._timer.start()
+        self._generation += 1
+        self._schedule_poll(0)
 
     def _stop_polling(self):
         if self._polling:
@@ -357,15 +397,35 @@ class PollingEmitter(EventEmitter):
             self._timer.cancel()
             self._timer = None
 
-    def _poll(self):
-        with self._state_lock:
-            if self._polling:
-                # The reason it's done this way is that the poll() call may take some
-                # time during which a user may have called stop() so we check again
-                self.poll()
-                if self._polling:
-                    self._timer = threading.Timer(self._poll_interval, self._poll)
-                    self._timer.start()
+    def _schedule_poll(self, delay):
+        """
+        The state lock must be held by the caller.
+        """
+        self._timer = self._get_timer_wheel().call_later(
+            delay, self._poll_due, self._generation)
+
+    def _poll_due(self, generation):
+        # Called on the wheel's thread, don't hold it up
+        executor = self._executor
+        if executor is None:
+            executor = _get_poll_executor()
+        executor.submit(self._poll, generation)
+
+    def _is_current(self, generation):
+        return self._polling and generation == self._generation
+
+    def _poll(self, generation):
+        with self._poll_lock:
+            with self._state_lock:
+                if not self._is_current(generation):
+                    return
+            # Not holding the state lock while calling out to the subclass
+            self.poll()
+            # The poll() call may take some time during which a user may have
+            # called stop() so we check again
+            with self._state_lock:
+                if self._is_current(generation):
+                    self._schedule_poll(self._poll_interval)
 
 
 class WaitOnEvent(WaitOn, Unsavable):
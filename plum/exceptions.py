@@ -9,4 +9,11 @@ class TimeoutError(Exception):
 
 
 class Unsupported(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class QueueFull(Exception):
+    """
+    Raised when work cannot be accepted because the run queue is full.
+    """
+    pass
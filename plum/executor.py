@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import sys
+import threading
+import time
+
+import concurrent.futures
+
+from plum.exceptions import QueueFull
+from plum.process_spec import DEFAULT_PRIORITY
+from plum.util import override
+
+
+class _WorkItem(object):
+    def __init__(self, future, fn, args, kwargs):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except BaseException:
+            e, tb = sys.exc_info()[1:]
+            self.future.set_exception_info(e, tb)
+        else:
+            self.future.set_result(result)
+
+
+class PriorityExecutor(concurrent.futures.Executor):
+    """
+    A thread pool executor that runs the work with the highest priority first
+    rather than in the order it was submitted.
+
+    To make sure that low priority work still makes progress the priority
+    ages: work is ordered by the time it was submitted minus its priority
+    times the `aging_interval`.  So something submitted with a priority one
+    higher than another piece of work will go ahead of it unless that work has
+    already been waiting for longer than `aging_interval` seconds.
+
+    The number of pieces of work waiting to be run can be bounded by giving a
+    `max_queue_size`.  Once the queue is full submitting blocks until there is
+    space, or if asked not to block (see :func:`schedule`) a
+    :class:`plum.exceptions.QueueFull` is raised.
+    """
+
+    # Used to give the threads of each executor a unique name
+    _counter = itertools.count()
+
+    def __init__(self, max_workers=1024, aging_interval=1.0, clock=time.time,
+                 max_queue_size=None):
+        """
+        :param max_workers: The maximum number of worker threads
+        :type max_workers: int
+        :param aging_interval: The time (in seconds) that one unit of priority
+            is worth, zero means that the work is run in the order it was
+            submitted
+        :type aging_interval: float
+        :param clock: The function used to get the current time
+        :param max_queue_size: The (optional) maximum number of pieces of work
+            waiting to be run, unbounded if None
+        :type max_queue_size: int
+        """
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+        if aging_interval < 0:
+            raise ValueError("aging_interval cannot be negative")
+        if max_queue_size is not None and max_queue_size <= 0:
+            raise ValueError("max_queue_size must be greater than 0")
+
+        self._max_workers = max_workers
+        self._aging_interval = aging_interval
+        self._clock = clock
+        self._max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        # Heap of (key, sequence number, work item)
+        self._queue = []
+        self._sequence = itertools.count()
+        self._threads = set()
+        self._num_idle = 0
+        self._shutdown = False
+        self._thread_name_prefix = "PriorityExecutor-{}".format(
+            next(self._counter))
+
+    @property
+    def aging_interval(self):
+        return self._aging_interval
+
+    @property
+    def max_queue_size(self):
+        return self._max_queue_size
+
+    def get_queue_depth(self):
+        """
+        :return: The number of pieces of work waiting to be run
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._queue)
+
+    @override
+    def submit(self, fn, *args, **kwargs):
+        return self.schedule(fn, args, kwargs)
+
+    def submit_with_priority(self, priority, fn, *args, **kwargs):
+        """
+        Submit a callable to be run with the given priority.  If the queue is
+        full this blocks until there is space.
+
+        :param priority: The priority, higher values are run first
+        :type priority: int
+        :param fn: The callable
+        :param args: The positional arguments to call it with
+        :param kwargs: The keyword arguments to call it with
+        :return: A future representing the call
+        :rtype: :class:`concurrent.futures.Future`
+        """
+        return self.schedule(fn, args, kwargs, priority)
+
+    def schedule(self, fn, args=(), kwargs=None, priority=DEFAULT_PRIORITY,
+                 block=True, timeout=None, bounded=True):
+        """
+        Submit a callable to be run, with full control over what happens if
+        the queue is full.
+
+        :param fn: The callable
+        :param args: The positional arguments to call it with
+        :type args: tuple
+        :param kwargs: The keyword arguments to call it with
+        :type kwargs: dict
+        :param priority: The priority, higher values are run first
+        :type priority: int
+        :param block: If the queue is full wait for space, otherwise raise
+        :param timeout: The (optional) maximum time to wait for space
+        :param bounded: If False the work is queued regardless of the queue
+            size.  This is meant for work that has already been admitted
+            once, e.g. a process being put back on the queue.
+        :return: A future representing the call
+        :rtype: :class:`concurrent.futures.Future`
+        :raises QueueFull: If the queue is full and the work could not be
+            queued within the timeout (or straight away if not blocking)
+        """
+        future = concurrent.futures.Future()
+        item = _WorkItem(future, fn, args, {} if kwargs is None else kwargs)
+
+        with self._lock:
+            if bounded:
+                self._wait_for_space(block, timeout)
+            if self._shutdown:
+                raise RuntimeError(
+                    "Cannot schedule new futures after shutdown")
+            key = self._clock() - priority * self._aging_interval
+            heapq.heappush(self._queue, (key, next(self._sequence), item))
+            if len(self._queue) > self._num_idle and \
+                    len(self._threads) < self._max_workers:
+                self._start_thread()
+            self._not_empty.notify()
+
+        return future
+
+    @override
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._shutdown = True
+            self._not_empty.notify_all()
+            # Anyone waiting to submit should find out that they can't
+            self._not_full.notify_all()
+            threads = list(self._threads)
+
+        if wait:
+            for thread in threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
+    def _wait_for_space(self, block, timeout):
+        """
+        Wait until there is space in the queue.  The lock should be held by
+        the caller.
+        """
+        if self._max_queue_size is None:
+            return
+
+        if timeout is None:
+            while self._is_full():
+                if not block:
+                    raise QueueFull()
+                self._not_full.wait()
+        else:
+            deadline = time.time() + timeout
+            while self._is_full():
+                remaining = deadline - time.time()
+                if not block or remaining <= 0:
+                    raise QueueFull()
+                self._not_full.wait(remaining)
+
+    def _is_full(self):
+        return not self._shutdown and \
+               len(self._queue) >= self._max_queue_size
+
+    def _start_thread(self):
+        """
+        Start a new worker thread.  The lock should be held by the caller.
+        """
+        thread = threading.Thread(
+            name="{}_{}".format(self._thread_name_prefix, len(self._threads)),
+            target=self._worker)
+        thread.daemon = True
+        self._threads.add(thread)
+        thread.start()
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while not self._queue and not self._shutdown:
+                    self._num_idle += 1
+                    self._not_empty.wait()
+                    self._num_idle -= 1
+                if not self._queue:
+                    # Shut down and there's nothing left to do
+                    return
+                item = heapq.heappop(self._queue)[2]
+                self._not_full.notify()
+
+            item.run()
+            del item
@@ -1,10 +1,33 @@
+
+import threading
 from plum.knowledge_provider import KnowledgeProvider, NotKnown
-from plum.util import override
+from plum.util import fingerprint, override
 
 
 class KnowledgeBase(KnowledgeProvider):
-    def __init__(self):
+    """
+    Combines a number of knowledge providers.  Answers are indexed as they are
+    found so that repeated queries don't have to go through all the providers
+    again: the provider that knows about each pid is remembered, as are the
+    pids of each class (and their input fingerprints) and the queries that no
+    provider could answer.
+
+    The index assumes that what the providers know doesn't change.  If it
+    does then the relevant entries should be invalidated using
+    :func:`invalidate_pid`, :func:`invalidate_classname` or
+    :func:`invalidate_all`.
+    """
+
+    def __init__(self, max_unknown=100000):
+        """
+        :param max_unknown: The maximum number of queries without an answer
+            to remember, after this they are all forgotten
+        :type max_unknown: int
+        """
         self._providers = []
+        self._max_unknown = max_unknown
+        self._lock = threading.Lock()
+        self._reset_index()
 
     def add_provider(self, provider):
         """
@@ -16,6 +39,8 @@ class KnowledgeBase(KnowledgeProvider):
         """
         assert provider is not self
         self._providers.append(provider)
+        # The new provider may know the answer to questions we couldn't answer
+        self.invalidate_all()
 
     def remove_provider(self, provider):
         """
@@ -24,62 +49,173 @@ class KnowledgeBase(KnowledgeProvider):
         :type param: :class:`KnowledgeProvider`
         """
         self._providers.remove(provider)
+        self.invalidate_all()
+
+    def invalidate_pid(self, pid):
+        """
+        Forget everything that has been indexed about a pid.  Call this if
+        what the providers know about the process has changed.
+
+        :param pid: The process id
+        """
+        with self._lock:
+            self._pid_providers.pop(pid, None)
+            self._unknown = set(
+                key for key in self._unknown if key[1] != pid)
+            # The process may belong to a class we have indexed
+            self._classname_pids.clear()
+            self._input_pids.clear()
+
+    def invalidate_classname(self, classname):
+        """
+        Forget everything that has been indexed about a process class.  Call
+        this if the providers may know about new processes of this class.
+
+        :param classname: The fully qualified classname of the process
+        """
+        with self._lock:
+            self._classname_pids.pop(classname, None)
+            self._input_pids.pop(classname, None)
+            self._unknown.discard((self._CLASSNAME, classname))
+
+    def invalidate_all(self):
+        """
+        Forget everything that has been indexed.
+        """
+        with self._lock:
+            self._reset_index()
 
     @override
     def get_input(self, pid, port_name):
-        for p in self._providers:
-            try:
-                return p.get_input(pid, port_name)
-            except ValueError:
-                pass
-        raise ValueError()
+        return self._query_pid('get_input', pid, port_name)
 
     @override
     def get_inputs(self, pid):
-        for p in self._providers:
-            try:
-                return p.get_inputs(pid)
-            except ValueError:
-                pass
-        raise ValueError()
+        return self._query_pid('get_inputs', pid)
 
     @override
     def get_output(self, pid, port_name):
-        for p in self._providers:
-            try:
-                return p.get_output(pid, port_name)
-            except ValueError:
-                pass
-        raise ValueError()
+        return self._query_pid('get_output', pid, port_name)
 
     @override
     def get_outputs(self, pid):
-        for p in self._providers:
-            try:
-                return p.get_outputs(pid)
-            except ValueError:
-                pass
-        raise ValueError()
+        return self._query_pid('get_outputs', pid)
 
     @override
     def has_finished(self, pid):
-        for p in self._providers:
+        return self._query_pid('has_finished', pid)
+
+    @override
+    def get_pids_from_classname(self, classname):
+        pids = self._get_classname_index(classname)[0]
+        if not pids:
+            raise ValueError()
+        return list(pids)
+
+    @override
+    def get_pids_from_inputs(self, classname, inputs):
+        key = fingerprint(inputs)
+        pids = self._get_classname_index(classname)[1].get(key, None)
+        if not pids:
+            raise ValueError()
+        return list(pids)
+
+    # Used in the unknown set for classnames no provider knows about
+    _CLASSNAME = 'classname'
+
+    def _reset_index(self):
+        # {pid: provider that knows about it}
+        self._pid_providers = {}
+        # {classname: [pids]}
+        self._classname_pids = {}
+        # {classname: {inputs fingerprint: [pids]}}
+        self._input_pids = {}
+        # Set of (query, pid|classname, args...) that no provider could answer
+        self._unknown = set()
+
+    def _query_pid(self, query, pid, *args):
+        """
+        Ask the provider that is known to know about a pid first, and only if
+        that fails ask the rest of them.
+        """
+        # The arguments are part of the key, knowing nothing about one port
+        # says nothing about the others
+        unknown_key = (query, pid) + args
+        with self._lock:
+            if unknown_key in self._unknown:
+                raise ValueError()
+            known_provider = self._pid_providers.get(pid, None)
+
+        if known_provider is not None:
             try:
-                return p.has_finished(pid)
+                return getattr(known_provider, query)(pid, *args)
             except ValueError:
                 pass
+
+        for p in list(self._providers):
+            if p is known_provider:
+                continue
+            try:
+                result = getattr(p, query)(pid, *args)
+            except ValueError:
+                continue
+            with self._lock:
+                self._pid_providers[pid] = p
+            return result
+
+        self._add_unknown(unknown_key)
         raise ValueError()
 
-    @override
-    def get_pids_from_classname(self, classname):
+    def _get_classname_index(self, classname):
+        """
+        Get the pids of a class and the index of them by input fingerprint,
+        building them if necessary.
+
+        :return: A tuple of the pids and the {fingerprint: [pids]} index
+        """
+        with self._lock:
+            if (self._CLASSNAME, classname) in self._unknown:
+                return [], {}
+            try:
+                return self._classname_pids[classname], \
+                       self._input_pids[classname]
+            except KeyError:
+                pass
+
         all_pids = []
-        for p in self._providers:
+        pid_providers = {}
+        for p in list(self._providers):
             try:
-                all_pids.extend(p.get_pids_from_classname(classname))
+                pids = p.get_pids_from_classname(classname)
             except ValueError:
-                pass
+                continue
+            all_pids.extend(pids)
+            for pid in pids:
+                pid_providers.setdefault(pid, p)
+
+        with self._lock:
+            for pid, p in pid_providers.iteritems():
+                self._pid_providers.setdefault(pid, p)
+
+        by_inputs = {}
+        for pid in all_pids:
+            try:
+                key = fingerprint(self.get_inputs(pid))
+            except ValueError:
+                continue
+            by_inputs.setdefault(key, []).append(pid)
 
-        if all_pids:
-            return all_pids
+        if not all_pids:
+            self._add_unknown((self._CLASSNAME, classname))
         else:
-            raise ValueError()
+            with self._lock:
+                self._classname_pids[classname] = all_pids
+                self._input_pids[classname] = by_inputs
+
+        return all_pids, by_inputs
+
+    def _add_unknown(self, key):
+        with self._lock:
+            if len(self._unknown) >= self._max_unknown:
+                self._unknown.clear()
+            self._unknown.add(key)
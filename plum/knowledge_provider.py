@@ -81,3 +81,49 @@ class KnowledgeProvider(object):
         """
         raise ValueError("Unknown classname")
 
+    def get_pids_from_inputs(self, classname, inputs):
+        """
+        Get the process ids of all the processes of a specific class that had
+        the given inputs.
+
+        :param classname: The fully qualified classname of the process.
+        :param inputs: The inputs dictionary.
+        :return: A list of pids.
+        :raises: ValueError
+        """
+        pids = []
+        for pid in self.get_pids_from_classname(classname):
+            try:
+                if self.get_inputs(pid) == inputs:
+                    pids.append(pid)
+            except ValueError:
+                pass
+
+        if not pids:
+            raise ValueError("No process with those inputs")
+        return pids
+
+
+_GLOBAL_PROVIDER = None
+
+
+def get_global_provider():
+    """
+    Get the knowledge provider used by processes to fast-forward, None if
+    there isn't one.
+
+    :rtype: :class:`KnowledgeProvider`
+    """
+    return _GLOBAL_PROVIDER
+
+
+def set_global_provider(provider):
+    """
+    Set the knowledge provider used by processes to fast-forward.
+
+    :param provider: The knowledge provider, can be None
+    :type provider: :class:`KnowledgeProvider`
+    """
+    global _GLOBAL_PROVIDER
+    _GLOBAL_PROVIDER = provider
+
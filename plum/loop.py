@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import threading
+import traceback
+
+from plum.process_listener import ProcessListener
+from plum.process_manager import Future, ProcessStepper, StopReport
+from plum.util import override
+from plum._base import LOGGER
+
+
+class EventLoop(object):
+    """
+    A single threaded event loop.  Callbacks can be scheduled from any thread
+    using :func:`call_soon` and they will be run, one at a time and in the order
+    they were scheduled, by the thread that calls :func:`run_forever`.
+    """
+
+    def __init__(self):
+        self._callbacks = collections.deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def call_soon(self, fn, *args, **kwargs):
+        """
+        Schedule a callback to be called by the loop.  This can be called from
+        any thread.
+
+        :param fn: The callback
+        :param args: The positional arguments to call it with
+        :param kwargs: The keyword arguments to call it with
+        """
+        with self._cond:
+            self._callbacks.append((fn, args, kwargs))
+            self._cond.notify()
+
+    def is_running(self):
+        """
+        Is there a thread currently running the loop.
+
+        :return: True if running, False otherwise
+        :rtype: bool
+        """
+        return self._thread is not None
+
+    def in_loop_thread(self):
+        """
+        Is the calling thread the one that is running the loop.
+
+        :return: True if it is, False otherwise
+        :rtype: bool
+        """
+        return self._thread is threading.current_thread()
+
+    def run_forever(self):
+        """
+        Run callbacks as they are scheduled until :func:`stop` is called.
+        """
+        assert not self.is_running(), "The loop is already running"
+
+        self._thread = threading.current_thread()
+        try:
+            while True:
+                with self._cond:
+                    while not self._callbacks and not self._stopping:
+                        self._cond.wait()
+                    if self._stopping:
+                        self._stopping = False
+                        return
+                    fn, args, kwargs = self._callbacks.popleft()
+
+                try:
+                    fn(*args, **kwargs)
+                except BaseException:
+                    LOGGER.error(
+                        "Exception raised by event loop callback '{}':\n"
+                        "{}".format(fn, traceback.format_exc()))
+        finally:
+            self._thread = None
+
+    def run_until_complete(self, future):
+        """
+        Run the loop until the future is done and then return its result.
+
+        :param future: The future to wait for, must support add_done_callback()
+        :return: The result of the future
+        """
+        future.add_done_callback(lambda f: self.call_soon(self.stop))
+        self.run_forever()
+        return future.result(0)
+
+    def stop(self):
+        """
+        Stop the loop.  Any callbacks still pending will be run the next time
+        the loop is run.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+
+class _LoopProcInfo(ProcessStepper):
+    def __init__(self, proc, submit):
+        super(_LoopProcInfo, self).__init__(proc, submit)
+        self.terminated = threading.Event()
+
+
+class LoopManager(ProcessListener):
+    """
+    A process manager that runs all of its processes on a single
+    :class:`EventLoop`.  Processes are played up to the point where they start
+    waiting on something and are then put to one side until the wait on is
+    done, so a waiting process costs nothing more than its own memory.
+
+    The interface mirrors that of :class:`plum.process_manager.ProcessManager`
+    (whose :class:`plum.process_manager.ProcessStepper` scheduling it shares)
+    and can be used from any thread, the steps are always taken by the loop
+    thread.  Nothing will happen until someone runs the loop e.g.::
+
+        manager = LoopManager()
+        future = manager.launch(MyProcess)
+        manager.loop.run_until_complete(future)
+
+    .. warning:: The blocking calls (:func:`wait_for`, :func:`Future.result`,
+        etc) should not be made from the loop thread as it is the one that
+        has to do the work.
+    """
+
+    def __init__(self, loop=None):
+        """
+        :param loop: The event loop to use, if None a new one is created
+        :type loop: :class:`EventLoop`
+        """
+        self._loop = loop if loop is not None else EventLoop()
+        self._processes = {}
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def launch(self, proc_class, inputs=None, pid=None, logger=None):
+        """
+        Create a process and start it.
+
+        :param proc_class: The process class
+        :param inputs: The inputs to the process
+        :param pid: The (optional) pid for the process
+        :param logger: The (optional) logger for the process to use
+        :return: A :class:`Future` representing the execution of the process
+        :rtype: :class:`Future`
+        """
+        return self.start(proc_class.new(inputs, pid, logger))
+
+    def start(self, proc):
+        """
+        Start an existing process.
+
+        :param proc: The process to start
+        :type proc: :class:`plum.process.Process`
+        :return: A :class:`Future` representing the execution of the process
+        :rtype: :class:`Future`
+        """
+        info = _LoopProcInfo(proc, self._submit_step)
+        self._processes[proc.pid] = info
+        proc.add_process_listener(self)
+        info.request_play()
+        return Future(self, proc)
+
+    def get_processes(self):
+        return [info.proc for info in self._processes.values()]
+
+    def get_num_processes(self):
+        return len(self._processes)
+
+    def play(self, pid):
+        self._get_info(pid).request_play()
+
+    def play_all(self):
+        for info in self._processes.values():
+            info.request_play()
+
+    def pause(self, pid, timeout=None):
+        return bool(self._stop_playing(
+            [self._get_info(pid)], lambda proc: proc.pause(), timeout))
+
+    def pause_all(self, timeout=None):
+        """
+        Pause all processes.
+
+        :return: A report that is True if they were all paused
+        :rtype: :class:`plum.process_manager.StopReport`
+        """
+        return self._stop_playing(
+            self._processes.values(), lambda proc: proc.pause(), timeout)
+
+    def abort(self, pid, msg=None, timeout=None):
+        return bool(self._stop_playing(
+            [self._get_info(pid)], lambda proc: proc.abort(msg), timeout))
+
+    def abort_all(self, msg=None, timeout=None):
+        return self._stop_playing(
+            self._processes.values(), lambda proc: proc.abort(msg), timeout)
+
+    def wait_for(self, pid, timeout=None):
+        """
+        Wait for a process to terminate.
+
+        :param pid: The process id
+        :param timeout: The (optional) timeout
+        :return: True if it terminated, False if the timeout was reached
+        """
+        return self._get_info(pid).terminated.wait(timeout)
+
+    def shutdown(self):
+        self.pause_all()
+        self._processes = {}
+
+    # region From ProcessListener
+    @override
+    def on_process_stop(self, process):
+        super(LoopManager, self).on_process_stop(process)
+        self._delete_process(process)
+
+    @override
+    def on_process_fail(self, process):
+        super(LoopManager, self).on_process_fail(process)
+        self._delete_process(process)
+
+    # endregion
+
+    def _submit_step(self, info):
+        self._loop.call_soon(info.step)
+
+    def _stop_playing(self, infos, request, timeout):
+        """
+        Ask processes to stop playing and wait for them to do so, with a
+        single deadline for all of them.  The loop thread can't wait for
+        itself (and if the loop isn't running nothing can be waited for) so
+        then the processes are left to act on the request at their next
+        step, which is as good as done.
+        """
+        infos = [info for info in infos if info.request_stop(request)]
+        if self._loop.in_loop_thread() or not self._loop.is_running():
+            return StopReport(len(infos), [])
+        return StopReport(
+            len(infos), ProcessStepper.wait_stopped(infos, timeout))
+
+    def _get_info(self, pid):
+        try:
+            return self._processes[pid]
+        except KeyError:
+            raise ValueError("Unknown pid")
+
+    def _delete_process(self, proc):
+        proc.remove_process_listener(self)
+        info = self._processes.pop(proc.pid, None)
+        if info is not None:
+            info.terminated.set()
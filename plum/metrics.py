@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import threading
+import time
+import weakref
+
+from plum.process_listener import ProcessListener
+from plum.process_monitor import ProcessMonitorListener
+from plum.util import fullname, override
+
+
+class Histogram(object):
+    """
+    A histogram of durations (in seconds) with exponentially growing buckets,
+    the first bucket holds everything up to a microsecond and each one after
+    that is double the size of the previous one.
+    """
+    _NUM_BUCKETS = 40
+    BUCKET_BOUNDS = tuple(1e-6 * 2 ** i for i in range(_NUM_BUCKETS))
+
+    def __init__(self):
+        self._counts = [0] * (self._NUM_BUCKETS + 1)
+        self._count = 0
+        self._total = 0.0
+        self._min = None
+        self._max = None
+
+    @property
+    def count(self):
+        return self._count
+
+    def add(self, value):
+        """
+        Add a value to the histogram.
+
+        :param value: The duration
+        :type value: float
+        """
+        self._counts[bisect.bisect_left(self.BUCKET_BOUNDS, value)] += 1
+        self._count += 1
+        self._total += value
+        if self._min is None or value < self._min:
+            self._min = value
+        if self._max is None or value > self._max:
+            self._max = value
+
+    def percentile(self, percent):
+        """
+        Get an estimate of a percentile.  This is the upper bound of the
+        bucket that the percentile falls into (or the maximum value if it is
+        smaller).
+
+        :param percent: The percentile, between 0 and 100
+        :return: The estimate or None if the histogram is empty
+        """
+        if self._count == 0:
+            return None
+
+        target = percent / 100.0 * self._count
+        seen = 0
+        for i, count in enumerate(self._counts):
+            seen += count
+            if count and seen >= target:
+                if i < self._NUM_BUCKETS:
+                    return min(self.BUCKET_BOUNDS[i], self._max)
+                break
+        return self._max
+
+    def snapshot(self):
+        """
+        Get a summary of the histogram.
+
+        :return: A dictionary with the count, total, min, max, mean and
+            50th, 90th and 99th percentiles along with the non-empty buckets
+            as a list of (upper bound, count) tuples where the last upper
+            bound may be None meaning infinity
+        :rtype: dict
+        """
+        buckets = []
+        for i, count in enumerate(self._counts):
+            if count:
+                bound = self.BUCKET_BOUNDS[i] \
+                    if i < self._NUM_BUCKETS else None
+                buckets.append((bound, count))
+
+        return {
+            'count': self._count,
+            'total': self._total,
+            'min': self._min,
+            'max': self._max,
+            'mean': self._total / self._count if self._count else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': buckets
+        }
+
+
+class _ProcTimes(object):
+    def __init__(self, classname, creation_time):
+        self.classname = classname
+        self.creation_time = creation_time
+        # When the current RUNNING or WAITING period started
+        self.running_since = None
+        self.waiting_since = None
+
+
+class ProcessMetrics(ProcessMonitorListener, ProcessListener):
+    """
+    Collects timings of processes, per process class.  These are:
+
+    * queue_delay: The time from the process being created to it first being
+      played
+    * run_time: The time spent RUNNING
+    * wait_time: The time spent WAITING
+    * lifetime: The time from the process being created to it stopping or
+      failing
+
+    A process that is paused and never played again has no lifetime, it is
+    forgotten about once it is dropped.
+
+    To use it listen to the process monitor, all processes that are played
+    from then on will be timed e.g.::
+
+        metrics = ProcessMetrics()
+        with MONITOR.listen(metrics):
+            ...
+        print(metrics.snapshot())
+    """
+    QUEUE_DELAY = 'queue_delay'
+    RUN_TIME = 'run_time'
+    WAIT_TIME = 'wait_time'
+    LIFETIME = 'lifetime'
+
+    def __init__(self, clock=time.time):
+        """
+        :param clock: The function used to get the current time, should
+            give times comparable to :attr:`plum.process.Process.creation_time`
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        # {process: _ProcTimes}, weak so that a process that is paused and
+        # then dropped isn't kept track of forever
+        self._procs = weakref.WeakKeyDictionary()
+        # {classname: {metric name: Histogram}}
+        self._histograms = {}
+
+    def snapshot(self):
+        """
+        Get a summary of the metrics collected so far.
+
+        :return: A dictionary of {classname: {metric: histogram snapshot}},
+            see :func:`Histogram.snapshot`
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(
+                (classname, dict(
+                    (metric, hist.snapshot())
+                    for metric, hist in histograms.iteritems()))
+                for classname, histograms in self._histograms.iteritems())
+
+    def reset(self):
+        """
+        Throw away the metrics collected so far.  Processes that are currently
+        being timed continue to be.
+        """
+        with self._lock:
+            self._histograms = {}
+
+    # region From ProcessMonitorListener
+    @override
+    def on_monitored_process_registered(self, process):
+        now = self._clock()
+        with self._lock:
+            if process in self._procs:
+                # Being played again after a pause
+                return
+            times = _ProcTimes(fullname(process), process.creation_time)
+            self._procs[process] = times
+            self._add(times, self.QUEUE_DELAY, now - times.creation_time)
+        process.add_process_listener(self)
+
+    # endregion
+
+    # region From ProcessListener
+    @override
+    def on_process_run(self, process):
+        self._start_running(process)
+
+    @override
+    def on_process_resume(self, process):
+        now = self._clock()
+        with self._lock:
+            times = self._procs.get(process, None)
+            if times is None:
+                return
+            if times.waiting_since is not None:
+                self._add(times, self.WAIT_TIME, now - times.waiting_since)
+                times.waiting_since = None
+            times.running_since = now
+
+    @override
+    def on_process_wait(self, process):
+        now = self._clock()
+        with self._lock:
+            times = self._procs.get(process, None)
+            if times is None:
+                return
+            self._stop_running(times, now)
+            times.waiting_since = now
+
+    @override
+    def on_process_finish(self, process):
+        now = self._clock()
+        with self._lock:
+            times = self._procs.get(process, None)
+            if times is not None:
+                self._stop_running(times, now)
+
+    @override
+    def on_process_stop(self, process):
+        self._terminated(process)
+
+    @override
+    def on_process_fail(self, process):
+        self._terminated(process)
+
+    # endregion
+
+    def _start_running(self, process):
+        now = self._clock()
+        with self._lock:
+            times = self._procs.get(process, None)
+            if times is not None:
+                times.running_since = now
+
+    def _terminated(self, process):
+        process.remove_process_listener(self)
+        now = self._clock()
+        with self._lock:
+            times = self._procs.pop(process, None)
+            if times is None:
+                return
+            self._stop_running(times, now)
+            if times.waiting_since is not None:
+                # Aborted while waiting
+                self._add(times, self.WAIT_TIME, now - times.waiting_since)
+            self._add(times, self.LIFETIME, now - times.creation_time)
+
+    def _stop_running(self, times, now):
+        """
+        Record the end of a RUNNING period.  The lock should be held by the
+        caller.
+        """
+        if times.running_since is not None:
+            self._add(times, self.RUN_TIME, now - times.running_since)
+            times.running_since = None
+
+    def _add(self, times, metric, value):
+        """
+        Add a value to a metric of the process class.  The lock should be held
+        by the caller.
+        """
+        try:
+            histograms = self._histograms[times.classname]
+        except KeyError:
+            histograms = self._histograms[times.classname] = {
+                self.QUEUE_DELAY: Histogram(),
+                self.RUN_TIME: Histogram(),
+                self.WAIT_TIME: Histogram(),
+                self.LIFETIME: Histogram()
+            }
+        histograms[metric].add(value)
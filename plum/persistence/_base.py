@@ -4,3 +4,9 @@ import logging
 
 # Logger for internal use by plum.
 LOGGER = logging.getLogger("plum.persistence")
+
+# The status of a persisted process, for the backends that keep finished and
+# failed processes alongside running ones
+RUNNING = 0
+FINISHED = 1
+FAILED = 2
@@ -2,6 +2,10 @@ import collections
 import copy
 import functools
 import operator
+try:
+    import numpy
+except ImportError:
+    numpy = None
 from plum.util import override
 from plum.class_loader import ClassLoader
 
@@ -26,7 +30,13 @@ class Bundle(collections.MutableMapping):
         return self.__dict
 
     def get_dict_deepcopy(self):
-        return copy.deepcopy(self.__dict)
+        """
+        Get a deep copy of the dictionary.  NumPy arrays are treated as
+        immutable payloads and are passed by reference rather than copied.
+        """
+        memo = {}
+        _share_arrays(self.__dict, memo)
+        return copy.deepcopy(self.__dict, memo)
 
     def set_if_not_none(self, key, value):
         """
@@ -54,8 +64,11 @@ class Bundle(collections.MutableMapping):
         del self.__dict[key]
 
     def copy(self, **add_or_replace):
-        b = Bundle(self._class_loader)
-        b.__dict.update(self.__dict)
+        """
+        Get a shallow copy of this bundle, values are shared with it.
+        """
+        b = Bundle(self.__dict, **add_or_replace)
+        b.set_class_loader(self._class_loader)
         return b
 
     @override
@@ -77,3 +90,20 @@ class Bundle(collections.MutableMapping):
             self.__hash = functools.reduce(operator.xor, hashes, 0)
 
         return self.__hash
+
+
+def _share_arrays(obj, memo):
+    """
+    Fill a deepcopy memo so that any NumPy arrays in a (nested) mapping or
+    sequence are copied by reference.
+    """
+    if numpy is None:
+        return
+    if isinstance(obj, numpy.ndarray):
+        memo[id(obj)] = obj
+    elif isinstance(obj, collections.Mapping):
+        for value in obj.itervalues():
+            _share_arrays(value, memo)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            _share_arrays(value, memo)
@@ -0,0 +1,193 @@
+import collections
+import threading
+import time
+from plum.persistence._base import LOGGER
+
+
+class _Pending(object):
+    """
+    The newest value waiting to be written for a key.
+    """
+    __slots__ = ('value', 'due', 'seq')
+
+    def __init__(self, value, due, seq):
+        self.value = value
+        # When it should be written by
+        self.due = due
+        # The sequence number of the oldest submission this value supersedes
+        self.seq = seq
+
+
+class CoalescingWriter(object):
+    """
+    Writes values on background threads, keeping only the newest value that
+    is waiting to be written for each key.  Something that is submitted many
+    times while the previous value is still waiting is written once.
+
+    Values for the same key are never written concurrently or out of order.
+    """
+
+    def __init__(self, write, num_threads=1, interval=0.):
+        """
+        :param write: The function to write with, called with the key and
+            the value
+        :param num_threads: The number of threads to write with
+        :type num_threads: int
+        :param interval: How long (in seconds) to wait before writing a value
+            so that any submitted for the same key in the mean time are
+            coalesced with it.  By default values are written as soon as a
+            thread is free.
+        :type interval: float
+        """
+        assert num_threads > 0, "There must be at least one writer thread"
+
+        self._write = write
+        self._interval = interval
+
+        self._condition = threading.Condition()
+        # {key: _Pending} in the order they were first submitted
+        self._pending = collections.OrderedDict()
+        # {key: sequence number} of the values being written
+        self._writing = {}
+        self._seq = 0
+        # Write straight away, regardless of the interval, if > 0
+        self._flushing = 0
+        # {key: count} of the keys being flushed on their own
+        self._flushing_keys = {}
+        self._closed = False
+
+        self._threads = []
+        for _ in range(num_threads):
+            thread = threading.Thread(target=self._write_loop)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key, value):
+        """
+        Write a value for a key, superseding any that hasn't been written yet.
+        """
+        with self._condition:
+            assert not self._closed, "The writer has been closed"
+            self._seq += 1
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = _Pending(
+                    value, time.time() + self._interval, self._seq)
+                self._condition.notify_all()
+            else:
+                pending.value = value
+
+    def discard(self, key):
+        """
+        Forget about any value waiting to be written for a key, and wait for
+        one that is being written to finish.
+        """
+        with self._condition:
+            self._pending.pop(key, None)
+            while key in self._writing:
+                self._condition.wait()
+
+    def flush(self, key=None):
+        """
+        Write everything that was submitted up to now, or just the value for
+        one key, and wait for it to be written.  Things submitted while
+        waiting aren't waited for.
+        """
+        with self._condition:
+            if key is None:
+                self._flushing += 1
+                self._condition.notify_all()
+                try:
+                    seq = self._seq
+                    while self._oldest_pending_seq() <= seq \
+                            or any(s <= seq for s in self._writing.itervalues()):
+                        self._condition.wait()
+                finally:
+                    self._flushing -= 1
+            else:
+                self._flushing_keys[key] = self._flushing_keys.get(key, 0) + 1
+                self._condition.notify_all()
+                try:
+                    while key in self._pending or key in self._writing:
+                        self._condition.wait()
+                finally:
+                    self._flushing_keys[key] -= 1
+                    if not self._flushing_keys[key]:
+                        del self._flushing_keys[key]
+
+    def close(self):
+        """
+        Write everything that is waiting and stop the threads.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _write_loop(self):
+        while True:
+            with self._condition:
+                key, pending = self._next()
+                if key is None:
+                    return
+                self._writing[key] = pending.seq
+
+            try:
+                self._write(key, pending.value)
+            except BaseException:
+                LOGGER.exception("Exception raised writing {}".format(key))
+            finally:
+                with self._condition:
+                    del self._writing[key]
+                    self._condition.notify_all()
+
+    def _oldest_pending_seq(self):
+        """
+        :return: The sequence number of the oldest value waiting to be
+            written, or infinity if there are none.  The condition must be
+            held by the caller.
+        """
+        # They are kept in the order they were submitted
+        for pending in self._pending.itervalues():
+            return pending.seq
+        return float('inf')
+
+    def _next(self):
+        """
+        Wait for the next key that can be written.  The condition must be
+        held by the caller.
+
+        :return: The key and its pending value, or None, None if closed and
+            there's nothing left to write
+        """
+        while True:
+            # Keys being flushed on their own go first, there are only ever a
+            # few of them so look them up rather than search for them
+            for key in self._flushing_keys:
+                if key in self._pending and key not in self._writing:
+                    return key, self._pending.pop(key)
+
+            hurry = self._closed or self._flushing > 0
+            now = time.time()
+            wait_until = None
+            # They were submitted in order so they are due in order too, the
+            # only ones to skip are those being written (at most one per
+            # thread) so this doesn't depend on how many are pending
+            for key, pending in self._pending.iteritems():
+                if key in self._writing:
+                    continue
+                if hurry or pending.due <= now:
+                    del self._pending[key]
+                    return key, pending
+                wait_until = pending.due
+                break
+
+            if self._closed and not self._pending:
+                return None, None
+
+            if wait_until is None:
+                self._condition.wait()
+            else:
+                self._condition.wait(wait_until - now)
@@ -0,0 +1,509 @@
+import glob
+import os
+import os.path as path
+import pickle
+import struct
+import tempfile
+import threading
+import zlib
+from plum.process_listener import ProcessListener
+from plum.process_monitor import MONITOR, ProcessMonitorListener
+from plum.util import override, protected
+from plum.persistence.bundle import Bundle
+import plum.tracing as tracing
+from plum.persistence._base import LOGGER, RUNNING, FINISHED, FAILED
+
+_LOG_DIRECTORY = path.join(tempfile.gettempdir(), "plum_log")
+
+# The status of a record that is a tombstone, the process has been forgotten
+# about.  The others are RUNNING, FINISHED and FAILED.
+_REMOVED = 3
+
+# crc32, data length, status, pid length
+_HEADER = struct.Struct('<IIBH')
+
+
+class _Entry(object):
+    """
+    Where the latest record for a process is.
+    """
+    __slots__ = ('segment', 'offset', 'size', 'status')
+
+    def __init__(self, segment, offset, size, status):
+        self.segment = segment
+        self.offset = offset
+        self.size = size
+        self.status = status
+
+
+class LogPersistence(ProcessListener, ProcessMonitorListener):
+    """
+    Persists the instance state of Processes by appending checkpoint records
+    to a log made up of numbered segment files, rather than having a file per
+    process.  Saving never creates, renames or deletes files (apart from when
+    a segment fills up) so throughput is limited by sequential write bandwidth
+    rather than file system metadata operations.
+
+    An in memory index of where the latest record of each process is, is
+    rebuilt by scanning the segments when this is created.  Records that have
+    been superseded are dropped by compaction, which merges the full segments
+    on a background thread.
+
+    Finished and failed processes are kept, with their status, unless asked
+    otherwise, see :func:`load_checkpoint` and :func:`get_pids`.
+    """
+
+    @staticmethod
+    def segment_filename(segment):
+        """
+        :param segment: The segment, a (sequence number, generation) tuple.
+            The generation goes up each time it is rewritten by compaction.
+        """
+        return "{:08d}.{}.log".format(*segment)
+
+    def __init__(self, auto_persist=False, directory=_LOG_DIRECTORY,
+                 keep_finished=True, keep_failed=True,
+                 max_segment_size=64 * 1024 * 1024, compact_ratio=0.5,
+                 sync=False):
+        """
+        Create the log persistence object.  If auto_persist is True then this
+        object will automatically persist any Processes that are created and
+        will keep their persisted state up to date as they run.
+
+        :param auto_persist: Will automatically persist Processes if True.
+        :type auto_persist: bool
+        :param directory: The directory to keep the log segments in
+        :type directory: str
+        :param keep_finished: Keep the last checkpoint of finished processes
+        :type keep_finished: bool
+        :param keep_failed: Keep the last checkpoint of failed processes
+        :type keep_failed: bool
+        :param max_segment_size: The size (in bytes) after which a new
+            segment is started
+        :type max_segment_size: int
+        :param compact_ratio: Compact the full segments once the fraction of
+            them that is superseded records reaches this
+        :type compact_ratio: float
+        :param sync: If True fsync after every record, otherwise records are
+            only flushed to the operating system
+        :type sync: bool
+        """
+        assert max_segment_size > 0, "The maximum segment size must be positive"
+
+        self._directory = directory
+        self._auto_persist = auto_persist
+        self._keep_finished = keep_finished
+        self._keep_failed = keep_failed
+        self._max_segment_size = max_segment_size
+        self._compact_ratio = compact_ratio
+        self._sync = sync
+
+        # Guards the index, the segment bookkeeping and appending
+        self._lock = threading.Lock()
+        # {pid: _Entry}
+        self._index = {}
+        # {(sequence number, generation): number of bytes}
+        self._segment_sizes = {}
+        # {segment: set(pids with a tombstone in it)}
+        self._tombstones = {}
+        self._active = None
+        self._active_file = None
+
+        self._closed = False
+        # Only one compaction at a time, explicit or in the background
+        self._compact_lock = threading.Lock()
+        self._compact_requested = threading.Event()
+        self._compactor = None
+
+        self._recover()
+        self._compactor = threading.Thread(target=self._compact_loop)
+        self._compactor.daemon = True
+        self._compactor.start()
+
+        MONITOR.start_listening(self)
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def close(self):
+        """
+        Stop compacting and close the log.  Nothing can be saved afterwards.
+        """
+        MONITOR.stop_listening(self)
+        self._closed = True
+        self._compact_requested.set()
+        self._compactor.join()
+        with self._lock:
+            if self._active_file is not None:
+                self._active_file.close()
+                self._active_file = None
+
+    def get_pids(self, status=RUNNING):
+        """
+        Get the pids of the processes with a given status.
+
+        :param status: One of RUNNING, FINISHED or FAILED, or None for all
+        :return: A list of pids
+        """
+        with self._lock:
+            return [pid for pid, entry in self._index.iteritems()
+                    if status is None or entry.status == status]
+
+    def get_status(self, pid):
+        """
+        :return: The status of a persisted process, one of RUNNING, FINISHED
+            or FAILED
+        :raises ValueError: If there is no checkpoint for the pid
+        """
+        with self._lock:
+            try:
+                return self._index[pid].status
+            except KeyError:
+                raise ValueError(
+                    "Not checkpoint with pid '{}' could be found".format(pid))
+
+    def load_checkpoint(self, pid):
+        pid_data, data = _split_record(self._read_latest(pid))
+        return pickle.loads(data)
+
+    def load_all_checkpoints(self):
+        """
+        Load the checkpoints of all the running processes.
+
+        :return: A list of checkpoints
+        """
+        with self._lock:
+            # In log order so the reads are (mostly) sequential
+            pids = [pid for pid, entry in sorted(
+                self._index.iteritems(),
+                key=lambda item: (item[1].segment, item[1].offset))
+                    if entry.status == RUNNING]
+
+        checkpoints = []
+        for pid in pids:
+            try:
+                checkpoints.append(self.load_checkpoint(pid))
+            except BaseException as e:
+                LOGGER.warning(
+                    "Failed to load checkpoint of process {} because of "
+                    "exception\n{}".format(pid, e.message))
+
+        return checkpoints
+
+    def persist_process(self, process):
+        # If the process doesn't have a persisted state then persist it now
+        with self._lock:
+            persisted = process.pid in self._index
+        if not persisted:
+            try:
+                self.save(process)
+            except pickle.PicklingError as e:
+                LOGGER.error(
+                    "exception raised trying to pickle process (pid={}).\n"
+                    "{}".format(process.pid, e.message))
+
+        try:
+            process.add_process_listener(self)
+        except AssertionError:
+            # Happens if we're already listening
+            pass
+
+    def save(self, process, status=RUNNING):
+        with tracing.span("save checkpoint", "persistence",
+                          pid=str(process.pid)):
+            checkpoint = self.create_bundle(process)
+            data = pickle.dumps(checkpoint, pickle.HIGHEST_PROTOCOL)
+            self._append(process.pid, status, data)
+
+    def compact(self):
+        """
+        Merge all the full segments into one, dropping superseded records.
+        This is done on a background thread when needed but can be called
+        directly.
+        """
+        with self._compact_lock:
+            self._compact()
+
+    def _compact(self):
+        with self._lock:
+            if self._active_file is None:
+                return
+            segments = sorted(
+                s for s in self._segment_sizes if s != self._active)
+            if not segments:
+                return
+            live = [(pid, entry) for pid, entry in self._index.iteritems()
+                    if entry.segment != self._active]
+            # Tombstones only guard records in older segments, the oldest
+            # segment doesn't have any
+            tombstones = set()
+            for segment in segments[1:]:
+                tombstones.update(self._tombstones.get(segment, ()))
+            # A process that was saved again after being removed doesn't need
+            # its tombstone, the live record supersedes it
+            tombstones.difference_update(pid for pid, entry in live)
+
+        # The segments being merged are no longer written to, so the bulk of
+        # the work can be done without the lock.  The result is a new
+        # generation of the newest one so that it comes after them all when
+        # scanning, even if we crash before they are deleted.
+        target = (segments[-1][0], segments[-1][1] + 1)
+        tmp_path = self._segment_path(target) + ".compact"
+        moved = {}
+        with open(tmp_path, 'wb') as out:
+            # The tombstones go first so that nothing in this segment can be
+            # removed by one when it is scanned
+            for pid in tombstones:
+                out.write(_make_record(pid, _REMOVED, ''))
+            for pid, entry in sorted(
+                    live, key=lambda item: (item[1].segment, item[1].offset)):
+                record = self._read_record(entry)
+                moved[pid] = (entry, _Entry(
+                    target, out.tell(), len(record), entry.status))
+                out.write(record)
+            size = out.tell()
+            out.flush()
+            os.fsync(out.fileno())
+
+        with self._lock:
+            os.rename(tmp_path, self._segment_path(target))
+            for pid, (old, new) in moved.iteritems():
+                # Only if it hasn't been saved again in the mean time
+                if self._index.get(pid) is old:
+                    self._index[pid] = new
+            for segment in segments:
+                os.remove(self._segment_path(segment))
+                del self._segment_sizes[segment]
+                self._tombstones.pop(segment, None)
+            self._segment_sizes[target] = size
+            self._tombstones[target] = tombstones
+
+    # ProcessListener messages #################################################
+    @override
+    def on_process_run(self, process):
+        try:
+            self.save(process)
+        except pickle.PicklingError:
+            LOGGER.error("exception raised trying to pickle process (pid={}) "
+                         "during on_run message.".format(process.pid))
+
+    @override
+    def on_process_wait(self, process):
+        try:
+            self.save(process)
+        except pickle.PicklingError:
+            LOGGER.error("exception raised trying to pickle process (pid={}) "
+                         "during on_wait message.".format(process.pid))
+
+    @override
+    def on_process_finish(self, process):
+        try:
+            if self._keep_finished:
+                self.save(process, FINISHED)
+            else:
+                self._remove(process.pid)
+        except pickle.PicklingError:
+            LOGGER.error("exception raised trying to pickle process (pid={}) "
+                         "during on_finish message.".format(process.pid))
+
+    ############################################################################
+
+    # ProcessMonitorListener messages ##########################################
+    @override
+    def on_monitored_process_failed(self, process):
+        try:
+            record = self._read_latest(process.pid)
+        except ValueError:
+            # Not one of ours
+            return
+
+        if self._keep_failed:
+            # Keep the last checkpoint but mark it as failed
+            pid_data, data = _split_record(record)
+            self._append(process.pid, FAILED, data)
+        else:
+            self._remove(process.pid)
+
+    @override
+    def on_monitored_process_registered(self, process):
+        if self._auto_persist:
+            self.persist_process(process)
+
+    ############################################################################
+
+    @protected
+    def create_bundle(self, process):
+        checkpoint = Bundle()
+        process.save_instance_state(checkpoint)
+        return checkpoint
+
+    def _segment_path(self, segment):
+        return path.join(self._directory, self.segment_filename(segment))
+
+    def _remove(self, pid):
+        with self._lock:
+            if pid not in self._index:
+                return
+        self._append(pid, _REMOVED, '')
+
+    def _append(self, pid, status, data):
+        record = _make_record(pid, status, data)
+        with self._lock:
+            assert self._active_file is not None, "The log has been closed"
+            offset = self._segment_sizes[self._active]
+            self._active_file.write(record)
+            self._active_file.flush()
+            if self._sync:
+                os.fsync(self._active_file.fileno())
+            self._segment_sizes[self._active] = offset + len(record)
+
+            if status == _REMOVED:
+                self._index.pop(pid, None)
+                self._tombstones.setdefault(self._active, set()).add(pid)
+            else:
+                self._index[pid] = _Entry(
+                    self._active, offset, len(record), status)
+
+            if self._segment_sizes[self._active] >= self._max_segment_size:
+                self._roll_over()
+
+    def _roll_over(self):
+        """
+        Start a new segment.  The lock must be held by the caller.
+        """
+        self._active_file.close()
+        self._open_segment((self._active[0] + 1, 0))
+        if self._needs_compacting():
+            self._compact_requested.set()
+
+    def _open_segment(self, segment):
+        self._active = segment
+        self._active_file = open(self._segment_path(segment), 'ab')
+        self._active_file.seek(0, os.SEEK_END)
+        self._segment_sizes[segment] = self._active_file.tell()
+
+    def _needs_compacting(self):
+        """
+        The lock must be held by the caller.
+        """
+        total = sum(size for segment, size in self._segment_sizes.iteritems()
+                    if segment != self._active)
+        if total == 0:
+            return False
+        live = sum(entry.size for entry in self._index.itervalues()
+                   if entry.segment != self._active)
+        return float(total - live) / total >= self._compact_ratio
+
+    def _compact_loop(self):
+        while True:
+            self._compact_requested.wait()
+            self._compact_requested.clear()
+            if self._closed:
+                return
+            try:
+                self.compact()
+            except BaseException:
+                LOGGER.exception("Exception raised compacting the log")
+
+    def _read_record(self, entry):
+        with open(self._segment_path(entry.segment), 'rb') as f:
+            f.seek(entry.offset)
+            return f.read(entry.size)
+
+    def _read_latest(self, pid):
+        """
+        Read the latest record of a process.
+
+        :raises ValueError: If there is no checkpoint for the pid
+        """
+        while True:
+            with self._lock:
+                entry = self._index.get(pid)
+            if entry is None:
+                raise ValueError(
+                    "Not checkpoint with pid '{}' could be found".format(pid))
+            try:
+                return self._read_record(entry)
+            except IOError:
+                with self._lock:
+                    if self._index.get(pid) is entry:
+                        raise
+                # Moved by compaction in the mean time, try again
+
+    def _recover(self):
+        """
+        Rebuild the index by scanning the segments in order.
+        """
+        if not path.isdir(self._directory):
+            os.makedirs(self._directory)
+
+        # Left over from compaction that didn't complete
+        for tmp_path in glob.glob(path.join(self._directory, "*.log.compact")):
+            os.remove(tmp_path)
+
+        segments = sorted(
+            tuple(int(n) for n in path.basename(p).split('.')[:2])
+            for p in glob.glob(path.join(self._directory, "*.*.log")))
+        for segment in segments:
+            self._scan(segment, segment == segments[-1])
+
+        if segments:
+            self._open_segment(segments[-1])
+        else:
+            self._open_segment((0, 0))
+
+    def _scan(self, segment, last):
+        segment_path = self._segment_path(segment)
+        offset = 0
+        with open(segment_path, 'rb') as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if not header:
+                    break
+                try:
+                    if len(header) < _HEADER.size:
+                        raise ValueError("incomplete header")
+                    crc, data_len, status, pid_len = _HEADER.unpack(header)
+                    body = f.read(pid_len + data_len)
+                    if len(body) < pid_len + data_len:
+                        raise ValueError("incomplete record")
+                    if zlib.crc32(body) & 0xffffffff != crc:
+                        raise ValueError("checksum mismatch")
+                    pid = pickle.loads(body[:pid_len])
+                except BaseException as e:
+                    LOGGER.warning(
+                        "Ignoring the rest of log segment {} from offset {} "
+                        "because of exception\n{}".format(
+                            segment_path, offset, e))
+                    break
+
+                size = _HEADER.size + pid_len + data_len
+                if status == _REMOVED:
+                    self._index.pop(pid, None)
+                    self._tombstones.setdefault(segment, set()).add(pid)
+                else:
+                    self._index[pid] = _Entry(segment, offset, size, status)
+                offset += size
+
+        if last and offset < path.getsize(segment_path):
+            # A torn write at the end, get rid of it so we can append
+            with open(segment_path, 'r+b') as f:
+                f.truncate(offset)
+        self._segment_sizes[segment] = offset
+
+
+def _make_record(pid, status, data):
+    pid_data = pickle.dumps(pid, pickle.HIGHEST_PROTOCOL)
+    body = pid_data + data
+    return _HEADER.pack(zlib.crc32(body) & 0xffffffff, len(data), status,
+                        len(pid_data)) + body
+
+
+def _split_record(record):
+    """
+    :return: The pickled pid and the pickled bundle of a record
+    """
+    crc, data_len, status, pid_len = _HEADER.unpack_from(record)
+    body = record[_HEADER.size:]
+    return body[:pid_len], body[pid_len:]
@@ -3,10 +3,13 @@ import os
 import os.path as path
 import tempfile
 import pickle
+import weakref
 from plum.persistence.bundle import Bundle
+from plum.persistence.coalescing_writer import CoalescingWriter
 from plum.process_listener import ProcessListener
 from plum.process_monitor import MONITOR, ProcessMonitorListener
 from plum.util import override, protected
+import plum.tracing as tracing
 from plum.persistence._base import LOGGER
 
 _RUNNING_DIRECTORY = path.join(tempfile.gettempdir(), "running")
@@ -50,7 +53,9 @@ class PicklePersistence(ProcessListener, ProcessMonitorListener):
     def __init__(self, auto_persist=False,
                  running_directory=_RUNNING_DIRECTORY,
                  finished_directory=_FINISHED_DIRECTORY,
-                 failed_directory=_FAILED_DIRECTORY):
+                 failed_directory=_FAILED_DIRECTORY,
+                 delta=False, compact_every=32, io_threads=0,
+                 write_interval=0.):
         """
         Create the pickle persistence object.  If auto_persist is True then
         this object will automatically persist any Processes that are created
@@ -74,15 +79,66 @@ class PicklePersistence(ProcessListener, ProcessMonitorListener):
         :param failed_directory: The (relative) subdirectory to put failed
             Process pickles in.  If None they will be deleted on fail.
         :type failed_directory: str
+        :param delta: If True save incrementally: the first save of a process
+            writes a full snapshot and later ones append only what changed
+            since the last save.  Values in the bundle are taken to be
+            unchanged if they are the same object as last time so they must
+            not be modified in place once saved (as is already the case for
+            outputs).
+        :type delta: bool
+        :param compact_every: In delta mode, the number of deltas after which
+            the next save writes a full snapshot instead
+        :type compact_every: int
+        :param io_threads: If more than 0 the checkpoints taken as processes
+            run and wait are written by this many background threads rather
+            than by the process's own thread.  Only the newest checkpoint
+            waiting to be written for each process is kept, see
+            :func:`flush`.  The values in the checkpoint must not be modified
+            in place until written.
+        :type io_threads: int
+        :param write_interval: With background writes, how long (in seconds)
+            to hold on to a checkpoint before writing it so that later ones
+            for the same process can supersede it.
+        :type write_interval: float
         """
+        assert compact_every > 0, "compact_every must be positive"
+
         self._running_directory = running_directory
         self._finished_directory = finished_directory
         self._failed_directory = failed_directory
         self._auto_persist = auto_persist
+        self._delta = delta
+        self._compact_every = compact_every
+        # {process: _DeltaState} of the processes being saved incrementally,
+        # weak so that a process that is paused and then dropped doesn't keep
+        # its last checkpoint alive
+        self._delta_states = weakref.WeakKeyDictionary()
+        if io_threads > 0:
+            self._writer = CoalescingWriter(
+                self._write_submitted, io_threads, write_interval)
+        else:
+            self._writer = None
 
         MONITOR.start_listening(self)
 
+    def flush(self):
+        """
+        Wait for the checkpoints taken so far to be written.
+        """
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        """
+        Write any outstanding checkpoints and stop listening for processes.
+        """
+        MONITOR.stop_listening(self)
+        if self._writer is not None:
+            self._writer.close()
+
     def load_checkpoint(self, pid):
+        if self._writer is not None:
+            self._writer.flush(pid)
         for check_dir in [self._running_directory, self._failed_directory,
                           self._finished_directory]:
             p = path.join(check_dir, str(pid) + ".pickle")
@@ -93,6 +149,7 @@ class PicklePersistence(ProcessListener, ProcessMonitorListener):
             "Not checkpoint with pid '{}' could be found".format(pid))
 
     def load_all_checkpoints(self):
+        self.flush()
         checkpoints = []
         for f in glob.glob(path.join(self._running_directory, "*.pickle")):
             try:
@@ -105,8 +162,26 @@ class PicklePersistence(ProcessListener, ProcessMonitorListener):
         return checkpoints
 
     def load_checkpoint_from_file(self, filepath):
+        """
+        Load a checkpoint, applying any deltas that follow the snapshot.  If
+        the last delta is incomplete (e.g. because of a crash while it was
+        being written) the checkpoint is as of the delta before.
+        """
         with open(filepath, 'rb') as file:
-            return pickle.load(file)
+            checkpoint = pickle.load(file)
+            while True:
+                try:
+                    delta = pickle.load(file)
+                except EOFError:
+                    break
+                except pickle.UnpicklingError as e:
+                    LOGGER.warning(
+                        "Ignoring the rest of checkpoint {} because of "
+                        "exception\n{}".format(filepath, e.message))
+                    break
+                _apply_delta(checkpoint, delta)
+
+        return checkpoint
 
     @property
     def store_directory(self):
@@ -146,23 +221,15 @@ class PicklePersistence(ProcessListener, ProcessMonitorListener):
         return path.join(self._running_directory, self.pickle_filename(pid))
 
     def save(self, process):
-        checkpoint = self.create_bundle(process)
-        self._ensure_directory(self._running_directory)
-        filename = self.get_running_path(process.pid)
-        try:
-            with open(filename, 'wb') as f:
-                pickle.dump(checkpoint, f)
-        except pickle.PickleError:
-            # Don't leave a half-baked pickle around
-            if path.isfile(filename):
-                os.remove(filename)
-            raise
+        with tracing.span("save checkpoint", "persistence",
+                          pid=str(process.pid)):
+            self._write_checkpoint(process, self.create_bundle(process))
 
     # ProcessListener messages #################################################
     @override
     def on_process_run(self, process):
         try:
-            self.save(process)
+            self._checkpoint(process)
         except pickle.PicklingError:
             LOGGER.error("exception raised trying to pickle process (pid={}) "
                          "during on_run message.".format(process.pid))
@@ -170,16 +237,19 @@ class PicklePersistence(ProcessListener, ProcessMonitorListener):
     @override
     def on_process_wait(self, process):
         try:
-            self.save(process)
+            self._checkpoint(process)
         except pickle.PicklingError:
             LOGGER.error("exception raised trying to pickle process (pid={}) "
                          "during on_wait message.".format(process.pid))
 
     @override
     def on_process_finish(self, process):
+        if self._writer is not None:
+            # Superseded by the final save
+            self._writer.discard(process.pid)
         try:
             self.save(process)
-            self._release_process(process.pid, self.finished_directory)
+            self._release_process(process, self.finished_directory)
         except pickle.PicklingError:
             LOGGER.error("exception raised trying to pickle process (pid={}) "
                          "during on_finish message.".format(process.pid))
@@ -190,12 +260,22 @@ class PicklePersistence(ProcessListener, ProcessMonitorListener):
 
     # ProcessMonitorListener messages ##########################################
     @override
-    def on_monitored_process_failed(self, pid):
+    def on_monitored_process_failed(self, process):
+        if self._writer is not None:
+            # Keep the last checkpoint taken
+            self._writer.flush(process.pid)
         try:
-            self._release_process(pid, self.failed_directory)
+            self._release_process(process, self.failed_directory)
         except ValueError:
             pass
 
+    @override
+    def on_monitored_process_stopped(self, process):
+        if self._writer is not None:
+            self._writer.flush(process.pid)
+        # It won't be saved again
+        self._delta_states.pop(process, None)
+
     ############################################################################
 
     @override
@@ -209,12 +289,70 @@ class PicklePersistence(ProcessListener, ProcessMonitorListener):
         process.save_instance_state(checkpoint)
         return checkpoint
 
+    def _checkpoint(self, process):
+        if self._writer is None:
+            self.save(process)
+        else:
+            # Take the checkpoint now but leave writing it to the writer
+            self._writer.submit(
+                process.pid, (process, self.create_bundle(process)))
+
+    def _write_submitted(self, pid, submitted):
+        self._write_checkpoint(*submitted)
+
+    def _write_checkpoint(self, process, checkpoint):
+        with tracing.span("write checkpoint", "persistence",
+                          pid=str(process.pid)):
+            self._ensure_directory(self._running_directory)
+            filename = self.get_running_path(process.pid)
+            if self._delta:
+                self._save_delta(process, checkpoint, filename)
+            else:
+                self._save_full(checkpoint, filename)
+
+    def _save_full(self, checkpoint, filename):
+        try:
+            with open(filename, 'wb') as f:
+                # The binary protocol writes array buffers as they are
+                pickle.dump(checkpoint, f, pickle.HIGHEST_PROTOCOL)
+        except pickle.PickleError:
+            # Don't leave a half-baked pickle around
+            if path.isfile(filename):
+                os.remove(filename)
+            raise
+
+    def _save_delta(self, process, checkpoint, filename):
+        state = self._delta_states.get(process)
+        if state is None or state.num_deltas >= self._compact_every or \
+                not path.isfile(filename):
+            # Start (again) from a full snapshot
+            self._delta_states.pop(process, None)
+            self._save_full(checkpoint, filename)
+            self._delta_states[process] = _DeltaState(checkpoint)
+            return
+
+        delta = _make_delta(state.checkpoint, checkpoint)
+        if delta is not None:
+            with open(filename, 'ab') as f:
+                f.seek(0, os.SEEK_END)
+                end = f.tell()
+                try:
+                    pickle.dump(delta, f, pickle.HIGHEST_PROTOCOL)
+                except pickle.PickleError:
+                    # Don't leave a half-baked delta on the end
+                    f.truncate(end)
+                    raise
+            state.num_deltas += 1
+        state.checkpoint = checkpoint
+
     @staticmethod
     def _ensure_directory(dir_path):
         if not path.isdir(dir_path):
             os.makedirs(dir_path)
 
-    def _release_process(self, pid, save_path):
+    def _release_process(self, process, save_path):
+        self._delta_states.pop(process, None)
+        pid = process.pid
         # Get the current location of the pickle
         pickle_path = self.get_running_path(pid)
 
@@ -228,3 +366,62 @@ class PicklePersistence(ProcessListener, ProcessMonitorListener):
         else:
             raise ValueError(
                 "Cannot find pickle for process with pid '{}'".format(pid))
+
+
+class _DeltaState(object):
+    """
+    What was last saved for a process that is being saved incrementally.
+    """
+
+    def __init__(self, checkpoint):
+        self.checkpoint = checkpoint
+        self.num_deltas = 0
+
+
+# The type of the values that are compared by value rather than identity when
+# making a delta
+_VALUE_TYPES = (basestring, int, long, float, bool)
+
+
+def _make_delta(old, new):
+    """
+    Make the delta that takes one bundle to another.  Nested bundles get
+    deltas of their own so e.g. only newly emitted outputs are included.
+
+    :return: The delta or None if nothing changed
+    :rtype: tuple
+    """
+    changed = {}
+    nested = {}
+    for key, value in new.iteritems():
+        try:
+            old_value = old[key]
+        except KeyError:
+            changed[key] = value
+            continue
+
+        if old_value is value:
+            continue
+        if isinstance(value, _VALUE_TYPES) and type(value) is type(old_value) \
+                and value == old_value:
+            continue
+        if isinstance(value, Bundle) and isinstance(old_value, Bundle):
+            delta = _make_delta(old_value, value)
+            if delta is not None:
+                nested[key] = delta
+        else:
+            changed[key] = value
+
+    removed = [key for key in old if key not in new]
+    if not (changed or nested or removed):
+        return None
+    return changed, removed, nested
+
+
+def _apply_delta(bundle, delta):
+    changed, removed, nested = delta
+    for key in removed:
+        del bundle[key]
+    bundle.update(changed)
+    for key, value in nested.iteritems():
+        _apply_delta(bundle[key], value)
@@ -0,0 +1,406 @@
+import os
+import os.path as path
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from plum.process_listener import ProcessListener
+from plum.process_monitor import MONITOR, ProcessMonitorListener
+from plum.util import override, protected, fullname
+from plum.persistence.bundle import Bundle
+import plum.tracing as tracing
+from plum.persistence._base import LOGGER, RUNNING, FINISHED, FAILED
+
+_DATABASE = path.join(tempfile.gettempdir(), "plum.db")
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS processes ("
+    " pid TEXT PRIMARY KEY,"
+    " pid_data BLOB NOT NULL,"
+    " status INTEGER NOT NULL,"
+    " state TEXT,"
+    " class_name TEXT NOT NULL,"
+    " created REAL NOT NULL,"
+    " updated REAL NOT NULL,"
+    " checkpoint BLOB NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS processes_status_class "
+    "ON processes (status, class_name)",
+    "CREATE INDEX IF NOT EXISTS processes_class ON processes (class_name)",
+]
+
+# Keeps the time of the first save when replacing the row
+_SAVE = \
+    "INSERT OR REPLACE INTO processes " \
+    "(pid, pid_data, status, state, class_name, created, updated, " \
+    "checkpoint) VALUES (?, ?, ?, ?, ?, " \
+    "COALESCE((SELECT created FROM processes WHERE pid = ?), ?), ?, ?)"
+_SET_STATUS = \
+    "UPDATE processes SET status = ?, state = ?, updated = ? WHERE pid = ?"
+_DELETE = "DELETE FROM processes WHERE pid = ?"
+
+
+class _Batch(object):
+    """
+    Writes that are committed together in one transaction.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.done = threading.Event()
+        self.exception = None
+
+    def wait(self):
+        self.done.wait()
+        if self.exception is not None:
+            raise self.exception
+
+
+class SqlitePersistence(ProcessListener, ProcessMonitorListener):
+    """
+    Persists the instance state of Processes as rows of an SQLite database,
+    one per process, along with its status, state, class name and when it was
+    first and last saved.  The status and class name are indexed so queries
+    like 'all the failed processes of class X' don't have to load any
+    checkpoints, see :func:`find_pids`.
+
+    All the writes go through a single writer thread.  Whatever writes were
+    submitted (from any number of threads) while it was committing the last
+    transaction are committed together in the next one, so the cost of a
+    commit is shared when many processes are saving at the same time.  The
+    database is used in WAL mode so reading doesn't block writing.
+    """
+
+    def __init__(self, auto_persist=False, database=_DATABASE,
+                 keep_finished=True, keep_failed=True, sync=False,
+                 timeout=5.):
+        """
+        Create the SQLite persistence object.  If auto_persist is True then
+        this object will automatically persist any Processes that are created
+        and will keep their persisted state up to date as they run.
+
+        :param auto_persist: Will automatically persist Processes if True.
+        :type auto_persist: bool
+        :param database: The path of the database file
+        :type database: str
+        :param keep_finished: Keep the last checkpoint of finished processes
+        :type keep_finished: bool
+        :param keep_failed: Keep the last checkpoint of failed processes
+        :type keep_failed: bool
+        :param sync: If True every commit is synced to disk, otherwise only
+            when the WAL is checkpointed.  Either way a commit survives the
+            program crashing, but without sync it may not survive the machine
+            crashing.
+        :type sync: bool
+        :param timeout: How long (in seconds) to wait for a lock on the
+            database held by another connection
+        :type timeout: float
+        """
+        self._database = database
+        self._auto_persist = auto_persist
+        self._keep_finished = keep_finished
+        self._keep_failed = keep_failed
+        self._sync = sync
+        self._timeout = timeout
+
+        directory = path.dirname(path.abspath(database))
+        if not path.isdir(directory):
+            os.makedirs(directory)
+
+        writer = self._connect()
+        writer.execute("PRAGMA journal_mode=WAL")
+        writer.execute(
+            "PRAGMA synchronous={}".format("FULL" if sync else "NORMAL"))
+        with writer:
+            for statement in _SCHEMA:
+                writer.execute(statement)
+
+        # Guards the pending batch and closing
+        self._write_condition = threading.Condition()
+        self._batch = _Batch()
+        # The batch being (or last) committed
+        self._committing = None
+        self._closed = False
+        self._writer = threading.Thread(
+            target=self._write_loop, args=(writer,))
+        self._writer.daemon = True
+        self._writer.start()
+
+        # Each thread reads with a connection of its own
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+
+        MONITOR.start_listening(self)
+
+    @property
+    def database(self):
+        return self._database
+
+    def close(self):
+        """
+        Commit any outstanding writes and close the database.  Nothing can be
+        saved afterwards.
+        """
+        MONITOR.stop_listening(self)
+        with self._write_condition:
+            self._closed = True
+            self._write_condition.notify()
+        self._writer.join()
+        with self._readers_lock:
+            for connection in self._readers:
+                connection.close()
+            del self._readers[:]
+
+    def flush(self):
+        """
+        Wait until all the writes submitted so far have been committed.
+        """
+        with self._write_condition:
+            if self._batch.statements:
+                batch = self._batch
+            else:
+                batch = self._committing
+        if batch is not None:
+            batch.done.wait()
+
+    def get_pids(self, status=RUNNING):
+        """
+        Get the pids of the processes with a given status.
+
+        :param status: One of RUNNING, FINISHED or FAILED, or None for all
+        :return: A list of pids
+        """
+        return self.find_pids(status=status)
+
+    def find_pids(self, status=None, class_name=None, state=None):
+        """
+        Find the pids of the persisted processes matching all of the given
+        criteria, None matches anything.
+
+        :param status: One of RUNNING, FINISHED or FAILED
+        :param class_name: The process class or its fully qualified name
+        :param state: The state the process was in when last saved
+        :type state: :class:`plum.process.ProcessState`
+        :return: A list of pids, oldest first
+        """
+        conditions = []
+        params = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if class_name is not None:
+            if not isinstance(class_name, basestring):
+                class_name = fullname(class_name)
+            conditions.append("class_name = ?")
+            params.append(class_name)
+        if state is not None:
+            conditions.append("state = ?")
+            params.append(state.name)
+
+        sql = "SELECT pid_data FROM processes"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created"
+        return [pickle.loads(str(row[0]))
+                for row in self._reader().execute(sql, params)]
+
+    def get_status(self, pid):
+        """
+        :return: The status of a persisted process, one of RUNNING, FINISHED
+            or FAILED
+        :raises ValueError: If there is no checkpoint for the pid
+        """
+        return self._get_row("status", pid)[0]
+
+    def load_checkpoint(self, pid):
+        return pickle.loads(str(self._get_row("checkpoint", pid)[0]))
+
+    def load_all_checkpoints(self):
+        """
+        Load the checkpoints of all the running processes.
+
+        :return: A list of checkpoints
+        """
+        checkpoints = []
+        for pid, data in self._reader().execute(
+                "SELECT pid, checkpoint FROM processes WHERE status = ? "
+                "ORDER BY created", (RUNNING,)):
+            try:
+                checkpoints.append(pickle.loads(str(data)))
+            except BaseException as e:
+                LOGGER.warning(
+                    "Failed to load checkpoint of process {} because of "
+                    "exception\n{}".format(pid, e.message))
+
+        return checkpoints
+
+    def persist_process(self, process):
+        # If the process doesn't have a persisted state then persist it now
+        if not self._is_persisted(process.pid):
+            try:
+                self.save(process)
+            except pickle.PicklingError as e:
+                LOGGER.error(
+                    "exception raised trying to pickle process (pid={}).\n"
+                    "{}".format(process.pid, e.message))
+
+        try:
+            process.add_process_listener(self)
+        except AssertionError:
+            # Happens if we're already listening
+            pass
+
+    def save(self, process, status=RUNNING, wait=True):
+        """
+        Save the current state of a process.
+
+        :param process: The process to save
+        :param status: One of RUNNING, FINISHED or FAILED
+        :param wait: If True wait for the write to be committed, otherwise
+            see :func:`flush`
+        :type wait: bool
+        """
+        with tracing.span("save checkpoint", "persistence",
+                          pid=str(process.pid)):
+            checkpoint = self.create_bundle(process)
+            data = pickle.dumps(checkpoint, pickle.HIGHEST_PROTOCOL)
+            now = time.time()
+            pid = str(process.pid)
+            self._write(_SAVE, (
+                pid,
+                sqlite3.Binary(
+                    pickle.dumps(process.pid, pickle.HIGHEST_PROTOCOL)),
+                status, _state_name(process), fullname(process),
+                pid, now, now, sqlite3.Binary(data)), wait)
+
+    # ProcessListener messages #################################################
+    @override
+    def on_process_run(self, process):
+        try:
+            self.save(process)
+        except pickle.PicklingError:
+            LOGGER.error("exception raised trying to pickle process (pid={}) "
+                         "during on_run message.".format(process.pid))
+
+    @override
+    def on_process_wait(self, process):
+        try:
+            self.save(process)
+        except pickle.PicklingError:
+            LOGGER.error("exception raised trying to pickle process (pid={}) "
+                         "during on_wait message.".format(process.pid))
+
+    @override
+    def on_process_finish(self, process):
+        try:
+            if self._keep_finished:
+                self.save(process, FINISHED)
+            else:
+                self._write(_DELETE, (str(process.pid),))
+        except pickle.PicklingError:
+            LOGGER.error("exception raised trying to pickle process (pid={}) "
+                         "during on_finish message.".format(process.pid))
+
+    ############################################################################
+
+    # ProcessMonitorListener messages ##########################################
+    @override
+    def on_monitored_process_failed(self, process):
+        if not self._is_persisted(process.pid):
+            # Not one of ours
+            return
+
+        if self._keep_failed:
+            # Keep the last checkpoint but mark it as failed
+            self._write(_SET_STATUS, (
+                FAILED, _state_name(process), time.time(), str(process.pid)))
+        else:
+            self._write(_DELETE, (str(process.pid),))
+
+    @override
+    def on_monitored_process_registered(self, process):
+        if self._auto_persist:
+            self.persist_process(process)
+
+    ############################################################################
+
+    @protected
+    def create_bundle(self, process):
+        checkpoint = Bundle()
+        process.save_instance_state(checkpoint)
+        return checkpoint
+
+    def _connect(self):
+        # Connections are closed by whoever closes this, which may not be the
+        # thread that opened them
+        return sqlite3.connect(
+            self._database, timeout=self._timeout, check_same_thread=False)
+
+    def _reader(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+            with self._readers_lock:
+                self._readers.append(connection)
+        return connection
+
+    def _get_row(self, columns, pid):
+        row = self._reader().execute(
+            "SELECT {} FROM processes WHERE pid = ?".format(columns),
+            (str(pid),)).fetchone()
+        if row is None:
+            raise ValueError(
+                "Not checkpoint with pid '{}' could be found".format(pid))
+        return row
+
+    def _is_persisted(self, pid):
+        return self._reader().execute(
+            "SELECT 1 FROM processes WHERE pid = ?",
+            (str(pid),)).fetchone() is not None
+
+    def _write(self, sql, params, wait=True):
+        with self._write_condition:
+            assert not self._closed, "The database has been closed"
+            batch = self._batch
+            batch.statements.append((sql, params))
+            self._write_condition.notify()
+        if wait:
+            batch.wait()
+
+    def _write_loop(self, connection):
+        try:
+            while True:
+                with self._write_condition:
+                    while not self._batch.statements and not self._closed:
+                        self._write_condition.wait()
+                    if not self._batch.statements:
+                        # Closed and nothing left to write
+                        return
+                    batch = self._batch
+                    self._batch = _Batch()
+                    self._committing = batch
+                self._commit(connection, batch)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _commit(connection, batch):
+        try:
+            with tracing.span("commit checkpoints", "persistence",
+                              num=str(len(batch.statements))):
+                # Commits, or rolls back if there's an exception
+                with connection:
+                    for sql, params in batch.statements:
+                        connection.execute(sql, params)
+        except BaseException as e:
+            LOGGER.exception("Exception raised committing checkpoints")
+            batch.exception = e
+        finally:
+            batch.done.set()
+
+
+def _state_name(process):
+    state = process.state
+    return None if state is None else state.name
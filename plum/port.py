@@ -3,6 +3,11 @@
 from abc import ABCMeta
 import collections
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class ValueSpec(object):
     """
@@ -111,7 +116,7 @@ class InputPort(Port):
 
     def __str__(self):
         desc = [super(InputPort, self).__str__()]
-        if self.default:
+        if self.default is not None:
             desc.append(str(self.default))
 
         return "->" + ",".join(desc)
@@ -150,14 +155,93 @@ class InputGroupPort(InputPort):
             return False, msg
 
         if value is not None and self._valid_inner_type is not None:
-            # Check that all the members of the dictionary are of the right type
-            for k, v in value.iteritems():
-                if not isinstance(v, self._valid_inner_type):
-                    return False, "Group port value {} is not of the right type".format(
-                        k)
+            # Check that all the members of the dictionary are of the right
+            # type, only look for the culprit if there is one
+            valid_type = self._valid_inner_type
+            if not all(isinstance(v, valid_type) for v in value.itervalues()):
+                for k, v in value.iteritems():
+                    if not isinstance(v, valid_type):
+                        return False, "Group port value {} is not of the right type".format(
+                            k)
+
+        return True, None
+
+
+class _ArraySpecMixin(object):
+    """
+    Checks that a value is a NumPy array with a given dtype and shape.  The
+    checks only look at the array header so they take the same time however
+    big the array is, and the array is never copied.
+    """
+
+    def _init_array_spec(self, dtype, shape):
+        """
+        :param dtype: The (optional) dtype the array must have
+        :param shape: The (optional) shape the array must have, a dimension of
+            None matches any size
+        :type shape: tuple
+        """
+        assert numpy is not None, "Array ports need numpy"
+        self._dtype = None if dtype is None else numpy.dtype(dtype)
+        self._shape = None if shape is None else tuple(shape)
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def shape(self):
+        return self._shape
 
+    def _validate_array(self, value):
+        if value is None:
+            return True, None
+        if self._dtype is not None and value.dtype != self._dtype:
+            return False, "array '{}' has the wrong dtype. " \
+                          "Got '{}', expected '{}'".format(
+                                self.name, value.dtype, self._dtype)
+        if self._shape is not None:
+            shape = value.shape
+            if len(shape) != len(self._shape) or \
+                    any(expected is not None and expected != actual
+                        for expected, actual in zip(self._shape, shape)):
+                return False, "array '{}' has the wrong shape. " \
+                              "Got '{}', expected '{}'".format(
+                                    self.name, shape, self._shape)
         return True, None
 
+    def _array_description(self):
+        desc = []
+        if self._dtype is not None:
+            desc.append("dtype: {}".format(self._dtype))
+        if self._shape is not None:
+            desc.append("shape: {}".format(self._shape))
+        return desc
+
+
+class ArrayInputPort(_ArraySpecMixin, InputPort):
+    """
+    An input port for a NumPy array with an (optional) dtype and shape.
+    """
+    def __init__(self, name, dtype=None, shape=None, help=None, default=None,
+                 required=True, validator=None):
+        # Has to be set up before the super constructor validates the default
+        self._init_array_spec(dtype, shape)
+        super(ArrayInputPort, self).__init__(
+            name, valid_type=numpy.ndarray, help=help, default=default,
+            required=required, validator=validator)
+
+    def get_description(self):
+        return ", ".join(
+            [super(ArrayInputPort, self).get_description()] +
+            self._array_description())
+
+    def validate(self, value):
+        valid, msg = super(ArrayInputPort, self).validate(value)
+        if not valid:
+            return False, msg
+        return self._validate_array(value)
+
 
 class DynamicInputPort(InputPort):
     """
@@ -192,3 +276,24 @@ class DynamicOutputPort(OutputPort):
     def __init__(self, valid_type=None):
         super(DynamicOutputPort, self).__init__(
             self.NAME, valid_type=valid_type, required=False)
+
+
+class ArrayOutputPort(_ArraySpecMixin, OutputPort):
+    """
+    An output port for a NumPy array with an (optional) dtype and shape.
+    """
+    def __init__(self, name, dtype=None, shape=None, required=True):
+        self._init_array_spec(dtype, shape)
+        super(ArrayOutputPort, self).__init__(
+            name, valid_type=numpy.ndarray, required=required)
+
+    def get_description(self):
+        return ", ".join(
+            [super(ArrayOutputPort, self).get_description()] +
+            self._array_description())
+
+    def validate(self, value):
+        valid, msg = super(ArrayOutputPort, self).validate(value)
+        if not valid:
+            return False, msg
+        return self._validate_array(value)
@@ -6,9 +6,18 @@ from abc import ABCMeta, abstractmethod
 from collections import namedtuple
 import threading
 import sys
+import time
 import traceback
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 import plum.error as error
+import plum.knowledge_provider as knowledge_provider
+import plum.result_cache as result_cache
+import plum.tracing as tracing
 from plum.wait import Interrupted
 from plum.persistence.bundle import Bundle
 from plum.process_listener import ProcessListener
@@ -45,7 +54,8 @@ class _Unlock(object):
         self._lock.release()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self._lock.acquire()
+        with tracing.span("reacquire state lock", "lock"):
+            self._lock.acquire()
 
 
 class Process(object):
@@ -142,6 +152,74 @@ class Process(object):
         proc._perform_create()
         return proc
 
+    @classmethod
+    def new_many(cls, inputs_iterable, logger=None):
+        """
+        Create a new instance of this Process class for each of the given
+        sets of inputs.  All the inputs are validated before any of the
+        processes are created so if any are invalid nothing is created.
+
+        :param inputs_iterable: An iterable of inputs, one for each process
+        :param logger: The logger for the processes to use, can be None.
+        :type logger: :class:`logging.Logger`
+        :return: A list of new :class:`Process` instances in the same order
+            as the inputs.
+        :rtype: list
+        """
+        return [cls._new_validated(inputs, logger)
+                for inputs in cls._validate_many(inputs_iterable)]
+
+    @classmethod
+    def new_many_chunked(cls, inputs_iterable, chunk_size, logger=None):
+        """
+        Like :func:`new_many` but the processes are only created a chunk at a
+        time as the returned iterator is consumed, so they don't all have to
+        exist before the first ones are used.  All the inputs are still
+        validated straight away.
+
+        :param inputs_iterable: An iterable of inputs, one for each process
+        :param chunk_size: The (maximum) number of processes in each chunk
+        :type chunk_size: int
+        :param logger: The logger for the processes to use, can be None.
+        :type logger: :class:`logging.Logger`
+        :return: An iterator of lists of new :class:`Process` instances, in
+            the same order as the inputs
+        """
+        assert chunk_size > 0, "The chunk size must be positive"
+        return cls._new_chunks(
+            cls._validate_many(inputs_iterable), chunk_size, logger)
+
+    @classmethod
+    def _validate_many(cls, inputs_iterable):
+        """
+        :return: The inputs as a list
+        :raises ValueError: If any of the inputs are invalid
+        """
+        all_inputs = list(inputs_iterable)
+
+        spec = cls.spec()
+        spec.seal()
+        for inputs in all_inputs:
+            valid, msg = spec.validate(inputs)
+            if not valid:
+                raise ValueError(msg)
+        return all_inputs
+
+    @classmethod
+    def _new_chunks(cls, all_inputs, chunk_size, logger):
+        for i in range(0, len(all_inputs), chunk_size):
+            yield [cls._new_validated(inputs, logger)
+                   for inputs in all_inputs[i:i + chunk_size]]
+
+    @classmethod
+    def _new_validated(cls, inputs, logger):
+        proc = Process.__new__(cls, inputs, None, logger)
+        proc.__create_guard = True
+        proc.__inputs_checked = True
+        proc.__init__(inputs, None, logger)
+        proc._perform_create()
+        return proc
+
     @staticmethod
     def load(bundle, logger=None):
         """
@@ -220,6 +298,8 @@ class Process(object):
     def __new__(cls, inputs, pid, logger=None):
         obj = super(Process, cls).__new__(cls)
         obj.__create_guard = False
+        # Set if the inputs have already been validated against the spec
+        obj.__inputs_checked = False
         return obj
 
     def __init__(self, inputs, pid, logger=None):
@@ -241,7 +321,8 @@ class Process(object):
         self.spec().seal()
 
         # Input/output
-        self._check_inputs(inputs)
+        if not self.__inputs_checked:
+            self._check_inputs(inputs)
         self._raw_inputs = None if inputs is None else util.AttributesFrozendict(inputs)
         self._parsed_inputs = util.AttributesFrozendict(self.create_input_args(self.raw_inputs))
         self._outputs = {}
@@ -264,11 +345,16 @@ class Process(object):
 
         # RUNTIME STATE ##
         # Stuff below here doesn't need to be saved in the instance state
+        self.__creation_time = time.time()
         # Reads/writes of variables with 'protect' suffix should be guarded by
         # the state lock
         self.__pausing_protect = False
         self.__aborting_protect = False
         self.__playing = False
+        self.__block_on_wait = True
+        self.__suspended = False
+        # Set if the outputs came from the result cache
+        self.__outputs_cached = False
         self.__state_lock = threading.Lock()
 
         # Events and running
@@ -281,6 +367,14 @@ class Process(object):
     def pid(self):
         return self._pid
 
+    @property
+    def creation_time(self):
+        """
+        The time (as given by time.time()) that this process object was
+        created, either new or loaded from a saved state.
+        """
+        return self.__creation_time
+
     @property
     def raw_inputs(self):
         return self._raw_inputs
@@ -425,25 +519,52 @@ class Process(object):
     def start(self):
         return self.play()
 
-    def play(self):
+    def play(self, block_on_wait=True):
         """
         Play the process.
+
+        By default this call blocks while the process is WAITING.  If
+        block_on_wait is False and the process starts waiting on something
+        that is not yet done then this call returns straight away, leaving the
+        process WAITING and still playing.  It is then up to the caller to call
+        play() again once the wait on is done (see
+        :func:`plum.wait.WaitOn.add_done_callback`) or the process has been
+        paused or aborted, at which point it will carry on from where it left
+        off.  This means that a waiting process doesn't need a thread to be
+        blocked on its behalf.
+
+        :param block_on_wait: If True block while waiting, otherwise return
+        :type block_on_wait: bool
         """
-        assert not self.__playing, \
-            "Cannot execute a process twice simultaneously"
+        with self.__state_lock:
+            continuing = self.__suspended
+            self.__suspended = False
+        if not continuing:
+            assert not self.__playing, \
+                "Cannot execute a process twice simultaneously"
+        self.__block_on_wait = block_on_wait
 
         try:
             try:
-                MONITOR.register_process(self)
-                with self.__state_lock:
-                    self._call_with_super_check(self.on_playing)
+                if not continuing:
+                    MONITOR.register_process(self)
+                    with self.__state_lock:
+                        self._call_with_super_check(self.on_playing)
 
                 # Keep going until we run out of tasks
+                tracer = tracing.get_tracer()
                 fn = self._next()
                 while fn is not None:
                     with self.__state_lock:
                         self._next_transition = None
-                        fn()
+                        if tracer is None:
+                            fn()
+                        else:
+                            with tracer.span(
+                                    fn.__name__, "transition",
+                                    {'pid': str(self.pid),
+                                     'class': self.get_name()}):
+                                fn()
                     fn = self._next()
 
             except BaseException as e:
@@ -451,13 +572,15 @@ class Process(object):
                 self._perform_fail_noraise(e)
                 return
         finally:
-            try:
-                MONITOR.deregister_process(self)
-                self._call_with_super_check(self.on_done_playing)
-            except BaseException as e:
-                if self.state != ProcessState.FAILED:
-                    exc_type, value, tb = sys.exc_info()
-                    self._perform_fail_noraise(e)
+            # If we are only suspended then we are still playing
+            if not self.__suspended:
+                try:
+                    MONITOR.deregister_process(self)
+                    self._call_with_super_check(self.on_done_playing)
+                except BaseException as e:
+                    if self.state != ProcessState.FAILED:
+                        exc_type, value, tb = sys.exc_info()
+                        self._perform_fail_noraise(e)
 
         return self._outputs
 
@@ -621,21 +744,17 @@ class Process(object):
 
     @protected
     def out(self, output_port, value):
-        dynamic = False
         # Do checks on the outputs
-        try:
+        lookup = self.spec().lookup_output(output_port)
+        if lookup is None:
+            raise TypeError(
+                "Process trying to output on unknown output port {}, "
+                "and does not have a dynamic output port in spec.".
+                    format(output_port))
+
+        port, dynamic = lookup
+        if dynamic:
             # Check types (if known)
-            port = self.spec().get_output(output_port)
-        except KeyError:
-            if self.spec().has_dynamic_output():
-                dynamic = True
-                port = self.spec().get_dynamic_output()
-            else:
-                raise TypeError(
-                    "Process trying to output on unknown output port {}, "
-                    "and does not have a dynamic output port in spec.".
-                        format(output_port))
-
             if port.valid_type is not None and \
                     not isinstance(value, port.valid_type):
                 raise TypeError(
@@ -652,26 +771,35 @@ class Process(object):
             raise error.FastForwardError("Cannot fast-forward a process that "
                                          "is not deterministic")
 
-        # kp = knowledge_provider.get_global_provider()
-        kp = None
+        # See if the outputs have been cached
+        cache = result_cache.get_global_cache()
+        if cache is not None:
+            outputs = self._get_cached_outputs(cache)
+            if outputs is not None:
+                self.__outputs_cached = True
+                for name, value in outputs.iteritems():
+                    self.out(name, value)
+                return
+
+        kp = knowledge_provider.get_global_provider()
         if kp is None:
             raise error.FastForwardError("Cannot fast-forward because a global"
                                          "knowledge provider is not available")
 
         # Try and find out if anyone else has had the same inputs
         try:
-            pids = kp.get_pids_from_classname(util.fullname(self))
+            pids = kp.get_pids_from_inputs(util.fullname(self), self.inputs)
         except ValueError:
             pass
         else:
             for pid in pids:
                 try:
-                    if kp.get_inputs(pid) == self.inputs:
-                        for name, value in kp.get_outputs(pid).iteritems():
-                            self.out(name, value)
-                        return
+                    outputs = kp.get_outputs(pid)
                 except ValueError:
-                    pass
+                    continue
+                for name, value in outputs.iteritems():
+                    self.out(name, value)
+                return
 
         raise error.FastForwardError("Cannot fast forward")
 
@@ -740,22 +868,7 @@ class Process(object):
         :param inputs: The supplied input values.
         :return: A dictionary of inputs including any with default values
         """
-        if inputs is None:
-            ins = {}
-        else:
-            ins = dict(inputs)
-        # Go through the spec filling in any default and checking for required
-        # inputs
-        for name, port in self.spec().inputs.iteritems():
-            if name not in ins:
-                if port.default:
-                    ins[name] = port.default
-                elif port.required:
-                    raise ValueError(
-                        "Value not supplied for required inputs port {}".format(name)
-                    )
-
-        return ins
+        return self.spec().fill_defaults(inputs)
 
     # region State transition methods
     def _next(self):
@@ -769,9 +882,13 @@ class Process(object):
             if self.has_terminated():
                 return None
             elif self.__pausing_protect:
+                self.__suspended = False
                 return None
             elif self.__aborting_protect:
+                self.__suspended = False
                 return self._perform_abort
+            elif self.__suspended:
+                return None
             else:
                 return self._next_transition
 
@@ -825,6 +942,12 @@ class Process(object):
             self._state = ProcessState.WAITING
             self._call_with_super_check(self.on_wait)
 
+        if not self.__block_on_wait and not self._wait.on.is_done():
+            # Hand back control, we'll be played again when it's done
+            self._next_transition = self._perform_wait
+            self.__suspended = True
+            return
+
         try:
             with _Unlock(self.__state_lock):
                 self._wait.on.wait()
@@ -867,6 +990,7 @@ class Process(object):
         assert self.state is ProcessState.RUNNING
 
         self._call_with_super_check(self.on_finish)
+        self._cache_outputs()
         self._to_stopped()
 
     def _perform_abort(self):
@@ -934,6 +1058,33 @@ class Process(object):
 
     # endregion
 
+    def _get_cached_outputs(self, cache):
+        try:
+            return cache.get(self._get_cache_key())
+        except BaseException as e:
+            self._cache_failed("Failed to get cached outputs", e)
+            return None
+
+    def _cache_outputs(self):
+        if not self.spec().is_deterministic() or self.__outputs_cached:
+            return
+
+        cache = result_cache.get_global_cache()
+        if cache is None:
+            return
+
+        try:
+            cache.put(self._get_cache_key(), self._outputs)
+        except BaseException as e:
+            self._cache_failed("Failed to cache outputs", e)
+
+    def _get_cache_key(self):
+        return result_cache.make_key(util.fullname(self), self.inputs)
+
+    def _cache_failed(self, msg, exception):
+        # Not being able to use the cache shouldn't affect the process
+        LOGGER.warning("{} of process '{}': {}".format(msg, self.pid, exception))
+
     def _check_inputs(self, inputs):
         # Check the inputs meet the requirements
         valid, msg = self.spec().validate(inputs)
@@ -942,11 +1093,10 @@ class Process(object):
 
     def _check_outputs(self):
         # Check that the necessary outputs have been emitted
-        for name, port in self.spec().outputs.iteritems():
-            valid, msg = port.validate(self._outputs.get(name, None))
-            if not valid:
-                raise RuntimeError("Process {} failed because {}".
-                                   format(self.get_name(), msg))
+        valid, msg = self.spec().validate_outputs(self._outputs)
+        if not valid:
+            raise RuntimeError("Process {} failed because {}".
+                               format(self.get_name(), msg))
 
     @abstractmethod
     def _run(self, **kwargs):
@@ -966,22 +1116,24 @@ class FunctionProcess(Process):
         args, varargs, keywords, defaults = inspect.getargspec(func)
 
         def _define(cls, spec):
+            super(FunctionProcess, cls).define(spec)
             for i in range(len(args)):
                 default = None
                 if defaults and len(defaults) - len(args) + i >= 0:
-                    default = defaults[i]
+                    default = defaults[len(defaults) - len(args) + i]
                 spec.input(args[i], default=default)
 
             spec.output(output_name)
 
-        return type(func.__name__, (FunctionProcess,),
+        return type(func.__name__, (cls,),
                     {Process.define.__name__: classmethod(_define),
-                     '_func': func,
+                     '__module__': func.__module__,
+                     '_func': staticmethod(func),
                      '_func_args': args,
                      '_output_name': output_name})
 
-    def __init__(self):
-        super(FunctionProcess, self).__init__()
+    def __init__(self, inputs, pid, logger=None):
+        super(FunctionProcess, self).__init__(inputs, pid, logger)
 
     def _run(self, **kwargs):
         args = []
@@ -989,3 +1141,169 @@ class FunctionProcess(Process):
             args.append(kwargs.pop(arg))
 
         self.out(self._output_name, self._func(*args))
+
+
+class BatchedFunctionProcess(FunctionProcess):
+    """
+    A function process that maps the function over sequences (or NumPy
+    arrays) of inputs in a single process, rather than having a process per
+    value.  Inputs that are lists, tuples or arrays are mapped over and must
+    all have the same length, any other input is passed to every call.
+
+    The values are processed in chunks of `chunk_size`.  If the function is
+    vectorised it is called once per chunk with slices of the inputs,
+    otherwise it is called once per value.  The output is a NumPy array if
+    any of the inputs was (or the function is vectorised), otherwise a list.
+
+    A value that the function raises an exception for doesn't fail the whole
+    batch.  Its exception is emitted on the errors output as {index:
+    exception} and its place in the output is None, or masked if the output
+    is an array.  If a vectorised call raises, the values of that chunk are
+    retried one at a time to find the ones that fail.
+    """
+    # These will be replaced by build
+    _chunk_size = None
+    _vectorised = False
+    _errors_name = None
+
+    @classmethod
+    def build(cls, func, output_name="value", chunk_size=1024,
+              vectorised=False, errors_name="errors"):
+        """
+        :param func: The function to map
+        :param output_name: The name of the output port
+        :param chunk_size: The number of values to process at a time
+        :type chunk_size: int
+        :param vectorised: If True the function is called with slices of the
+            inputs (it must support NumPy arrays), otherwise it is called
+            with one value at a time
+        :type vectorised: bool
+        :param errors_name: The name of the (optional) output port that the
+            exceptions of any values that failed are emitted on
+        """
+        assert chunk_size > 0, "The chunk size must be positive"
+        assert not vectorised or numpy is not None, \
+            "Vectorised functions need numpy"
+
+        proc_class = super(BatchedFunctionProcess, cls).build(
+            func, output_name)
+        define = proc_class.__dict__[Process.define.__name__].__func__
+
+        def _define(cls, spec):
+            define(cls, spec)
+            spec.optional_output(errors_name)
+
+        setattr(proc_class, Process.define.__name__, classmethod(_define))
+        proc_class._chunk_size = chunk_size
+        proc_class._vectorised = vectorised
+        proc_class._errors_name = errors_name
+        return proc_class
+
+    def _run(self, **kwargs):
+        args = [kwargs.pop(arg) for arg in self._func_args]
+
+        mapped = [i for i, arg in enumerate(args) if _is_batch(arg)]
+        lengths = set(len(args[i]) for i in mapped)
+        if len(lengths) > 1:
+            raise ValueError(
+                "The sequence inputs must all be the same length, got "
+                "lengths {}".format(sorted(lengths)))
+        length = lengths.pop() if lengths else 1
+        as_array = self._vectorised or \
+            (numpy is not None and
+             any(isinstance(args[i], numpy.ndarray) for i in mapped))
+
+        if self._vectorised:
+            # Make sure slicing doesn't copy
+            for i in mapped:
+                args[i] = numpy.asarray(args[i])
+
+        # Without anything to map over there is only the one call, if that
+        # fails so does the process
+        errors = {} if mapped else None
+        chunks = []
+        for start in range(0, length, self._chunk_size):
+            end = min(start + self._chunk_size, length)
+            if self._vectorised:
+                chunks.append(
+                    self._call_chunk(args, mapped, start, end, errors))
+            else:
+                chunks.append(
+                    self._map_chunk(args, mapped, start, end, errors))
+
+        if errors:
+            if as_array:
+                result = self._masked_array(chunks, errors)
+            else:
+                result = [value for chunk in chunks for value in chunk]
+            self.out(self._errors_name, errors)
+        elif as_array:
+            if not chunks:
+                result = numpy.empty(0)
+            elif self._vectorised:
+                result = numpy.concatenate(chunks)
+            else:
+                result = numpy.array(
+                    [value for chunk in chunks for value in chunk])
+        else:
+            result = [value for chunk in chunks for value in chunk]
+
+        self.out(self._output_name, result)
+
+    def _call_chunk(self, args, mapped, start, end, errors):
+        chunk_args = list(args)
+        for i in mapped:
+            chunk_args[i] = args[i][start:end]
+        try:
+            return numpy.asarray(self._func(*chunk_args))
+        except Exception:
+            if errors is None:
+                raise
+
+        # Find the values that are to blame by calling with one at a time
+        results = []
+        for j in range(start, end):
+            for i in mapped:
+                chunk_args[i] = args[i][j:j + 1]
+            try:
+                results.append(numpy.asarray(self._func(*chunk_args))[0])
+            except Exception as e:
+                errors[j] = e
+                results.append(None)
+        return results
+
+    def _map_chunk(self, args, mapped, start, end, errors):
+        call_args = list(args)
+        results = []
+        for j in range(start, end):
+            for i in mapped:
+                call_args[i] = args[i][j]
+            try:
+                results.append(self._func(*call_args))
+            except Exception as e:
+                if errors is None:
+                    raise
+                errors[j] = e
+                results.append(None)
+        return results
+
+    @staticmethod
+    def _masked_array(chunks, errors):
+        values = [value for chunk in chunks for value in chunk]
+        ok = [j for j in range(len(values)) if j not in errors]
+        if not ok:
+            return numpy.ma.masked_all((len(values),), dtype=object)
+
+        # Stand in a good value for the failed ones so the array has the
+        # right type, they are masked anyway
+        fill = values[ok[0]]
+        result = numpy.ma.masked_array(numpy.array(
+            [fill if j in errors else value
+             for j, value in enumerate(values)]))
+        result[sorted(errors)] = numpy.ma.masked
+        return result
+
+
+def _is_batch(value):
+    return isinstance(value, (list, tuple)) or \
+           (numpy is not None and isinstance(value, numpy.ndarray))
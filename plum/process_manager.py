@@ -1,14 +1,173 @@
+import functools
+import Queue
 import threading
-from concurrent.futures import ThreadPoolExecutor
+import time
+import traceback
+from collections import namedtuple
 import concurrent.futures
+from concurrent.futures import FIRST_COMPLETED, FIRST_EXCEPTION, \
+    ALL_COMPLETED
+from plum.executor import PriorityExecutor
 from plum.process import ProcessListener
+from plum.registry import ShardedRegistry
 from plum.util import override, protected
 from plum.exceptions import TimeoutError
+from plum._base import LOGGER
 
 
-class _ProcInfo(object):
-    def __init__(self, proc, thread):
+class ProcessStepper(object):
+    """
+    Plays a process a step at a time without blocking on what it waits on.
+    A step plays the process until it terminates or suspends waiting on
+    something, and the next step is submitted once the wait on is done.  A
+    suspended process that is asked to pause or abort is stepped again so
+    that it can act on the request.
+
+    This is the scheduling shared by the process managers that don't give
+    waiting processes a thread, they only differ in how a step gets run.
+    """
+
+    def __init__(self, proc, submit, lock=None):
+        """
+        :param proc: The process
+        :type proc: :class:`plum.process.Process`
+        :param submit: Called with this stepper to have its :func:`step`
+            run later (e.g. on a thread pool or an event loop), it shouldn't
+            run it straight away
+        :param lock: The (optional) lock guarding the scheduling state, this
+            can be shared between steppers
+        """
         self.proc = proc
+        self._submit = submit
+        self._lock = lock if lock is not None else threading.Lock()
+        # Is there a step submitted, or running
+        self.scheduled = False
+        # Should the next step play the process if it isn't playing
+        self.play_requested = False
+        # Should a suspended process be played again so it can act on a pause
+        # or abort request
+        self.wind_down = False
+        self.not_playing = threading.Event()
+        self.not_playing.set()
+
+    def request_play(self):
+        """
+        Play the process at its next step, submitting one if necessary.
+        """
+        with self._lock:
+            self.play_requested = True
+            self.wind_down = False
+            self.not_playing.clear()
+            self._schedule()
+
+    def admit(self):
+        """
+        Get ready to play the process for the first time, the caller submits
+        the first step itself.
+        """
+        with self._lock:
+            self.play_requested = True
+            self.not_playing.clear()
+            self.scheduled = True
+
+    def withdraw(self):
+        """
+        Undo :func:`admit` if the first step couldn't be submitted.
+        """
+        with self._lock:
+            self.play_requested = False
+            self.scheduled = False
+            self.not_playing.set()
+
+    def request_stop(self, request):
+        """
+        Ask the process to stop playing and make sure that it gets the chance
+        to act on the request even if it is suspended waiting on something.
+
+        :param request: Callable that makes the request (pause or abort), it
+            is passed the process
+        :return: True if the process has to be waited for, False if it
+            wasn't playing in the first place
+        """
+        with self._lock:
+            self.play_requested = False
+            if not (self.proc.is_playing() or self.scheduled):
+                return False
+            self.wind_down = True
+
+        # Don't hold the lock while talking to the process, it may be firing
+        # messages that lead back to us
+        request(self.proc)
+        with self._lock:
+            self._schedule()
+        return True
+
+    def step(self):
+        proc = self.proc
+        with self._lock:
+            run = not proc.has_terminated() and \
+                  (proc.is_playing() or self.play_requested)
+            self.play_requested = False
+
+        try:
+            if run:
+                proc.play(block_on_wait=False)
+        finally:
+            with self._lock:
+                self.scheduled = False
+                suspended = proc.is_playing()
+                if not suspended:
+                    self.not_playing.set()
+                elif self.wind_down:
+                    # Someone asked us to stop while we were playing
+                    self._schedule()
+                    suspended = False
+
+        if suspended:
+            wait_on = proc.get_waiting_on()
+            if wait_on is not None:
+                wait_on.add_done_callback(self._wait_done)
+
+    @staticmethod
+    def wait_stopped(steppers, timeout=None):
+        """
+        Wait for processes to stop playing, with a single deadline for all of
+        them.
+
+        :param steppers: The steppers of the processes
+        :param timeout: The (optional) maximum time to wait for all of them
+        :return: The pids of the processes that didn't stop in time
+        :rtype: list
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        failed = []
+        for stepper in steppers:
+            remaining = None if deadline is None \
+                else max(deadline - time.time(), 0.)
+            if not stepper.not_playing.wait(remaining):
+                failed.append(stepper.proc.pid)
+        return failed
+
+    def _schedule(self):
+        """
+        Submit a step unless there already is one.  The lock must be held by
+        the caller.
+        """
+        if not self.scheduled:
+            self.scheduled = True
+            self._submit(self)
+
+    def _wait_done(self, wait_on):
+        with self._lock:
+            if self.proc.is_playing() and not self.wind_down:
+                self._schedule()
+
+
+class _ProcInfo(ProcessStepper):
+    def __init__(self, proc, priority, submit, lock):
+        # The stepping is only used when not blocking on waits
+        super(_ProcInfo, self).__init__(proc, submit, lock)
+        self.priority = priority
         self.executor_future = None
 
 
@@ -25,11 +184,12 @@ class Future(ProcessListener):
         """
         self._procman = procman
         self._process = process
+        self._lock = threading.Lock()
         self._terminated = threading.Event()
-        self._process.add_process_listener(self)
         self._callbacks = []
+        self._process.add_process_listener(self)
         if self._process.has_terminated():
-            self._terminated.set()
+            self._terminate()
 
     @property
     def pid(self):
@@ -51,6 +211,13 @@ class Future(ProcessListener):
         """
         return self._process.outputs
 
+    def done(self):
+        """
+        :return: True if the process has finished, failed or been aborted
+        :rtype: bool
+        """
+        return self._terminated.is_set()
+
     def result(self, timeout=None):
         """
         This method will block until the process has finished producing outputs
@@ -71,6 +238,18 @@ class Future(ProcessListener):
         else:
             raise TimeoutError()
 
+    def exception(self, timeout=None):
+        """
+        Block until the process has terminated and return the exception it
+        failed with, if any.
+
+        :param timeout: (optional) maximum time to wait for process to finish
+        :return: The exception or None if the process didn't fail
+        """
+        if not self._terminated.wait(timeout):
+            raise TimeoutError()
+        return self._process.get_exception()
+
     def abort(self, msg=None, timeout=None):
         return self._procman.abort(self.pid, msg, timeout)
 
@@ -89,10 +268,41 @@ class Future(ProcessListener):
             return True
 
     def add_done_callback(self, fn):
-        if self._terminated.is_set():
-            fn(self)
-        else:
-            self._callbacks.append(fn)
+        """
+        Add a callback to be called with this future once the process has
+        terminated.  If it already has the callback is called straight away,
+        otherwise it is called on the thread that terminates the process so
+        it should be quick.
+
+        :param fn: The callback
+        """
+        with self._lock:
+            if not self._terminated.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def then(self, fn):
+        """
+        Chain a function to be called with the outputs of the process once it
+        has finished, without blocking.  If the process fails the returned
+        future gets its exception instead.
+
+        :param fn: The function, it is passed the final outputs
+        :return: A future for the return value of the function
+        :rtype: :class:`concurrent.futures.Future`
+        """
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+
+        def _chain(done):
+            try:
+                future.set_result(fn(done.result(0)))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self.add_done_callback(_chain)
+        return future
 
     @protected
     def on_process_finish(self, process):
@@ -102,27 +312,400 @@ class Future(ProcessListener):
     def on_process_fail(self, process):
         self._terminate()
 
+    @protected
+    def on_process_stop(self, process):
+        # Catches processes that were aborted
+        self._terminate()
+
     def _terminate(self):
-        self._terminated.set()
-        for fn in self._callbacks:
+        with self._lock:
+            if self._terminated.is_set():
+                return
+            self._terminated.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for fn in callbacks:
+            fn(self)
+
+
+class FutureSet(ProcessListener):
+    """
+    A collection of futures for processes that were launched together.  A
+    single listener is shared by all the processes rather than having one
+    :class:`Future` (and listener) per process.  Individual futures are only
+    created if asked for by indexing.
+    """
+
+    def __init__(self, procman, processes, num_processes=None):
+        """
+        :param procman: The process manager that the processes belong to
+        :type procman: :class:`ProcessManager`
+        :param processes: The processes, in the order they were launched
+        :type processes: list
+        :param num_processes: The number of processes there will be once the
+            rest have been added (by the process manager), defaults to the
+            number given
+        :type num_processes: int
+        """
+        self._procman = procman
+        self._processes = []
+        self._num_processes = len(processes) if num_processes is None \
+            else num_processes
+        self._lock = threading.Lock()
+        self._terminated_pids = set()
+        self._all_terminated = threading.Event()
+        self._callbacks = []
+
+        if self._num_processes == 0:
+            self._all_terminated.set()
+        self._add(processes)
+
+    def __len__(self):
+        return len(self._processes)
+
+    def __getitem__(self, index):
+        return Future(self._procman, self._processes[index])
+
+    def __iter__(self):
+        for i in range(len(self._processes)):
+            yield self[i]
+
+    @property
+    def pids(self):
+        return [proc.pid for proc in self._processes]
+
+    def num_done(self):
+        """
+        :return: The number of processes that have terminated
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._terminated_pids)
+
+    def done(self):
+        """
+        :return: True if all the processes have terminated, False otherwise
+        :rtype: bool
+        """
+        return self._all_terminated.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for all the processes to terminate.
+
+        :param timeout: The (optional) timeout
+        :return: True if they all terminated, False if the timeout was reached
+        """
+        return self._all_terminated.wait(timeout)
+
+    def results(self, timeout=None):
+        """
+        Block until all the processes have terminated and return their outputs
+        in the order that the processes were launched.  If any of the processes
+        failed its exception is raised.
+
+        :param timeout: (optional) maximum time to wait for the processes
+        :return: A list of the final outputs
+        :rtype: list
+        """
+        if not self._all_terminated.wait(timeout):
+            raise TimeoutError()
+
+        for proc in self._processes:
+            if proc.has_failed():
+                raise proc.get_exception()
+        return [proc.outputs for proc in self._processes]
+
+    def exceptions(self):
+        """
+        :return: A list with the exception of each process (None if it didn't
+            fail) in the order that the processes were launched
+        :rtype: list
+        """
+        return [proc.get_exception() for proc in self._processes]
+
+    def abort(self, msg=None, timeout=None):
+        result = True
+        for proc in self._processes:
+            result &= self._call_procman(
+                self._procman.abort, proc.pid, msg, timeout)
+        return result
+
+    def pause(self, timeout=None):
+        result = True
+        for proc in self._processes:
+            result &= self._call_procman(
+                self._procman.pause, proc.pid, timeout)
+        return result
+
+    def play(self):
+        for proc in self._processes:
+            self._call_procman(self._procman.play, proc.pid)
+
+    def add_done_callback(self, fn):
+        """
+        Add a callback to be called with this set once all the processes have
+        terminated.
+
+        :param fn: The callback
+        """
+        with self._lock:
+            if not self._all_terminated.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    @protected
+    def on_process_finish(self, process):
+        self._terminate(process)
+
+    @protected
+    def on_process_fail(self, process):
+        self._terminate(process)
+
+    @protected
+    def on_process_stop(self, process):
+        # Catches processes that were aborted
+        self._terminate(process)
+
+    def _add(self, processes):
+        """
+        Add the next of the processes, before they are started.
+        """
+        processes = list(processes)
+        with self._lock:
+            self._processes.extend(processes)
+            assert len(self._processes) <= self._num_processes, \
+                "More processes than expected"
+        for proc in processes:
+            proc.add_process_listener(self)
+        for proc in processes:
+            if proc.has_terminated():
+                self._terminate(proc)
+
+    def _remove(self, processes):
+        """
+        Take back processes that couldn't be started.
+        """
+        with self._lock:
+            for proc in processes:
+                self._processes.remove(proc)
+                self._num_processes -= 1
+        for proc in processes:
+            proc.remove_process_listener(self)
+
+    def _call_procman(self, fn, pid, *args):
+        try:
+            return fn(pid, *args)
+        except ValueError:
+            # The process manager doesn't know about the process anymore
+            # because it is finished
+            return True
+
+    def _terminate(self, process):
+        with self._lock:
+            if process.pid in self._terminated_pids:
+                return
+            self._terminated_pids.add(process.pid)
+            if len(self._terminated_pids) < self._num_processes:
+                return
+            self._all_terminated.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for fn in callbacks:
             fn(self)
 
 
+class StopReport(object):
+    """
+    The outcome of asking a number of processes to stop playing.  It is True
+    if they all stopped in time.
+    """
+
+    def __init__(self, num_processes, failed):
+        """
+        :param num_processes: The number of processes that were playing
+        :param failed: The pids of the processes that didn't stop in time
+        """
+        self.num_processes = num_processes
+        self.failed = failed
+
+    def __nonzero__(self):
+        return not self.failed
+
+    __bool__ = __nonzero__
+
+    def __repr__(self):
+        return "<StopReport {} stopped, failed: {}>".format(
+            self.num_processes - len(self.failed), self.failed)
+
+
+def _pause(proc):
+    proc.pause()
+
+
+def _abort(proc, msg=None):
+    proc.abort(msg)
+
+
 def wait_for_all(futures):
     for future in futures:
         future.wait()
 
 
+DoneAndNotDone = namedtuple('DoneAndNotDone', ['done', 'not_done'])
+
+
+def as_completed(futures, timeout=None):
+    """
+    Iterate over futures as they complete, whichever finishes first comes out
+    first.  Futures that are already done come out straight away.  No thread
+    is blocked per future, each one just tells the iterator when it is done.
+
+    This works with :class:`Future` and :class:`concurrent.futures.Future`
+    (e.g. the ones returned by :func:`gather` and :func:`Future.then`).
+
+    :param futures: The futures
+    :param timeout: The (optional) maximum time to wait for all of them
+    :raises plum.exceptions.TimeoutError: If they are not all done in time
+    """
+    deadline = None if timeout is None else time.time() + timeout
+    futures = set(futures)
+    completed = Queue.Queue()
+    for future in futures:
+        future.add_done_callback(completed.put)
+
+    for _ in range(len(futures)):
+        remaining = None if deadline is None \
+            else max(deadline - time.time(), 0.)
+        try:
+            yield completed.get(timeout=remaining)
+        except Queue.Empty:
+            raise TimeoutError()
+
+
+def wait(futures, timeout=None, return_when=ALL_COMPLETED):
+    """
+    Wait for futures to complete, see :func:`concurrent.futures.wait`.
+
+    :param futures: The futures, see :func:`as_completed`
+    :param timeout: The (optional) maximum time to wait
+    :param return_when: When to return, one of FIRST_COMPLETED,
+        FIRST_EXCEPTION or ALL_COMPLETED
+    :return: The done and not done futures
+    :rtype: :class:`DoneAndNotDone`
+    """
+    futures = set(futures)
+    done = set()
+    try:
+        for future in as_completed(futures, timeout):
+            done.add(future)
+            if return_when == FIRST_COMPLETED or \
+                    (return_when == FIRST_EXCEPTION and _failed(future)):
+                break
+    except TimeoutError:
+        pass
+
+    return DoneAndNotDone(done, futures - done)
+
+
+def gather(futures):
+    """
+    Combine futures into one that completes once they all have, without
+    blocking.  Its result is the list of their results in the order they
+    were given.  If any of them fails the combined future gets its exception
+    as soon as it does.
+
+    :param futures: The futures, see :func:`as_completed`
+    :return: The combined future
+    :rtype: :class:`concurrent.futures.Future`
+    """
+    futures = list(futures)
+    gathered = concurrent.futures.Future()
+    gathered.set_running_or_notify_cancel()
+    lock = threading.Lock()
+    remaining = [len(futures)]
+
+    def _done(future):
+        failed = _failed(future)
+        with lock:
+            if remaining[0] == 0:
+                # Already failed
+                return
+            remaining[0] = 0 if failed else remaining[0] - 1
+            if remaining[0] > 0:
+                return
+        if failed:
+            gathered.set_exception(future.exception(0))
+        else:
+            gathered.set_result([f.result(0) for f in futures])
+
+    if not futures:
+        gathered.set_result([])
+    for future in futures:
+        future.add_done_callback(_done)
+    return gathered
+
+
+def _failed(future):
+    """
+    :return: True if the (done) future has an exception
+    """
+    return future.exception(0) is not None
+
+
 class ProcessManager(ProcessListener):
     """
-    Used to launch processes on multiple threads and monitor their progress
+    Used to launch processes on multiple threads and monitor their progress.
+
+    By default a process holds on to its thread for as long as it is playing,
+    including while it is WAITING.  If block_on_wait is False then a process
+    that starts waiting on something hands its thread back to the pool and is
+    put back on the run queue once the wait on is done, so the number of
+    threads needed depends on the number of processes that can actually run
+    rather than the total number of processes.
+
+    Processes are run in order of priority, which can be given when they are
+    launched or otherwise comes from the default priority in the spec of the
+    process class (see :func:`plum.process_spec.ProcessSpec.default_priority`).
+    This includes putting a process back on the run queue when what it was
+    waiting on is done.  Priorities age so that low priority processes still
+    make progress, see :class:`plum.executor.PriorityExecutor`.
+
+    The run queue can be bounded by giving a `max_queue_size`, in which case
+    launching (or starting) a process when the queue is full blocks until there
+    is space, gives up after a timeout or is rejected straight away depending
+    on the `block` and `timeout` arguments.  Either way a
+    :class:`plum.exceptions.QueueFull` is raised if the process can't be
+    queued.  Processes that have already been admitted (e.g. ones being put
+    back on the queue after waiting or being played again) are never held up
+    by the bound.  Note that a process that launches others from one of the
+    manager's threads can deadlock if it blocks on a full queue.
     """
 
-    def __init__(self, max_threads=1024):
-        self._processes = {}
-        self._executor = ThreadPoolExecutor(max_workers=max_threads)
+    def __init__(self, max_threads=1024, block_on_wait=True,
+                 aging_interval=1.0, max_queue_size=None):
+        """
+        :param max_threads: The maximum number of worker threads
+        :param block_on_wait: If True processes keep their thread while
+            waiting, otherwise they give it up until the wait on is done
+        :type block_on_wait: bool
+        :param aging_interval: The time (in seconds) that one unit of
+            priority is worth when ordering the run queue
+        :type aging_interval: float
+        :param max_queue_size: The (optional) maximum number of processes
+            waiting on the run queue, unbounded if None
+        :type max_queue_size: int
+        """
+        self._processes = ShardedRegistry()
+        self._executor = PriorityExecutor(
+            max_threads, aging_interval, max_queue_size=max_queue_size)
+        self._block_on_wait = block_on_wait
+        # Guards the scheduling state of the _ProcInfos
+        self._lock = threading.Lock()
 
-    def launch(self, proc_class, inputs=None, pid=None, logger=None):
+    def launch(self, proc_class, inputs=None, pid=None, logger=None,
+               priority=None, block=True, timeout=None):
         """
         Create a process and start it.
 
@@ -130,28 +713,97 @@ class ProcessManager(ProcessListener):
         :param inputs: The inputs to the process
         :param pid: The (optional) pid for the process
         :param logger: The (optional) logger for the process to use
+        :param priority: The (optional) priority of the process, higher values
+            are run first.  Defaults to that of the process spec.
+        :param block: If the run queue is full wait for space, otherwise
+            raise straight away
+        :param timeout: The (optional) maximum time to wait for space on the
+            run queue
         :return: A :class:`Future` representing the execution of the process
         :rtype: :class:`Future`
+        :raises plum.exceptions.QueueFull: If the run queue is full
         """
-        return self.start(proc_class.new(inputs, pid, logger))
+        return self.start(
+            proc_class.new(inputs, pid, logger), priority, block, timeout)
 
-    def start(self, proc):
+    def start(self, proc, priority=None, block=True, timeout=None):
         """
         Start an existing process.
 
         :param proc: The process to start
         :type proc: :class:`plum.process.Process`
+        :param priority: The (optional) priority of the process, higher values
+            are run first.  Defaults to that of the process spec.
+        :param block: If the run queue is full wait for space, otherwise
+            raise straight away
+        :param timeout: The (optional) maximum time to wait for space on the
+            run queue
         :return: A :class:`Future` representing the execution of the process
         :rtype: :class:`Future`
+        :raises plum.exceptions.QueueFull: If the run queue is full
         """
-        self._processes[proc.pid] = _ProcInfo(proc, None)
+        if priority is None:
+            priority = proc.spec().get_default_priority()
+        info = self._new_info(proc, priority)
+        self._processes[proc.pid] = info
         proc.add_process_listener(self)
-        self._play(proc)
+        try:
+            self._admit([info], block, timeout)
+        except BaseException:
+            # Never made it on to the run queue so forget about it
+            proc.remove_process_listener(self)
+            self._processes.pop(proc.pid, None)
+            raise
         return Future(self, proc)
 
+    def launch_many(self, proc_class, inputs_iterable, chunk_size=100,
+                    logger=None, priority=None):
+        """
+        Create and start a process for each of the given sets of inputs.  This
+        is considerably cheaper than calling :func:`launch` for each of them
+        as the processes are created and handed to the executor in chunks.
+
+        All the inputs are validated before anything is launched so if any
+        of them are invalid a ValueError is raised and no processes are
+        started.  After that each chunk of processes is created just before
+        it is started, so the first chunk can be running while the rest are
+        created.  If the run queue is bounded this blocks until there is
+        space for each chunk.  If a chunk can't be started its exception is
+        raised, the chunks before it carry on running.
+
+        :param proc_class: The process class
+        :param inputs_iterable: An iterable of inputs, one for each process
+        :param chunk_size: The number of processes to start at a time.  When
+            not blocking on waits each chunk is also played as a single
+            executor task.
+        :param logger: The (optional) logger for the processes to use
+        :param priority: The (optional) priority of the processes, higher
+            values are run first.  Defaults to that of the process spec.
+        :return: A :class:`FutureSet` for the processes
+        :rtype: :class:`FutureSet`
+        """
+        assert chunk_size > 0, "The chunk size must be positive"
+
+        if priority is None:
+            priority = proc_class.spec().get_default_priority()
+        all_inputs = list(inputs_iterable)
+        chunks = proc_class.new_many_chunked(all_inputs, chunk_size, logger)
+        futures = FutureSet(self, [], len(all_inputs))
+        for procs in chunks:
+            self._start_many(procs, priority, futures)
+        return futures
+
     def get_processes(self):
         return [info.proc for info in self._processes.values()]
 
+    def has_process(self, pid):
+        """
+        :param pid: The pid of a process
+        :return: True if the process is being managed by this manager
+        :rtype: bool
+        """
+        return pid in self._processes
+
     def play(self, pid):
         try:
             self._play(self._processes[pid].proc)
@@ -159,42 +811,70 @@ class ProcessManager(ProcessListener):
             raise ValueError("Unknown pid")
 
     def play_all(self):
-        for info in self._processes.itervalues():
+        for info in self._processes.values():
             self._play(info.proc)
 
     def pause(self, pid, timeout=None):
         try:
-            return self._pause(self._processes[pid].proc, timeout)
+            info = self._processes[pid]
         except KeyError:
             raise ValueError("Unknown pid")
+        return bool(self._stop_playing([info], _pause, timeout))
 
     def pause_all(self, timeout=None):
         """
         Pause all processes.  This is a blocking call and will wait until they
         are all paused before returning.
+
+        All the processes are asked to pause before waiting for any of them
+        so the timeout applies to the whole lot, not to each process.
+
+        :param timeout: The (optional) maximum time to wait for all of them
+        :return: A report that is True if all the processes paused in time
+        :rtype: :class:`StopReport`
         """
-        result = True
-        for info in self._processes.values():
-            result &= self._pause(info.proc, timeout=timeout)
-        return result
+        return self._stop_playing(self._processes.values(), _pause, timeout)
 
     def abort(self, pid, msg=None, timeout=None):
         try:
-            return self._abort(self._processes[pid].proc, msg, timeout)
+            info = self._processes[pid]
         except KeyError:
             raise ValueError("Unknown pid")
+        return bool(self._stop_playing(
+            [info], functools.partial(_abort, msg=msg), timeout))
 
     def abort_all(self, msg=None, timeout=None):
-        result = True
-        for info in self._processes.values():
-            result &= self._abort(info.proc, msg, timeout)
-        return result
+        """
+        Abort all processes, see :func:`pause_all`.
+
+        :param msg: The (optional) abort message
+        :param timeout: The (optional) maximum time to wait for all of them
+        :return: A report that is True if all the processes stopped in time
+        :rtype: :class:`StopReport`
+        """
+        return self._stop_playing(
+            self._processes.values(), functools.partial(_abort, msg=msg),
+            timeout)
 
     def wait_for(self, pid, timeout=None):
+        """
+        Wait for a process to stop playing, either because it terminated or
+        because it was paused.
+
+        :param pid: The process id
+        :param timeout: The (optional) timeout
+        :return: True if it stopped playing, False if the timeout was reached
+        """
         try:
-            self._processes[pid].executor_future.result(timeout)
+            info = self._processes[pid]
         except KeyError:
             raise ValueError("Unknown pid")
+
+        if not self._block_on_wait:
+            return info.not_playing.wait(timeout)
+
+        try:
+            info.executor_future.result(timeout)
         except concurrent.futures.TimeoutError:
             return False
 
@@ -203,10 +883,31 @@ class ProcessManager(ProcessListener):
     def get_num_processes(self):
         return len(self._processes)
 
-    def shutdown(self):
-        self.pause_all()
-        self._processes = {}
-        self._executor.shutdown(True)
+    def get_queue_depth(self):
+        """
+        Get the number of entries on the run queue waiting for a thread.  When
+        not blocking on waits a chunk of processes from :func:`launch_many`
+        counts as one entry.
+
+        :return: The queue depth
+        :rtype: int
+        """
+        return self._executor.get_queue_depth()
+
+    def shutdown(self, timeout=None):
+        """
+        Pause all the processes and shut down the threads.
+
+        :param timeout: The (optional) maximum time to wait for the processes
+            to pause.  If any of them don't the threads are left to finish
+            in their own time rather than being waited for.
+        :return: A report that is True if all the processes paused in time
+        :rtype: :class:`StopReport`
+        """
+        report = self.pause_all(timeout)
+        self._processes.clear()
+        self._executor.shutdown(wait=bool(report))
+        return report
 
     # region From ProcessListener
     @override
@@ -221,31 +922,112 @@ class ProcessManager(ProcessListener):
 
     # endregion
 
+    def _new_info(self, proc, priority):
+        return _ProcInfo(proc, priority, self._submit_step, self._lock)
+
     def _play(self, proc):
-        if not proc.is_playing():
-            info = self._processes[proc.pid]
-            info.executor_future = self._executor.submit(proc.play)
-
-    def _pause(self, proc, timeout=None):
-        if proc.is_playing():
-            info = self._processes[proc.pid]
-            proc.pause()
-            try:
-                info.executor_future.result(timeout)
-            except concurrent.futures.TimeoutError:
-                return False
+        info = self._processes[proc.pid]
+        if not self._block_on_wait:
+            info.request_play()
+        elif not proc.is_playing():
+            info.executor_future = self._executor.schedule(
+                proc.play, priority=info.priority, bounded=False)
 
-        return True
+    def _start_many(self, procs, priority, futures):
+        # The future set listens first so no terminations are missed
+        futures._add(procs)
+        infos = [self._new_info(proc, priority) for proc in procs]
+        for proc in procs:
+            proc.add_process_listener(self)
+        self._processes.update((info.proc.pid, info) for info in infos)
+        try:
+            self._admit(infos)
+        except BaseException:
+            # Forget about the ones that never made it on to the run queue
+            unstarted = [info.proc for info in infos
+                         if info.executor_future is None]
+            for proc in unstarted:
+                proc.remove_process_listener(self)
+                self._processes.pop(proc.pid, None)
+            futures._remove(unstarted)
+            raise
 
-    def _abort(self, proc, msg=None, timeout=None):
-        info = self._processes[proc.pid]
-        if proc.is_playing():
-            info.proc.abort(msg)
-            try:
-                info.executor_future.result(timeout)
-            except concurrent.futures.TimeoutError:
+    def _admit(self, infos, block=True, timeout=None):
+        """
+        Put newly started processes on the run queue, this is where the bound
+        on the queue is applied.  When not blocking on waits they go on as a
+        single entry.
+
+        :param infos: The process infos, all with the same priority
+        :raises plum.exceptions.QueueFull: If the run queue is full
+        """
+        priority = infos[0].priority
+
+        if self._block_on_wait:
+            # Each process needs a thread of its own as it may block
+            for info in infos:
+                info.executor_future = self._executor.schedule(
+                    info.proc.play, priority=priority, block=block,
+                    timeout=timeout)
+            return
+
+        for info in infos:
+            info.admit()
+
+        # The steppers' lock isn't held while (possibly) waiting for space as
+        # the workers need it to make progress
+        if len(infos) == 1:
+            fn, args = infos[0].step, ()
+        else:
+            fn, args = self._step_many, (infos,)
+        try:
+            executor_future = self._executor.schedule(
+                fn, args, priority=priority, block=block, timeout=timeout)
+        except BaseException:
+            for info in infos:
+                info.withdraw()
+            raise
+
+        for info in infos:
+            info.executor_future = executor_future
+
+    def _stop_playing(self, infos, request, timeout):
+        """
+        Ask processes to stop playing (by pausing or aborting them) and wait
+        for them to do so.  Every process is asked first and then they are
+        all waited for, so there is a single deadline.
+
+        :param infos: The infos of the processes
+        :param request: Callable that makes the request to a process, it is
+            passed the process
+        :param timeout: The (optional) maximum time to wait for all of them
+        :return: The report
+        :rtype: :class:`StopReport`
+        """
+        infos = [info for info in infos if self._request_stop(info, request)]
+        if self._block_on_wait:
+            futures = dict((info.executor_future, info.proc.pid)
+                           for info in infos)
+            not_done = concurrent.futures.wait(futures, timeout).not_done
+            return StopReport(len(infos), [futures[f] for f in not_done])
+
+        return StopReport(
+            len(infos), ProcessStepper.wait_stopped(infos, timeout))
+
+    def _request_stop(self, info, request):
+        """
+        Ask a process to stop playing.
+
+        :return: True if the process has to be waited for, False if it
+            wasn't playing in the first place
+        """
+        if self._block_on_wait:
+            if not info.proc.is_playing():
                 return False
-        return True
+            request(info.proc)
+            return True
+
+        return info.request_stop(request)
 
     def _delete_process(self, proc):
         """
@@ -254,4 +1036,29 @@ class ProcessManager(ProcessListener):
         # Get rid of the info but save the thread so we can join later
         # on shutdown
         proc.remove_process_listener(self)
-        del self._processes[proc.pid]
+        # May already have been forgotten by a shutdown that timed out
+        info = self._processes.pop(proc.pid, None)
+        if info is not None:
+            info.not_playing.set()
+
+    # region Scheduling used when not blocking on waits
+    def _submit_step(self, info):
+        """
+        Put the process back on the run queue, called by its stepper with
+        the lock held.
+        """
+        # Already admitted so not subject to the bound
+        info.executor_future = self._executor.schedule(
+            info.step, priority=info.priority, bounded=False)
+
+    def _step_many(self, infos):
+        for info in infos:
+            try:
+                info.step()
+            except BaseException:
+                # Don't let one process hold up the rest of the chunk
+                LOGGER.error(
+                    "Exception raised stepping process '{}':\n{}".format(
+                        info.proc.pid, traceback.format_exc()))
+
+    # endregion
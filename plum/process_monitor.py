@@ -1,7 +1,9 @@
 
+import threading
 from abc import ABCMeta
 from plum.process_listener import ProcessListener
-from plum.util import EventHelper, ListenContext, override
+from plum.registry import ShardedRegistry
+from plum.util import EventHelper, ListenContext, fullname, override
 
 
 class ProcessMonitorListener(object):
@@ -32,11 +34,32 @@ class ProcessMonitor(ProcessListener):
 
     Clients can listen for messages to indicate when a new process is registered
     and when processes terminate because of finishing or failing.
+
+    The monitor also keeps secondary indexes of the running processes by
+    state, by class and by parent, kept up to date from the process messages
+    it receives, so that questions like 'how many processes of class X are
+    WAITING' can be answered without looking at every process.
     """
     def __init__(self):
-        self._processes = {}
+        self._processes = ShardedRegistry()
         self.__event_helper = EventHelper(ProcessMonitorListener)
 
+        self._index_lock = threading.Lock()
+        # {pid: state}
+        self._states = {}
+        # {pid: class fullname}
+        self._classes = {}
+        # {state: set(pids)}
+        self._by_state = {}
+        # {class fullname: set(pids)}
+        self._by_class = {}
+        # {parent pid: set(child pids)}
+        self._by_parent = {}
+        # {child pid: parent pid} and {parent pid: set(child pids)}, these
+        # include children that haven't been registered yet
+        self._parents = {}
+        self._children = {}
+
     def get_process(self, pid):
         """
         Get the process instance for a currently running process.
@@ -61,6 +84,93 @@ class ProcessMonitor(ProcessListener):
         """
         return self._processes.keys()
 
+    def get_num_processes(self, state=None, class_name=None):
+        """
+        Get the number of currently running processes, optionally only those
+        in a given state and/or of a given class.  Filtering on at most one of
+        them takes constant time.
+
+        :param state: Only count processes in this state
+        :type state: :class:`plum.process.ProcessState`
+        :param class_name: Only count processes of this class
+        :type class_name: str or type
+        :return: The number of processes
+        :rtype: int
+        """
+        if state is None and class_name is None:
+            return len(self._processes)
+        elif class_name is None:
+            with self._index_lock:
+                return len(self._by_state.get(state, _EMPTY))
+        elif state is None:
+            with self._index_lock:
+                return len(self._by_class.get(_class_name(class_name), _EMPTY))
+        return len(self._find_pids(state, class_name))
+
+    def get_pids_in_state(self, state):
+        """
+        Get the pids of the currently running processes in a given state.
+
+        :param state: The state
+        :type state: :class:`plum.process.ProcessState`
+        :return: A list of pids
+        """
+        with self._index_lock:
+            return list(self._by_state.get(state, ()))
+
+    def get_pids_of_class(self, class_name):
+        """
+        Get the pids of the currently running processes of a given class.
+
+        :param class_name: The class or its fully qualified name
+        :type class_name: str or type
+        :return: A list of pids
+        """
+        with self._index_lock:
+            return list(self._by_class.get(_class_name(class_name), ()))
+
+    def get_child_pids(self, parent_pid):
+        """
+        Get the pids of the currently running children of a
+        :class:`plum.processes.ProcessWithChildren`.  Children are only known
+        about while their parent is running.
+
+        :param parent_pid: The pid of the parent process
+        :return: A list of pids
+        """
+        with self._index_lock:
+            return list(self._by_parent.get(parent_pid, ()))
+
+    def find_pids(self, state=None, class_name=None, parent_pid=None):
+        """
+        Get the pids of the currently running processes that match all of the
+        given criteria.  The cost is proportional to the smallest of the
+        matching indexes rather than the number of running processes.
+
+        :param state: Only include processes in this state
+        :type state: :class:`plum.process.ProcessState`
+        :param class_name: Only include processes of this class
+        :type class_name: str or type
+        :param parent_pid: Only include children of this process
+        :return: A list of pids
+        """
+        return list(self._find_pids(state, class_name, parent_pid))
+
+    def find_processes(self, state=None, class_name=None, parent_pid=None):
+        """
+        Get the currently running processes that match all of the given
+        criteria, see :func:`find_pids`.
+
+        :return: A list of processes
+        """
+        procs = []
+        for pid in self._find_pids(state, class_name, parent_pid):
+            proc = self._processes.get(pid)
+            # It may have gone in the mean time
+            if proc is not None:
+                procs.append(proc)
+        return procs
+
     def register_process(self, process):
         """
         Called by the :class:`~plum.process.Process` to inform the monitor
@@ -69,17 +179,18 @@ class ProcessMonitor(ProcessListener):
         :param process: The process that is being registered
         :type process: :class:`~plum.process.Process`
         """
-        assert process.pid not in self._processes, \
-               "A process with the same PID cannot be registered twice!"
+        added = self._processes.add(process.pid, process)
+        assert added, "A process with the same PID cannot be registered twice!"
+        self._index_process(process)
 
-        self._processes[process.pid] = process
         process.add_process_listener(self)
         self.__event_helper.fire_event(
             ProcessMonitorListener.on_monitored_process_registered, process)
 
     def deregister_process(self, process):
         process.remove_process_listener(self)
-        del self._processes[process.pid]
+        self._processes.pop(process.pid)
+        self._unindex_process(process.pid)
 
     def listen(self, listener):
         return ListenContext(self, listener)
@@ -94,6 +205,16 @@ class ProcessMonitor(ProcessListener):
         return len(self.__event_helper.listeners)
 
     # From ProcessListener #####################################################
+    @override
+    def on_process_run(self, process):
+        self._update_state(process)
+
+    @override
+    def on_process_wait(self, process):
+        # This is where a parent has usually just added its children
+        self._update_children(process)
+        self._update_state(process)
+
     @override
     def on_process_finish(self, process):
         self.__event_helper.fire_event(
@@ -101,11 +222,13 @@ class ProcessMonitor(ProcessListener):
 
     @override
     def on_process_stop(self, process):
+        self._update_state(process)
         self.__event_helper.fire_event(
             ProcessMonitorListener.on_monitored_process_stopped, process)
 
     @override
     def on_process_fail(self, process):
+        self._update_state(process)
         self.__event_helper.fire_event(
             ProcessMonitorListener.on_monitored_process_failed, process)
     ############################################################################
@@ -117,9 +240,121 @@ class ProcessMonitor(ProcessListener):
         expecting to get messages about what is happening which will not be
         sent after this call.
         """
-        for proc in self._processes.itervalues():
+        for pid, proc in self._processes.clear():
             proc.remove_process_listener(self)
-        self._processes = {}
+        with self._index_lock:
+            self._states.clear()
+            self._classes.clear()
+            self._by_state.clear()
+            self._by_class.clear()
+            self._by_parent.clear()
+            self._parents.clear()
+            self._children.clear()
+
+    def _find_pids(self, state=None, class_name=None, parent_pid=None):
+        with self._index_lock:
+            indexes = []
+            if state is not None:
+                indexes.append(self._by_state.get(state, _EMPTY))
+            if class_name is not None:
+                indexes.append(
+                    self._by_class.get(_class_name(class_name), _EMPTY))
+            if parent_pid is not None:
+                indexes.append(self._by_parent.get(parent_pid, _EMPTY))
+            if not indexes:
+                return set(self._states)
+            # Intersect starting from the smallest
+            indexes.sort(key=len)
+            return indexes[0].intersection(*indexes[1:])
+
+    def _index_process(self, process):
+        pid = process.pid
+        class_name = fullname(process)
+        with self._index_lock:
+            state = process.state
+            self._states[pid] = state
+            self._classes[pid] = class_name
+            self._by_state.setdefault(state, set()).add(pid)
+            self._by_class.setdefault(class_name, set()).add(pid)
+            parent_pid = self._parents.get(pid)
+            if parent_pid is not None:
+                self._by_parent.setdefault(parent_pid, set()).add(pid)
+        self._update_children(process)
+
+    def _unindex_process(self, pid):
+        with self._index_lock:
+            state = self._states.pop(pid, None)
+            if state is None:
+                return
+            _discard(self._by_state, state, pid)
+            _discard(self._by_class, self._classes.pop(pid), pid)
+            parent_pid = self._parents.pop(pid, None)
+            if parent_pid is not None:
+                _discard(self._by_parent, parent_pid, pid)
+                _discard(self._children, parent_pid, pid)
+            # Forget about our children, once we're gone they are no longer
+            # ours to keep track of
+            self._by_parent.pop(pid, None)
+            for child_pid in self._children.pop(pid, ()):
+                del self._parents[child_pid]
+
+    def _update_state(self, process):
+        pid = process.pid
+        with self._index_lock:
+            old = self._states.get(pid)
+            if old is None:
+                # Not registered (any more)
+                return
+            new = process.state
+            if new is old:
+                return
+            self._states[pid] = new
+            _discard(self._by_state, old, pid)
+            self._by_state.setdefault(new, set()).add(pid)
+
+    def _update_children(self, process):
+        if not isinstance(process, _process_with_children()):
+            return
+
+        parent_pid = process.pid
+        with self._index_lock:
+            if parent_pid not in self._states:
+                return
+            for child in process.get_children():
+                child_pid = child.pid
+                self._parents[child_pid] = parent_pid
+                self._children.setdefault(parent_pid, set()).add(child_pid)
+                if child_pid in self._states:
+                    self._by_parent.setdefault(parent_pid, set()).add(child_pid)
+
+
+_EMPTY = frozenset()
+
+# plum.processes imports this module (through plum.process) so it can't be
+# imported at the top, it's resolved the first time it is needed instead
+_PROCESS_WITH_CHILDREN = None
+
+
+def _process_with_children():
+    global _PROCESS_WITH_CHILDREN
+    if _PROCESS_WITH_CHILDREN is None:
+        from plum.processes import ProcessWithChildren
+        _PROCESS_WITH_CHILDREN = ProcessWithChildren
+    return _PROCESS_WITH_CHILDREN
+
+
+def _class_name(class_name):
+    if isinstance(class_name, basestring):
+        return class_name
+    return fullname(class_name)
+
+
+def _discard(index, key, pid):
+    pids = index.get(key)
+    if pids is not None:
+        pids.discard(pid)
+        if not pids:
+            del index[key]
 
 
 # The global singleton
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from plum.exceptions import Unsupported
+from plum.persistence.bundle import Bundle
+from plum.process import Process, ProcessState
+from plum.process_listener import ProcessListener
+from plum.process_manager import Future
+from plum.util import EventHelper, fullname, override, protected
+from plum._base import LOGGER
+
+
+def _run_bundle(bundle, event_queue):
+    """
+    Run a process from its saved instance state.  This is what gets called in
+    the worker process.
+
+    :param bundle: The saved instance state of the process
+    :type bundle: :class:`plum.persistence.bundle.Bundle`
+    :param event_queue: The queue to send process messages back on
+    """
+    # Nothing is returned, everything the parent needs to know (outputs
+    # included) has already been sent as messages
+    proc = Process.load(bundle)
+    proc.add_process_listener(_EventForwarder(event_queue))
+    proc.play()
+
+
+def _picklable(exception):
+    try:
+        pickle.dumps(exception)
+        return exception
+    except BaseException:
+        return RuntimeError(repr(exception))
+
+
+def _worker_exception(executor_future):
+    """
+    Get the exception (if any) from a finished executor future in a form that
+    can be put on the event queue.
+    """
+    if executor_future.cancelled():
+        return RuntimeError("The process was cancelled")
+    exception = executor_future.exception()
+    if exception is not None:
+        exception = _picklable(exception)
+    return exception
+
+
+class _EventForwarder(ProcessListener):
+    """
+    Lives in the worker process and sends the messages it gets from the
+    process back to the parent along with the status of the process.
+    """
+
+    def __init__(self, queue):
+        self._queue = queue
+
+    @override
+    def on_process_start(self, process):
+        self._forward(process, ProcessListener.on_process_start)
+
+    @override
+    def on_process_run(self, process):
+        self._forward(process, ProcessListener.on_process_run)
+
+    @override
+    def on_process_wait(self, process):
+        self._forward(process, ProcessListener.on_process_wait)
+
+    @override
+    def on_process_resume(self, process):
+        self._forward(process, ProcessListener.on_process_resume)
+
+    @override
+    def on_output_emitted(self, process, output_port, value, dynamic):
+        self._forward(process, ProcessListener.on_output_emitted,
+                      output_port, value, dynamic)
+
+    @override
+    def on_process_finish(self, process):
+        self._forward(process, ProcessListener.on_process_finish)
+
+    @override
+    def on_process_stop(self, process):
+        self._forward(process, ProcessListener.on_process_stop)
+
+    @override
+    def on_process_fail(self, process):
+        self._forward(process, ProcessListener.on_process_fail)
+
+    def _forward(self, process, event_function, *args):
+        exception = process.get_exception()
+        if exception is not None:
+            exception = _picklable(exception)
+        status = (process.state, process.has_finished(),
+                  process.has_aborted(), exception)
+        self._queue.put(
+            (process.pid, event_function.__name__, status, args))
+
+
+class RemoteProcess(object):
+    """
+    The parent side view of a process that is being run by a
+    :class:`ProcessPoolManager` in a worker process.  It is kept up to date by
+    the messages coming back from the worker and passes them on to its
+    listeners with itself as the process.
+    """
+
+    def __init__(self, proc):
+        """
+        :param proc: The (not yet played) process this is a view of
+        :type proc: :class:`plum.process.Process`
+        """
+        self._pid = proc.pid
+        self._class_name = fullname(proc)
+        self._inputs = proc.inputs
+        self._outputs = {}
+        self._state = proc.state
+        self._finished = False
+        self._aborted = False
+        self._exception = None
+        self._terminated = threading.Event()
+        self.__event_helper = EventHelper(ProcessListener)
+
+    @property
+    def pid(self):
+        return self._pid
+
+    @property
+    def class_name(self):
+        return self._class_name
+
+    @property
+    def inputs(self):
+        return self._inputs
+
+    @property
+    def outputs(self):
+        return self._outputs
+
+    @property
+    def state(self):
+        return self._state
+
+    def has_finished(self):
+        return self._finished
+
+    def has_failed(self):
+        return self._exception is not None
+
+    def has_terminated(self):
+        return self.has_finished() or self.has_failed()
+
+    def has_aborted(self):
+        return self._aborted
+
+    def get_exception(self):
+        return self._exception
+
+    def is_playing(self):
+        return self._state not in \
+               (ProcessState.CREATED, ProcessState.STOPPED, ProcessState.FAILED)
+
+    def add_process_listener(self, listener):
+        self.__event_helper.add_listener(listener)
+
+    def remove_process_listener(self, listener):
+        self.__event_helper.remove_listener(listener)
+
+    def wait(self, timeout=None):
+        """
+        Wait for the process to stop playing in the worker.
+
+        :param timeout: The (optional) timeout
+        :return: True if it stopped, False if the timeout was reached
+        """
+        return self._terminated.wait(timeout)
+
+    @protected
+    def message_received(self, event_name, status, args):
+        self._state, self._finished, self._aborted, self._exception = status
+        if event_name == ProcessListener.on_output_emitted.__name__:
+            output_port, value, dynamic = args
+            self._outputs[output_port] = value
+
+        self.__event_helper.fire_event(
+            getattr(ProcessListener, event_name), self, *args)
+
+        if self._state in (ProcessState.STOPPED, ProcessState.FAILED):
+            self._set_terminated()
+
+    @protected
+    def worker_done(self, exception):
+        """
+        Called once the worker is done with the process and all of its messages
+        have been received.
+
+        :param exception: The exception raised by the worker, if any
+        """
+        if self._terminated.is_set():
+            return
+
+        if exception is None:
+            exception = RuntimeError(
+                "The process stopped playing before terminating")
+        self.message_received(
+            ProcessListener.on_process_fail.__name__,
+            (ProcessState.FAILED, False, self._aborted, exception), ())
+
+    def _set_terminated(self):
+        self._terminated.set()
+        # No more messages will come so let go of the listeners
+        self.__event_helper.remove_all_listeners()
+
+
+class ProcessPoolManager(object):
+    """
+    Runs processes in a pool of worker processes rather than threads so that
+    processes that do a lot of work in Python are not serialised by the GIL.
+
+    Processes are sent to the workers as their saved instance state, so their
+    class must be importable by the workers and their inputs and outputs must
+    be picklable.  Messages from the process (including emitted outputs) are
+    sent back to the parent where they are passed on to the listeners of the
+    corresponding :class:`RemoteProcess`.
+
+    Processes running in a worker cannot be paused or aborted.
+    """
+
+    def __init__(self, max_processes=None):
+        """
+        :param max_processes: The number of worker processes, defaults to the
+            number of CPUs
+        """
+        self._processes = {}
+        self._executor = ProcessPoolExecutor(max_workers=max_processes)
+        self._sync_manager = multiprocessing.Manager()
+        self._event_queue = self._sync_manager.Queue()
+        self._receiver = threading.Thread(target=self._receive_messages)
+        self._receiver.daemon = True
+        self._receiver.start()
+
+    def launch(self, proc_class, inputs=None, pid=None):
+        """
+        Create a process and start it in a worker.
+
+        :param proc_class: The process class
+        :param inputs: The inputs to the process
+        :param pid: The (optional) pid for the process
+        :return: A :class:`Future` representing the execution of the process
+        :rtype: :class:`Future`
+        """
+        return self.start(proc_class.new(inputs, pid))
+
+    def start(self, proc):
+        """
+        Start an existing process in a worker.  The process object itself is
+        not played, from here on it is represented by a :class:`RemoteProcess`
+        (available as :func:`get_process`).
+
+        :param proc: The process to start
+        :type proc: :class:`plum.process.Process`
+        :return: A :class:`Future` representing the execution of the process
+        :rtype: :class:`Future`
+        """
+        assert not proc.is_playing(), "Cannot start a process that is playing"
+
+        bundle = Bundle()
+        proc.save_instance_state(bundle)
+
+        remote = RemoteProcess(proc)
+        self._processes[remote.pid] = remote
+        future = Future(self, remote)
+
+        executor_future = self._executor.submit(
+            _run_bundle, bundle, self._event_queue)
+        executor_future.add_done_callback(
+            lambda f: self._event_queue.put(
+                (remote.pid, None, _worker_exception(f), None)))
+        return future
+
+    def get_process(self, pid):
+        try:
+            return self._processes[pid]
+        except KeyError:
+            raise ValueError("Unknown pid")
+
+    def get_processes(self):
+        return self._processes.values()
+
+    def get_num_processes(self):
+        return len(self._processes)
+
+    def play(self, pid):
+        raise Unsupported("Processes running in a worker cannot be played")
+
+    def pause(self, pid, timeout=None):
+        raise Unsupported("Processes running in a worker cannot be paused")
+
+    def abort(self, pid, msg=None, timeout=None):
+        raise Unsupported("Processes running in a worker cannot be aborted")
+
+    def wait_for(self, pid, timeout=None):
+        return self.get_process(pid).wait(timeout)
+
+    def shutdown(self):
+        """
+        Wait for the running processes to finish and shut down the workers.
+        """
+        if not self._receiver.is_alive():
+            return
+
+        self._executor.shutdown(True)
+        self._event_queue.put(None)
+        self._receiver.join()
+        self._sync_manager.shutdown()
+        self._processes = {}
+
+    def _receive_messages(self):
+        while True:
+            msg = self._event_queue.get()
+            if msg is None:
+                return
+
+            pid, event_name, status, args = msg
+            try:
+                remote = self._processes.get(pid, None)
+                if remote is None:
+                    # Already terminated
+                    continue
+
+                if event_name is None:
+                    # The executor future is done, there will be no more
+                    # messages for this process
+                    del self._processes[pid]
+                    remote.worker_done(status)
+                else:
+                    if status[0] in (ProcessState.STOPPED, ProcessState.FAILED):
+                        del self._processes[pid]
+                    remote.message_received(event_name, status, args)
+            except BaseException as e:
+                LOGGER.error(
+                    "Exception raised handling message '{}' from process "
+                    "'{}':\n{}".format(event_name, pid, e))
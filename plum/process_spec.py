@@ -1,10 +1,43 @@
 
 
 from plum.port import InputPort, InputGroupPort, OutputPort,\
-    DynamicOutputPort, DynamicInputPort
+    DynamicOutputPort, DynamicInputPort, ArrayInputPort, ArrayOutputPort
 from plum._base import LOGGER
 from plum.util import protected
 
+# The priority processes are run with unless their spec or the caller say
+# otherwise
+DEFAULT_PRIORITY = 0
+
+
+class _CompiledSpec(object):
+    """
+    A flattened form of a :class:`ProcessSpec` that makes the checks done on
+    every process creation and output cheap.  Sealed specs keep one of these
+    around as they can no longer change.
+    """
+
+    def __init__(self, spec):
+        inputs = spec.inputs
+        self.input_items = tuple(inputs.iteritems())
+        # If there is no dynamic input this is the set of allowed inputs
+        self.input_names = None if spec.has_dynamic_input() \
+            else frozenset(inputs.iterkeys())
+        self.defaults = tuple(
+            (name, port.default) for name, port in self.input_items
+            if port.default is not None)
+        self.required_inputs = tuple(
+            name for name, port in self.input_items
+            if port.default is None and port.required)
+
+        self.output_items = tuple(spec.outputs.iteritems())
+        # Flat lookup table of {output_name: (port, dynamic)}
+        self.output_lookup = dict(
+            (name, (port, False)) for name, port in self.output_items)
+        dynamic_output = spec.get_dynamic_output()
+        self.dynamic_output = \
+            None if dynamic_output is None else (dynamic_output, True)
+
 
 class ProcessSpec(object):
     """
@@ -21,13 +54,19 @@ class ProcessSpec(object):
         self._outputs = {}
         self._deterministic = None
         self._validator = None
+        self._default_priority = DEFAULT_PRIORITY
         self._sealed = False
+        self._compiled = None
 
     def seal(self):
         """
-        Seal this specification disallowing any further changes.
+        Seal this specification disallowing any further changes.  At this
+        point the spec is compiled into a form that makes validating inputs
+        and outputs cheap.
         """
-        self._sealed = True
+        if not self._sealed:
+            self._compiled = _CompiledSpec(self)
+            self._sealed = True
 
     @property
     def sealed(self):
@@ -105,6 +144,20 @@ class ProcessSpec(object):
     def input_group(self, name, **kwargs):
         self.input_port(name, InputGroupPort(name, **kwargs))
 
+    def input_array(self, name, dtype=None, shape=None, **kwargs):
+        """
+        Define a NumPy array input.  The dtype and shape are checked without
+        looking at (or copying) the data.
+
+        :param name: The name of the input.
+        :param dtype: The (optional) dtype the array must have
+        :param shape: The (optional) shape the array must have, a dimension
+            of None matches any size
+        :param kwargs: The input port options.
+        """
+        self.input_port(
+            name, ArrayInputPort(name, dtype=dtype, shape=shape, **kwargs))
+
     def input_port(self, name, port):
         if self.sealed:
             raise RuntimeError("Cannot add an input after spec is sealed")
@@ -129,6 +182,18 @@ class ProcessSpec(object):
     def get_output(self, name):
         return self._outputs[name]
 
+    def lookup_output(self, name):
+        """
+        Find the port that an output with the given name should go to.
+
+        :param name: The output name
+        :return: A tuple of the port and whether it is the dynamic output
+            port, or None if there is no suitable port
+        :rtype: tuple(:class:`plum.port.OutputPort`, bool) or None
+        """
+        compiled = self._get_compiled()
+        return compiled.output_lookup.get(name, compiled.dynamic_output)
+
     def get_dynamic_output(self):
         return self._outputs.get(DynamicOutputPort.NAME, None)
 
@@ -144,6 +209,13 @@ class ProcessSpec(object):
     def optional_output(self, name, **kwargs):
         self.output_port(name, OutputPort(name, required=False, **kwargs))
 
+    def output_array(self, name, dtype=None, shape=None, **kwargs):
+        """
+        Define a NumPy array output, see :func:`input_array`.
+        """
+        self.output_port(
+            name, ArrayOutputPort(name, dtype=dtype, shape=shape, **kwargs))
+
     def output_port(self, name, port):
         if self.sealed:
             raise RuntimeError("Cannot add an output after spec is sealed")
@@ -192,6 +264,23 @@ class ProcessSpec(object):
 
         self._deterministic = to
 
+    def default_priority(self, priority):
+        """
+        Set the priority that processes of this class are run with if none is
+        given when they are launched, see
+        :class:`plum.process_manager.ProcessManager`.
+
+        :param priority: The priority, higher values are run first
+        :type priority: int
+        """
+        if self.sealed:
+            raise RuntimeError(
+                "Cannot set the default priority after spec is sealed")
+        self._default_priority = priority
+
+    def get_default_priority(self):
+        return self._default_priority
+
     def validator(self, fn):
         """
         Supply a validator function.  This should be a function that takes two
@@ -221,16 +310,18 @@ class ProcessSpec(object):
         if inputs is None:
             inputs = {}
 
+        compiled = self._get_compiled()
+
         # Check the inputs meet the requirements
-        if not self.has_dynamic_input():
-            unexpected = set(inputs.iterkeys()) - set(self.inputs.iterkeys())
-            if unexpected:
-                return False, \
-                       "Unexpected inputs found: {}.  If you want to allow " \
-                       "dynamic inputs add dynamic_input() to the spec " \
-                       "definition."
-
-        for name, port in self.inputs.iteritems():
+        if compiled.input_names is not None:
+            for name in inputs:
+                if name not in compiled.input_names:
+                    return False, \
+                           "Unexpected inputs found: {}.  If you want to " \
+                           "allow dynamic inputs add dynamic_input() to the " \
+                           "spec definition."
+
+        for name, port in compiled.input_items:
             valid, msg = port.validate(inputs.get(name, None))
             if not valid:
                 return False, msg
@@ -241,3 +332,51 @@ class ProcessSpec(object):
                 return False, msg
 
         return True, None
+
+    def fill_defaults(self, inputs=None):
+        """
+        Create a dictionary of the given inputs with default values filled in
+        for any inputs that have not been supplied.
+
+        :param inputs: The supplied inputs
+        :return: The inputs including any default values
+        :rtype: dict
+        :raises ValueError: If a required input has not been supplied
+        """
+        compiled = self._get_compiled()
+
+        ins = {} if inputs is None else dict(inputs)
+        for name, default in compiled.defaults:
+            if name not in ins:
+                ins[name] = default
+        for name in compiled.required_inputs:
+            if name not in ins:
+                raise ValueError(
+                    "Value not supplied for required inputs port {}".format(
+                        name))
+
+        return ins
+
+    def validate_outputs(self, outputs):
+        """
+        Check that a dictionary of outputs satisfies the output ports of this
+        specification.
+
+        :param outputs: The outputs dictionary
+        :type outputs: dict
+        :return: A tuple indicating if the outputs are valid or not and an
+            optional error message
+        :rtype: tuple(bool, str or None)
+        """
+        for name, port in self._get_compiled().output_items:
+            valid, msg = port.validate(outputs.get(name, None))
+            if not valid:
+                return False, msg
+
+        return True, None
+
+    def _get_compiled(self):
+        if self._compiled is not None:
+            return self._compiled
+        # Not sealed so can't keep it, the spec may still change
+        return _CompiledSpec(self)
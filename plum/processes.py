@@ -23,8 +23,8 @@ class ProcessWithChildren(Process):
                 "This wait on can only be created by the parent process, "
                 "it cannot be instantiated on its own")
     
-    def __init__(self):
-        super(ProcessWithChildren, self).__init__()
+    def __init__(self, inputs, pid, logger=None):
+        super(ProcessWithChildren, self).__init__(inputs, pid, logger)
         self._child_procs = []
 
     def add_child(self, process):
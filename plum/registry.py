@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+# 2**64 divided by the golden ratio
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+
+class ShardedRegistry(object):
+    """
+    A thread safe mapping split into a number of shards each with its own
+    lock, so that threads adding and removing different keys rarely contend.
+
+    Iterating never sees the registry change underneath it: all the methods
+    that return more than one entry (:func:`keys`, :func:`values`,
+    :func:`items` and iteration) work on a snapshot that is taken with all
+    the shards locked, so it is consistent across shards.  Looking up a
+    single key doesn't take a lock at all.
+    """
+
+    def __init__(self, num_shards=16):
+        """
+        :param num_shards: The number of shards, must be a power of two
+        :type num_shards: int
+        """
+        assert num_shards > 0 and num_shards & (num_shards - 1) == 0, \
+            "The number of shards must be a power of two"
+        # The number of (top) bits of the mixed hash that pick the shard
+        self._shift = 64 - (num_shards.bit_length() - 1)
+        self._shards = [{} for _ in range(num_shards)]
+        self._locks = [threading.Lock() for _ in range(num_shards)]
+
+    def __len__(self):
+        # Reading the length of a dict is atomic
+        return sum(len(shard) for shard in self._shards)
+
+    def __contains__(self, key):
+        return key in self._shards[self._index(key)]
+
+    def __getitem__(self, key):
+        return self._shards[self._index(key)][key]
+
+    def __setitem__(self, key, value):
+        index = self._index(key)
+        with self._locks[index]:
+            self._shards[index][key] = value
+
+    def __delitem__(self, key):
+        index = self._index(key)
+        with self._locks[index]:
+            del self._shards[index][key]
+
+    def _index(self, key):
+        # Fibonacci hashing, the low bits of a hash can be all the same e.g.
+        # for uuid1s from the same machine so mix them all into the top bits
+        # and use those
+        return ((hash(key) * _GOLDEN) & _MASK_64) >> self._shift
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, key, default=None):
+        return self._shards[self._index(key)].get(key, default)
+
+    def add(self, key, value):
+        """
+        Add an entry if there isn't one with the same key already.
+
+        :return: True if it was added, False if the key was already there
+        :rtype: bool
+        """
+        index = self._index(key)
+        with self._locks[index]:
+            shard = self._shards[index]
+            if key in shard:
+                return False
+            shard[key] = value
+            return True
+
+    def pop(self, key, *default):
+        """
+        Remove an entry and return its value.
+
+        :param key: The key
+        :param default: The (optional) value to return if the key isn't there
+        :raises KeyError: If the key isn't there and no default was given
+        """
+        index = self._index(key)
+        with self._locks[index]:
+            return self._shards[index].pop(key, *default)
+
+    def update(self, items):
+        """
+        Add or replace a number of entries.
+
+        :param items: An iterable of (key, value) pairs
+        """
+        for key, value in items:
+            self[key] = value
+
+    def keys(self):
+        return [key for key, value in self.items()]
+
+    def values(self):
+        return [value for key, value in self.items()]
+
+    def items(self):
+        """
+        :return: A snapshot of all the (key, value) pairs
+        :rtype: list
+        """
+        with _AllLocked(self._locks):
+            items = []
+            for shard in self._shards:
+                items.extend(shard.iteritems())
+        return items
+
+    def clear(self):
+        """
+        Remove all the entries.
+
+        :return: The (key, value) pairs that were removed
+        :rtype: list
+        """
+        with _AllLocked(self._locks):
+            items = []
+            for shard in self._shards:
+                items.extend(shard.iteritems())
+                shard.clear()
+        return items
+
+
+class _AllLocked(object):
+    """
+    Hold all of a list of locks, they are always taken in the same order so
+    this can't deadlock with another holder of all of them.
+    """
+
+    def __init__(self, locks):
+        self._locks = locks
+
+    def __enter__(self):
+        for lock in self._locks:
+            lock.acquire()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for lock in reversed(self._locks):
+            lock.release()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import errno
+import os
+import os.path as path
+import pickle
+import tempfile
+import threading
+from abc import ABCMeta, abstractmethod
+
+from plum.util import fingerprint, override
+from plum._base import LOGGER
+
+
+def make_key(classname, inputs):
+    """
+    Make the cache key for a process of the given class with the given inputs.
+
+    :param classname: The fully qualified class name of the process
+    :param inputs: The inputs of the process
+    :return: The key
+    :rtype: str
+    :raises ValueError: If the inputs cannot be fingerprinted
+    """
+    return fingerprint((classname, inputs))
+
+
+class ResultCache(object):
+    """
+    A store of the outputs of deterministic processes keyed on their class
+    name and inputs (see :func:`make_key`).  Used by
+    :func:`plum.process.Process.fast_forward` to replay the outputs of a
+    process that has already been run with the same inputs.
+    """
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def get(self, key):
+        """
+        Get the outputs stored for a key.
+
+        :param key: The key
+        :return: The outputs dictionary or None if there aren't any
+        :rtype: dict
+        """
+        pass
+
+    @abstractmethod
+    def put(self, key, outputs):
+        """
+        Store the outputs for a key.
+
+        :param key: The key
+        :param outputs: The outputs dictionary
+        :type outputs: dict
+        """
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """
+        Remove everything from the cache.
+        """
+        pass
+
+
+class LruResultCache(ResultCache):
+    """
+    An in memory cache that holds on to the most recently used entries.
+    """
+
+    def __init__(self, max_size=1024):
+        """
+        :param max_size: The maximum number of entries to keep
+        :type max_size: int
+        """
+        assert max_size > 0, "The maximum size must be positive"
+        self._max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @override
+    def get(self, key):
+        with self._lock:
+            try:
+                outputs = self._entries.pop(key)
+            except KeyError:
+                return None
+            # Move it to the most recently used end
+            self._entries[key] = outputs
+            return outputs
+
+    @override
+    def put(self, key, outputs):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = dict(outputs)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    @override
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskResultCache(ResultCache):
+    """
+    A cache that pickles the outputs into a directory, one file per key.  The
+    outputs must be picklable.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: The directory to store the entries in, it will be
+            created if it doesn't exist
+        :type directory: str
+        """
+        self._directory = directory
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @override
+    def get(self, key):
+        try:
+            with open(self._filename(key), 'rb') as f:
+                return pickle.load(f)
+        except IOError:
+            return None
+        except BaseException as e:
+            LOGGER.warning(
+                "Failed to load cached result '{}': {}".format(key, e))
+            return None
+
+    @override
+    def put(self, key, outputs):
+        # Write to a temporary file first so that no one sees half an entry
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(dict(outputs), f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, self._filename(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @override
+    def clear(self):
+        for name in os.listdir(self._directory):
+            if name.endswith(".pickle"):
+                os.remove(path.join(self._directory, name))
+
+    def _filename(self, key):
+        return path.join(self._directory, "{}.pickle".format(key))
+
+
+class TieredResultCache(ResultCache):
+    """
+    An in memory LRU cache optionally backed by a disk cache.  Entries found
+    on disk are promoted to memory.
+    """
+
+    def __init__(self, max_size=1024, directory=None):
+        """
+        :param max_size: The maximum number of entries to keep in memory
+        :type max_size: int
+        :param directory: The (optional) directory for the disk tier
+        :type directory: str
+        """
+        self._memory = LruResultCache(max_size)
+        self._disk = None if directory is None else DiskResultCache(directory)
+
+    @override
+    def get(self, key):
+        outputs = self._memory.get(key)
+        if outputs is None and self._disk is not None:
+            outputs = self._disk.get(key)
+            if outputs is not None:
+                self._memory.put(key, outputs)
+        return outputs
+
+    @override
+    def put(self, key, outputs):
+        self._memory.put(key, outputs)
+        if self._disk is not None:
+            self._disk.put(key, outputs)
+
+    @override
+    def clear(self):
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+_GLOBAL_CACHE = None
+
+
+def get_global_cache():
+    """
+    Get the cache used by processes to fast-forward, None if there isn't one.
+
+    :rtype: :class:`ResultCache`
+    """
+    return _GLOBAL_CACHE
+
+
+def set_global_cache(cache):
+    """
+    Set the cache used by processes to fast-forward.  Set to None to turn off
+    fast-forwarding.
+
+    :param cache: The cache
+    :type cache: :class:`ResultCache`
+    """
+    global _GLOBAL_CACHE
+    _GLOBAL_CACHE = cache
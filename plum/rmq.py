@@ -5,8 +5,10 @@ from collections import namedtuple
 
 import pika
 
+from plum._base import LOGGER
 from plum._rmq import Defaults, Subscriber
 from plum._rmq.status import StatusProvider
+from plum.exceptions import QueueFull
 from plum.process import ProcessListener
 from plum.process_manager import ProcessManager
 from plum.util import load_class, fullname, override
@@ -242,7 +244,7 @@ class TaskRunner(Subscriber, ProcessListener):
 
     def __init__(self, connection, queue=Defaults.TASK_QUEUE,
                  decoder=json.loads, manager=None, controller=None,
-                 status_provider=None):
+                 status_provider=None, stop_timeout=10.):
         """
 
         :param connection: The pika RabbitMQ connection
@@ -252,6 +254,8 @@ class TaskRunner(Subscriber, ProcessListener):
         :param manager: The process manager to use, one will be created if None
             is passed
         :type manager: :class:`plum.process_manger.ProcessManager`
+        :param stop_timeout: The default maximum time stop() will wait for the
+            running processes to pause
         """
         if manager is None:
             self._manager = ProcessManager()
@@ -274,6 +278,7 @@ class TaskRunner(Subscriber, ProcessListener):
         self._running_processes = {}
         self._stopping = False
         self._num_processes = 0
+        self._stop_timeout = stop_timeout
 
         self._status_publisher = ProcessStatusPublisher(connection)
 
@@ -306,14 +311,29 @@ class TaskRunner(Subscriber, ProcessListener):
         return self._num_processes
 
     @override
-    def stop(self):
+    def stop(self, timeout=None):
+        """
+        Stop polling for tasks and pause all the running processes.
+
+        :param timeout: The maximum time to wait for the processes to pause,
+            defaults to the stop timeout given to the constructor
+        :return: A report of the processes that did not pause in time
+        :rtype: :class:`plum.process_manager.StopReport`
+        """
+        if timeout is None:
+            timeout = self._stop_timeout
+
         self._stopping = True
-        self._manager.pause_all()
+        report = self._manager.pause_all(timeout)
+        if not report:
+            LOGGER.warning(
+                "{} of {} processes did not pause within {}s: {}".format(
+                    len(report.failed), report.num_processes, timeout,
+                    report.failed))
         self._status_publisher.reset()
+        return report
 
     def _on_launch(self, ch, method, properties, body):
-        self._num_processes += 1
-
         task = self._decode(body)
         ProcClass = load_class(task['proc_class'])
 
@@ -323,7 +343,17 @@ class TaskRunner(Subscriber, ProcessListener):
 
         self._running_processes[p.pid] = \
             _RunningTaskInfo(p.pid, ch, method.delivery_tag)
-        self._manager.start(p)
+        try:
+            # Never block the connection thread, if the run queue is full let
+            # the broker hold on to the task until we have room
+            self._manager.start(p, block=False)
+        except QueueFull:
+            p.remove_process_listener(self)
+            self._status_publisher.remove_process(p)
+            self._running_processes.pop(p.pid)
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        else:
+            self._num_processes += 1
 
     # From ProcessListener #################################
     def on_process_stop(self, process):
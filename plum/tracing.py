@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tracing of what processes (and the machinery around them) are doing, written
+out in the Chrome trace event format so it can be viewed in chrome://tracing
+or Perfetto.  Tracing is off until a tracer is set e.g.::
+
+    tracer = Tracer()
+    set_tracer(tracer)
+    ...
+    set_tracer(None)
+    tracer.write("trace.json")
+"""
+
+import json
+import os
+import threading
+import time
+
+_TRACER = None
+
+
+def get_tracer():
+    """
+    Get the tracer that is recording, None if tracing is off.
+
+    :rtype: :class:`Tracer`
+    """
+    return _TRACER
+
+
+def set_tracer(tracer):
+    """
+    Set the tracer to record to, None turns tracing off.
+
+    :param tracer: The tracer
+    :type tracer: :class:`Tracer`
+    """
+    global _TRACER
+    _TRACER = tracer
+
+
+def span(name, category, **args):
+    """
+    Get a context that records a span with the current tracer (if any) for
+    the time spent inside it.
+
+    :param name: The name of the span
+    :param category: The category of the span
+    :param args: Any additional information to attach to the span
+    """
+    tracer = _TRACER
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, category, args)
+
+
+def instant(name, category, **args):
+    """
+    Record an instant event with the current tracer (if any).
+
+    :param name: The name of the event
+    :param category: The category of the event
+    :param args: Any additional information to attach to the event
+    """
+    tracer = _TRACER
+    if tracer is not None:
+        tracer.instant(name, category, args)
+
+
+class _NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+    def __init__(self, tracer, name, category, args):
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+        self._start = None
+
+    def __enter__(self):
+        self._start = self._tracer.now()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._tracer.add_span(
+            self._name, self._category, self._start, self._tracer.now(),
+            self._args)
+
+
+class Tracer(object):
+    """
+    Records spans and instant events in memory, tagged with the thread they
+    happened on, so they can be written out as a Chrome trace.
+    """
+
+    def __init__(self, clock=time.time):
+        """
+        :param clock: The function used to get the current time in seconds
+        """
+        self._clock = clock
+        self._start = clock()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._events = []
+        # {thread ident: thread name}
+        self._threads = {}
+
+    def now(self):
+        """
+        :return: The current time in microseconds since the tracer was created
+        :rtype: float
+        """
+        return (self._clock() - self._start) * 1e6
+
+    def span(self, name, category, args=None):
+        """
+        Get a context that records a span for the time spent inside it.
+
+        :param name: The name of the span
+        :param category: The category of the span
+        :param args: An (optional) dictionary of additional information
+        """
+        return _Span(self, name, category, args)
+
+    def add_span(self, name, category, start, end, args=None):
+        """
+        Record a span that happened on the current thread.
+
+        :param name: The name of the span
+        :param category: The category of the span
+        :param start: The start time in microseconds, see :func:`now`
+        :param end: The end time in microseconds
+        :param args: An (optional) dictionary of additional information
+        """
+        event = self._create_event(name, category, 'X', start, args)
+        event['dur'] = end - start
+        self._add_event(event)
+
+    def instant(self, name, category, args=None):
+        """
+        Record an instant event on the current thread.
+
+        :param name: The name of the event
+        :param category: The category of the event
+        :param args: An (optional) dictionary of additional information
+        """
+        event = self._create_event(name, category, 'i', self.now(), args)
+        event['s'] = 't'
+        self._add_event(event)
+
+    def get_events(self):
+        """
+        Get all the events recorded so far, including the metadata events
+        naming the threads.
+
+        :return: A list of trace events
+        :rtype: list
+        """
+        with self._lock:
+            events = [
+                {'name': 'thread_name', 'ph': 'M', 'pid': self._pid,
+                 'tid': tid, 'args': {'name': name}}
+                for tid, name in self._threads.iteritems()]
+            events.extend(self._events)
+        return events
+
+    def write(self, filename):
+        """
+        Write the events recorded so far to a Chrome trace JSON file.
+
+        :param filename: The file to write to
+        """
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': self.get_events(),
+                       'displayTimeUnit': 'ms'}, f, default=str)
+
+    def clear(self):
+        """
+        Throw away all the events recorded so far.
+        """
+        with self._lock:
+            self._events = []
+            self._threads = {}
+
+    def _create_event(self, name, category, phase, ts, args):
+        thread = threading.current_thread()
+        event = {'name': name, 'cat': category, 'ph': phase, 'ts': ts,
+                 'pid': self._pid, 'tid': thread.ident}
+        if args:
+            event['args'] = args
+        return event
+
+    def _add_event(self, event):
+        thread = threading.current_thread()
+        with self._lock:
+            self._events.append(event)
+            if thread.ident not in self._threads:
+                self._threads[thread.ident] = thread.name
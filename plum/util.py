@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
 
+import collections
+import hashlib
 import threading
 import inspect
 import importlib
+import pickle
 import frozendict
+try:
+    import numpy
+except ImportError:
+    numpy = None
 from plum.settings import check_protected, check_override
 from plum.exceptions import ClassNotFoundException
 import plum.lang
@@ -13,31 +20,141 @@ override = plum.lang.override(check=check_override)
 
 
 class EventHelper(object):
+    """
+    Keeps track of a set of listeners and fires events at them.
+
+    Listeners are only called for the events that they are interested in, that
+    is the methods of the listener type that their class overrides.  The
+    methods to call for each event are kept in a dispatch table which is
+    rebuilt when listeners are added or removed so firing an event involves
+    no copying or attribute lookups.
+    """
+    # {(listener class, listener type): frozenset(names of overridden hooks)}
+    _interests = {}
+    # {listener type: frozenset(event names)}
+    _event_names_cache = {}
+    _interests_lock = threading.Lock()
+
+    @classmethod
+    def get_event_names(cls, listener_type):
+        """
+        Get the names of the events that a listener type defines i.e. its
+        public methods.
+
+        :param listener_type: The listener type
+        :return: The event names
+        :rtype: frozenset
+        """
+        try:
+            return cls._event_names_cache[listener_type]
+        except KeyError:
+            pass
+
+        names = frozenset(
+            name for name in dir(listener_type)
+            if not name.startswith('_') and
+            callable(getattr(listener_type, name)))
+        with cls._interests_lock:
+            cls._event_names_cache[listener_type] = names
+        return names
+
+    @classmethod
+    def get_interests(cls, listener_class, listener_type):
+        """
+        Get the names of the event methods of the listener type that are
+        overridden by a listener class.
+
+        :param listener_class: The listener class
+        :param listener_type: The listener type that defines the events
+        :return: The names of the overridden event methods
+        :rtype: frozenset
+        """
+        key = (listener_class, listener_type)
+        try:
+            return cls._interests[key]
+        except KeyError:
+            pass
+
+        interests = []
+        for name in cls.get_event_names(listener_type):
+            default = getattr(listener_type, name)
+            method = getattr(listener_class, name, None)
+            if getattr(method, '__func__', method) is not \
+                    getattr(default, '__func__', default):
+                interests.append(name)
+        interests = frozenset(interests)
+
+        with cls._interests_lock:
+            cls._interests[key] = interests
+        return interests
+
     def __init__(self, listener_type):
         assert(listener_type is not None)
         self._listener_type = listener_type
-        self._listeners = set()
+        self._event_names = self.get_event_names(listener_type)
+        self._lock = threading.Lock()
+        # These are never modified, only replaced, so they can be read
+        # without holding the lock
+        self._listeners = ()
+        self._dispatch = {}
 
     def add_listener(self, listener):
         assert isinstance(listener, self._listener_type)
-        self._listeners.add(listener)
+        with self._lock:
+            if listener not in self._listeners:
+                self._set_listeners(self._listeners + (listener,))
 
     def remove_listener(self, listener):
-        self._listeners.discard(listener)
+        with self._lock:
+            if listener in self._listeners:
+                self._set_listeners(
+                    tuple(l for l in self._listeners if l is not listener))
 
     def remove_all_listeners(self):
-        self._listeners.clear()
+        with self._lock:
+            self._set_listeners(())
 
     @property
     def listeners(self):
-        return self._listeners
+        return frozenset(self._listeners)
 
     def fire_event(self, event_function, *args, **kwargs):
-        # TODO: Check if the function is in the listener type
-        # We have to use a copy here because the listener may
-        # remove themselves during the message
-        for l in list(self.listeners):
-            getattr(l, event_function.__name__)(*args, **kwargs)
+        # The dispatch table is replaced rather than changed when listeners
+        # come and go so the listeners are free to remove themselves during
+        # the message
+        event_name = event_function.__name__
+        try:
+            fns = self._dispatch[event_name]
+        except KeyError:
+            if event_name in self._event_names:
+                # No one is interested
+                return
+            # Not an event of the listener type, try all the listeners
+            fns = [getattr(l, event_name) for l in self._listeners]
+
+        for fn in fns:
+            fn(*args, **kwargs)
+
+    def _set_listeners(self, listeners):
+        """
+        Set the listeners and rebuild the dispatch table.  The lock should be
+        held by the caller.
+        """
+        dispatch = {}
+        for listener in listeners:
+            interests = self.get_interests(
+                type(listener), self._listener_type)
+            # Catch methods that have been set on the instance itself
+            instance_dict = getattr(listener, '__dict__', {})
+            for name in self._event_names:
+                if (name in interests or name in instance_dict) and \
+                        hasattr(listener, name):
+                    dispatch.setdefault(name, []).append(
+                        getattr(listener, name))
+
+        self._dispatch = dict(
+            (name, tuple(fns)) for name, fns in dispatch.iteritems())
+        self._listeners = listeners
 
 
 class ListenContext(object):
@@ -100,6 +217,70 @@ def fullname(object):
         return object.__module__ + "." + object.__class__.__name__
 
 
+def fingerprint(obj):
+    """
+    Get a stable hash of an object.  Unlike hash() this is the same between
+    interpreter runs and is the same for equal mappings (and sets) regardless
+    of their ordering.
+
+    Built in types are hashed by value, anything else by its pickle so it
+    must pickle the same way each time for the fingerprint to be stable.
+
+    :param obj: The object to fingerprint
+    :return: The hex digest fingerprint
+    :rtype: str
+    :raises ValueError: If the object cannot be fingerprinted
+    """
+    h = hashlib.sha1()
+    _update_fingerprint(h, obj)
+    return h.hexdigest()
+
+
+def _update_fingerprint(h, obj):
+    if obj is None:
+        h.update('N')
+    elif isinstance(obj, bool):
+        h.update('T' if obj else 'F')
+    elif isinstance(obj, (int, long)):
+        h.update('i{};'.format(obj))
+    elif isinstance(obj, float):
+        h.update('f{!r};'.format(obj))
+    elif isinstance(obj, basestring):
+        if isinstance(obj, unicode):
+            obj = obj.encode('utf-8')
+        h.update('s{}:'.format(len(obj)))
+        h.update(obj)
+    elif isinstance(obj, collections.Mapping):
+        h.update('d{}:'.format(len(obj)))
+        for key_fp, value in sorted(
+                (fingerprint(k), v) for k, v in obj.iteritems()):
+            h.update(key_fp)
+            _update_fingerprint(h, value)
+    elif isinstance(obj, (list, tuple)):
+        h.update('{}{}:'.format('l' if isinstance(obj, list) else 't',
+                                len(obj)))
+        for value in obj:
+            _update_fingerprint(h, value)
+    elif isinstance(obj, (set, frozenset)):
+        h.update('e{}:'.format(len(obj)))
+        for value_fp in sorted(fingerprint(v) for v in obj):
+            h.update(value_fp)
+    elif numpy is not None and isinstance(obj, numpy.ndarray) and \
+            not obj.dtype.hasobject:
+        # Hash the buffer directly, this only copies if the array isn't
+        # contiguous
+        h.update('a{}:{}:'.format(obj.dtype.str, obj.shape))
+        h.update(numpy.ascontiguousarray(obj).data)
+    else:
+        try:
+            pickled = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        except BaseException as e:
+            raise ValueError(
+                "Cannot fingerprint '{}': {}".format(type(obj), e))
+        h.update('p{}:{}:'.format(fullname(obj), len(pickled)))
+        h.update(pickled)
+
+
 def load_class(classstring):
     """
     Load a class from a string
@@ -119,7 +300,13 @@ def load_class(classstring):
 
 class AttributesFrozendict(frozendict.frozendict):
     def __init__(self, *args, **kwargs):
-        super(AttributesFrozendict, self).__init__(*args, **kwargs)
+        if len(args) == 1 and not kwargs and \
+                isinstance(args[0], frozendict.frozendict):
+            # It can't change so share the dictionary rather than walk it
+            self._dict = args[0]._dict
+            self._hash = None
+        else:
+            super(AttributesFrozendict, self).__init__(*args, **kwargs)
         self._initialised = True
 
     def __getattr__(self, attr):
@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
 
+import heapq
+import itertools
+import math
 import threading
+import time
+import traceback
 from abc import ABCMeta
 
 from plum.persistence.bundle import Bundle
 from plum.util import fullname, protected, override
 from plum.exceptions import Unsupported
+from plum._base import LOGGER
 
 
 class Interrupted(Exception):
@@ -49,15 +55,16 @@ class WaitOn(object):
         # Variables below this don't need to be saved in the instance state
         self._waiting = threading.Event()
         self._interrupt_lock = threading.Lock()
+        self._callbacks = []
         self.__super_called = False
 
         if kwargs and kwargs.get(self.RECREATE_FROM_KEY, False):
             bundle = kwargs.pop(self.RECREATE_FROM_KEY)
             assert isinstance(bundle, Bundle), \
                 "'{}' must be of type {}".format(self.RECREATE_FROM_KEY, Bundle.__class__)
-            assert args is None and not kwargs, \
+            assert not args and not kwargs, \
                 "If '{}' is supplied cannot have another parameters".format(self.RECREATE_FROM_KEY)
-            self.load_instance_state(bundle, *args, **kwargs)
+            self.load_instance_state(bundle)
         else:
             self.init(*args, **kwargs)
 
@@ -134,6 +141,37 @@ class WaitOn(object):
         with self._interrupt_lock:
             self._waiting.set()
 
+    def add_done_callback(self, fn):
+        """
+        Add a callback that will be called once this wait on is done.  The
+        callback takes the wait on as its only argument.  If the wait on is
+        already done the callback is called straight away, otherwise it will
+        be called from whichever thread calls :func:`done`.
+
+        This allows something to react to the wait on finishing without
+        having to have a thread blocked in :func:`wait`.
+
+        :param fn: The callback function
+        """
+        with self._interrupt_lock:
+            if not self.is_done():
+                self._callbacks.append(fn)
+                return
+        self._call_callback(fn)
+
+    def remove_done_callback(self, fn):
+        """
+        Remove a callback added with :func:`add_done_callback`, this has no
+        effect if it isn't there (e.g. because it has already been called).
+
+        :param fn: The callback function
+        """
+        with self._interrupt_lock:
+            try:
+                self._callbacks.remove(fn)
+            except ValueError:
+                pass
+
     @protected
     def init(self, *args, **kwargs):
         """
@@ -155,7 +193,8 @@ class WaitOn(object):
         :param bundle: :class:`Bundle` The save instance state
         """
         outcome = bundle[self.OUTCOME]
-        self.done(outcome[0], outcome[1])
+        if outcome is not None:
+            self.done(outcome[0], outcome[1])
         self.__super_called = True
 
     @protected
@@ -175,6 +214,19 @@ class WaitOn(object):
         with self._interrupt_lock:
             self._outcome = success, msg
             self._waiting.set()
+            callbacks = self._callbacks
+            self._callbacks = []
+
+        for fn in callbacks:
+            self._call_callback(fn)
+
+    def _call_callback(self, fn):
+        try:
+            fn(self)
+        except BaseException:
+            LOGGER.error(
+                "Exception raised by done callback '{}' of wait on '{}':\n"
+                "{}".format(fn, self, traceback.format_exc()))
 
 
 class Unsavable(object):
@@ -187,4 +239,328 @@ class Unsavable(object):
 
     @override
     def load_instance_state(self, bundle):
-        raise Unsupported("This WaitOn cannot be loaded")
\ No newline at end of file
+        raise Unsupported("This WaitOn cannot be loaded")
+
+class Timer(object):
+    """
+    A handle to a callback scheduled with a :class:`TimerWheel`.
+    """
+    __slots__ = ('when', 'fn', 'args', '_tick', '_wheel', '_cancelled')
+
+    def __init__(self, wheel, when, tick, fn, args):
+        self.when = when
+        self.fn = fn
+        self.args = args
+        self._tick = tick
+        self._wheel = wheel
+        self._cancelled = False
+
+    def cancel(self):
+        """
+        Cancel the callback, this has no effect if it has already been called.
+
+        :return: True if the callback was cancelled, False if it has already
+            been called or cancelled
+        :rtype: bool
+        """
+        wheel = self._wheel
+        if wheel is None:
+            # Already called
+            return False
+        return wheel._cancel(self)
+
+    def cancelled(self):
+        return self._cancelled
+
+
+class TimerWheel(object):
+    """
+    A hierarchical timer wheel that calls callbacks at (or just after) given
+    times using a single thread no matter how many are pending.
+
+    Time is split into ticks and each level of the wheel has `wheel_size`
+    slots, the slots of the first level are one tick wide, those of the next
+    `wheel_size` ticks wide and so on.  A timer is put in the slot of the
+    lowest level that can hold it and moved down a level as its time gets
+    closer so scheduling and cancelling are O(1).  Timers that are further in
+    the future than the whole wheel covers wait in an overflow heap.
+
+    Callbacks are called from the wheel's thread so they should be quick, and
+    hand anything long running off to another thread.  They may be up to a
+    tick late.
+    """
+
+    def __init__(self, tick=0.01, wheel_size=64, num_levels=4,
+                 clock=time.time):
+        """
+        :param tick: The resolution of the wheel in seconds
+        :type tick: float
+        :param wheel_size: The number of slots in each level, must be a power
+            of two
+        :type wheel_size: int
+        :param num_levels: The number of levels
+        :type num_levels: int
+        :param clock: The function used to get the current time
+        """
+        assert tick > 0, "The tick must be positive"
+        assert wheel_size > 1 and wheel_size & (wheel_size - 1) == 0, \
+            "The wheel size must be a power of two"
+        assert num_levels > 0, "There must be at least one level"
+
+        self._tick = tick
+        self._bits = wheel_size.bit_length() - 1
+        self._mask = wheel_size - 1
+        self._clock = clock
+        # The number of ticks that the whole wheel spans
+        self._span = 1 << (self._bits * num_levels)
+        self._levels = [[[] for _ in range(wheel_size)]
+                        for _ in range(num_levels)]
+        # Heap of (tick, sequence number, timer) for the far future
+        self._overflow = []
+        self._sequence = itertools.count()
+        self._current_tick = self._to_tick(clock())
+        self._num_pending = 0
+        # The tick the thread is sleeping until, None if it is idle
+        self._wakeup_tick = None
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self._shutdown = False
+
+    @property
+    def tick(self):
+        return self._tick
+
+    def num_pending(self):
+        """
+        :return: The number of callbacks waiting to be called
+        :rtype: int
+        """
+        return self._num_pending
+
+    def call_at(self, when, fn, *args):
+        """
+        Call a function at a given time.  If the time has already passed it
+        will be called as soon as possible.
+
+        :param when: The time, as given by the wheel's clock
+        :type when: float
+        :param fn: The function to call
+        :param args: The arguments to call it with
+        :return: A handle that can be used to cancel the call
+        :rtype: :class:`Timer`
+        """
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("The timer wheel has been shut down")
+            if self._num_pending == 0:
+                # The wheel stops turning when there is nothing to do so
+                # catch up, it's empty so nothing needs to move
+                self._current_tick = max(
+                    self._current_tick, self._to_tick(self._clock()))
+            # Round up so that we're never early
+            tick = max(int(math.ceil(when / self._tick)),
+                       self._current_tick + 1)
+            timer = Timer(self, when, tick, fn, args)
+            self._insert(timer)
+            self._num_pending += 1
+            self._ensure_thread()
+            if self._wakeup_tick is None or tick < self._wakeup_tick:
+                # The thread may be idle or asleep until after this is due
+                self._cond.notify()
+        return timer
+
+    def call_later(self, delay, fn, *args):
+        """
+        Call a function after a delay.
+
+        :param delay: The delay in seconds
+        :type delay: float
+        :param fn: The function to call
+        :param args: The arguments to call it with
+        :return: A handle that can be used to cancel the call
+        :rtype: :class:`Timer`
+        """
+        return self.call_at(self._clock() + delay, fn, *args)
+
+    def shutdown(self):
+        """
+        Stop the wheel, any callbacks that are still pending won't be called.
+        """
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _to_tick(self, when):
+        return int(when / self._tick)
+
+    def _insert(self, timer):
+        """
+        Put a timer in the right slot.  The lock should be held by the caller.
+        """
+        delta = timer._tick - self._current_tick
+        if delta >= self._span:
+            heapq.heappush(
+                self._overflow, (timer._tick, next(self._sequence), timer))
+            return
+
+        level = 0
+        while delta >= 1 << (self._bits * (level + 1)):
+            level += 1
+        slot = (timer._tick >> (self._bits * level)) & self._mask
+        self._levels[level][slot].append(timer)
+
+    def _next_tick(self):
+        """
+        Get the next tick at which there is something to do, either calling
+        timers in the first level or moving them down from the higher levels
+        or the overflow heap.  The lock should be held by the caller.
+
+        :return: The next tick that needs attention
+        :rtype: int
+        """
+        size = self._mask + 1
+        # The next time the first level goes all the way round and the levels
+        # above it get a chance to move timers down
+        next_tick = ((self._current_tick >> self._bits) + 1) << self._bits
+        if not any(any(level) for level in self._levels[1:]):
+            next_tick = self._current_tick + size
+        if self._overflow:
+            # When the first of the overflow comes within the wheel's span
+            next_tick = min(next_tick, self._overflow[0][0] - self._span + 1)
+
+        for tick in range(self._current_tick + 1, next_tick):
+            if self._levels[0][tick & self._mask]:
+                return tick
+        return max(next_tick, self._current_tick + 1)
+
+    def _cancel(self, timer):
+        with self._cond:
+            if timer._cancelled or timer._wheel is None:
+                return False
+            timer._cancelled = True
+            self._num_pending -= 1
+            # The timer is dropped when its slot comes round
+            return True
+
+    def _advance(self):
+        """
+        Move on by one tick and collect the timers that are due.  The lock
+        should be held by the caller.
+
+        :return: The timers that are due
+        :rtype: list
+        """
+        self._current_tick += 1
+        tick = self._current_tick
+
+        # Move timers down from the higher levels when the level below has
+        # gone all the way round
+        for level in range(1, len(self._levels)):
+            if tick & ((1 << (self._bits * level)) - 1):
+                break
+            slot = (tick >> (self._bits * level)) & self._mask
+            timers = self._levels[level][slot]
+            self._levels[level][slot] = []
+            for timer in timers:
+                if not timer._cancelled:
+                    self._insert(timer)
+
+        while self._overflow and \
+                self._overflow[0][0] - tick < self._span:
+            timer = heapq.heappop(self._overflow)[2]
+            if not timer._cancelled:
+                self._insert(timer)
+
+        slot = tick & self._mask
+        timers = self._levels[0][slot]
+        self._levels[0][slot] = []
+        due = []
+        for timer in timers:
+            if not timer._cancelled:
+                # Mark it as called so it can't be cancelled anymore
+                timer._wheel = None
+                due.append(timer)
+        self._num_pending -= len(due)
+        return due
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="TimerWheel")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._shutdown:
+                    return
+
+                if self._num_pending == 0:
+                    self._wakeup_tick = None
+                    self._cond.wait()
+                    continue
+
+                now_tick = self._to_tick(self._clock())
+                next_tick = self._next_tick()
+                due = []
+                while next_tick <= now_tick:
+                    # Nothing happens in the ticks in between so go straight
+                    # to the next one that has something to do
+                    self._current_tick = next_tick - 1
+                    due.extend(self._advance())
+                    if not self._num_pending:
+                        break
+                    next_tick = self._next_tick()
+
+                if not self._num_pending:
+                    self._current_tick = max(self._current_tick, now_tick)
+                elif not due:
+                    # Sleep until the next slot that has something in it
+                    # rather than waking up every tick
+                    self._wakeup_tick = next_tick
+                    self._cond.wait(next_tick * self._tick - self._clock())
+                    continue
+
+            for timer in due:
+                try:
+                    timer.fn(*timer.args)
+                except BaseException:
+                    LOGGER.error(
+                        "Exception raised by timer callback '{}':\n{}".format(
+                            timer.fn, traceback.format_exc()))
+
+
+_TIMER_WHEEL = None
+_TIMER_WHEEL_LOCK = threading.Lock()
+
+
+def get_timer_wheel():
+    """
+    Get the timer wheel shared by everything that needs to do something at a
+    given time, it is created the first time it is asked for.
+
+    :rtype: :class:`TimerWheel`
+    """
+    global _TIMER_WHEEL
+    if _TIMER_WHEEL is None:
+        with _TIMER_WHEEL_LOCK:
+            if _TIMER_WHEEL is None:
+                _TIMER_WHEEL = TimerWheel()
+    return _TIMER_WHEEL
+
+
+def set_timer_wheel(wheel):
+    """
+    Set the shared timer wheel, None means that a new one will be created
+    the next time it's needed.
+
+    :param wheel: The timer wheel
+    :type wheel: :class:`TimerWheel`
+    """
+    global _TIMER_WHEEL
+    _TIMER_WHEEL = wheel
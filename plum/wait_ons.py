@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 
 from abc import ABCMeta, abstractmethod
+import threading
 import time
 from collections import Sequence
 from plum.persistence.bundle import Bundle
-from plum.wait import WaitOn, Unsavable
+from plum.wait import WaitOn, Unsavable, get_timer_wheel
 from plum.util import override
 from plum.process_listener import ProcessListener
 from plum.process import ProcessState
@@ -16,12 +17,17 @@ class Checkpoint(WaitOn):
     This WaitOn doesn't actually wait, it's just a way to ask the engine to
     create a checkpoint at this point in the execution of a Process.
     """
-    def __init__(self):
-        super(Checkpoint, self).__init__()
+    @override
+    def init(self):
+        super(Checkpoint, self).init()
         self.done(True)
 
 
 class _CompoundWaitOn(WaitOn):
+    """
+    A wait on made up of other wait ons.  It finds out about its children
+    finishing through their done callbacks so no thread has to poll them.
+    """
     __metaclass__ = ABCMeta
 
     WAIT_LIST = 'wait_list'
@@ -29,10 +35,11 @@ class _CompoundWaitOn(WaitOn):
     def init(self, wait_list):
         super(_CompoundWaitOn, self).init()
         self._wait_list = wait_list
+        self._watch_children()
 
     @override
     def save_instance_state(self, out_state):
-        super(self.__class__, self).save_instance_state(out_state)
+        super(_CompoundWaitOn, self).save_instance_state(out_state)
         # Save all the waits lists
         waits = []
         for w in self._wait_list:
@@ -49,11 +56,49 @@ class _CompoundWaitOn(WaitOn):
         if not self.is_done():
             self._wait_list = \
                 [WaitOn.create_from(b) for b in bundle[self.WAIT_LIST]]
+            self._watch_children()
         else:
             self._wait_list = []
 
+    @abstractmethod
+    def _is_satisfied(self, num_done):
+        """
+        :param num_done: The number of children that are done
+        :return: True if this wait on is done, False otherwise
+        """
+        pass
+
+    def _watch_children(self):
+        self._child_lock = threading.Lock()
+        self._num_children_done = 0
+        self._satisfied = False
+        if self._is_satisfied(0):
+            self.done(True)
+            return
+        for w in self._wait_list:
+            w.add_done_callback(self._child_done)
+
+    def _child_done(self, wait_on):
+        with self._child_lock:
+            if self._satisfied:
+                return
+            self._num_children_done += 1
+            if not self._is_satisfied(self._num_children_done):
+                return
+            # Make sure no one else calls done
+            self._satisfied = True
+
+        # Don't keep the children that aren't done holding on to us
+        for w in self._wait_list:
+            w.remove_done_callback(self._child_done)
+        self.done(True)
+
 
 class WaitOnAll(_CompoundWaitOn):
+    """
+    Done when all the wait ons in the list are done.
+    """
+
     @override
     def init(self, wait_list):
         super(WaitOnAll, self).init(wait_list)
@@ -62,20 +107,15 @@ class WaitOnAll(_CompoundWaitOn):
     def load_instance_state(self, bundle):
         super(WaitOnAll, self).load_instance_state(bundle)
 
-    @override
-    def wait(self, timeout=None):
-        t0 = time.time()
-        for w in self._wait_list:
-            if not w.wait(timeout - (time.time() - t0)
-                          if timeout is not None else None):
-                # We timed out
-                return False
-
-        self.done(True)
-        return True
+    def _is_satisfied(self, num_done):
+        return num_done == len(self._wait_list)
 
 
 class WaitOnAny(_CompoundWaitOn):
+    """
+    Done when any of the wait ons in the list is done.
+    """
+
     @override
     def init(self, wait_list):
         super(WaitOnAny, self).init(wait_list)
@@ -84,20 +124,8 @@ class WaitOnAny(_CompoundWaitOn):
     def load_instance_state(self, bundle):
         super(WaitOnAny, self).load_instance_state(bundle)
 
-    @override
-    def wait(self, timeout=None):
-        t0 = time.time()
-        while not self.is_done():
-            if time.time() - t0 >= timeout:
-                return False
-
-            # Check if anyone is finished
-            for w in self._wait_list:
-                if w.wait(0):
-                    self.done(True)
-                    break
-
-        return True
+    def _is_satisfied(self, num_done):
+        return num_done > 0
 
 
 class WaitOnState(WaitOn, Unsavable, ProcessListener):
@@ -119,10 +147,13 @@ class WaitOnState(WaitOn, Unsavable, ProcessListener):
 
         self._proc = proc
         self._state = state
+        self._done_lock = threading.Lock()
+        self._signalled = False
+        # Start listening before checking the state so that we can't miss
+        # the process getting there in between
+        self._proc.add_process_listener(self)
         if self._proc.state is self._state:
-            self.done()
-        else:
-            self._proc.add_process_listener(self)
+            self._signal_done(self._proc)
 
     @override
     def interrupt(self):
@@ -150,6 +181,12 @@ class WaitOnState(WaitOn, Unsavable, ProcessListener):
             self._signal_done(proc)
 
     def _signal_done(self, proc):
+        with self._done_lock:
+            if self._signalled:
+                # Beaten to it
+                return
+            self._signalled = True
+        # Not under the lock, done calls the done callbacks
         try:
             self.done()
             proc.remove_process_listener(self)
@@ -182,18 +219,30 @@ class WaitOnProcess(WaitOn, Unsavable, ProcessListener):
         :type proc: :class:`plum.process.Process`
         """
         super(WaitOnProcess, self).__init__()
+        self._done_lock = threading.Lock()
+        self._signalled = False
+        # Listen before checking so that we can't miss the process
+        # terminating in between
+        proc.add_process_listener(self)
         if proc.has_terminated():
-            self.done()
-        else:
-            proc.add_process_listener(self)
+            self._signal_done(proc)
 
     @override
     def on_process_fail(self, process):
-        self.done()
+        self._signal_done(process)
 
     @override
     def on_process_stop(self, process):
+        self._signal_done(process)
+
+    def _signal_done(self, proc):
+        with self._done_lock:
+            if self._signalled:
+                return
+            self._signalled = True
+        # Not under the lock, done calls the done callbacks
         self.done()
+        proc.remove_process_listener(self)
 
 
 class WaitOnProcessOutput(WaitOn, Unsavable, ProcessListener):
@@ -252,8 +301,111 @@ class WaitRegion(object):
 
 
 class WaitForSignal(WaitOn):
-    def __init__(self):
-        super(WaitForSignal, self).__init__()
-
     def continue_(self):
         self.done(True)
+
+
+class WaitUntil(WaitOn):
+    """
+    Wait until a given (wall clock) time.  The wait is scheduled on the shared
+    timer wheel (see :func:`plum.wait.get_timer_wheel`) rather than needing a
+    thread of its own.  It can be saved and when loaded again it waits until
+    the original time, or is done straight away if that has passed.
+
+    Interrupting it takes it off the wheel, it goes back on when it is
+    waited on again.
+    """
+    END_TIME = 'end_time'
+
+    def __init__(self, *args, **kwargs):
+        # The handle of the scheduled timeout, if any
+        self._timer = None
+        # Set once the timeout has fired so we are only ever done once
+        self._timed_out = False
+        self._timer_lock = threading.Lock()
+        super(WaitUntil, self).__init__(*args, **kwargs)
+
+    @override
+    def init(self, end_time):
+        """
+        :param end_time: The time to wait until, in seconds since the epoch
+        :type end_time: float
+        """
+        super(WaitUntil, self).init()
+        self._end_time = end_time
+        self._schedule()
+
+    @property
+    def end_time(self):
+        return self._end_time
+
+    @override
+    def save_instance_state(self, out_state):
+        super(WaitUntil, self).save_instance_state(out_state)
+        out_state[self.END_TIME] = self._end_time
+
+    @override
+    def load_instance_state(self, bundle):
+        super(WaitUntil, self).load_instance_state(bundle)
+        self._end_time = bundle[self.END_TIME]
+        if not self.is_done():
+            self._schedule()
+
+    @override
+    def wait(self, timeout=None):
+        self._ensure_scheduled()
+        return super(WaitUntil, self).wait(timeout)
+
+    @override
+    def add_done_callback(self, fn):
+        self._ensure_scheduled()
+        super(WaitUntil, self).add_done_callback(fn)
+
+    @override
+    def interrupt(self):
+        # Don't keep us (and whatever is waiting on us) on the wheel
+        self._cancel()
+        super(WaitUntil, self).interrupt()
+
+    def _schedule(self, replace=True):
+        with self._timer_lock:
+            if self._timed_out:
+                return
+            if self._timer is not None:
+                if not replace:
+                    return
+                self._timer.cancel()
+            self._timer = get_timer_wheel().call_at(
+                self._end_time, self._timeout)
+
+    def _ensure_scheduled(self):
+        if not self.is_done():
+            self._schedule(replace=False)
+
+    def _cancel(self):
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _timeout(self):
+        with self._timer_lock:
+            self._timer = None
+            if self._timed_out or self.is_done():
+                return
+            self._timed_out = True
+        self.done(True)
+
+
+class Sleep(WaitUntil):
+    """
+    Wait for a number of seconds, see :class:`WaitUntil`.
+    """
+
+    @override
+    def init(self, interval):
+        """
+        :param interval: The time to wait for in seconds
+        :type interval: float
+        """
+        super(Sleep, self).init(time.time() + interval)
@@ -8,11 +8,13 @@ value is passed to all of them when the workflow starts.
 """
 
 from abc import ABCMeta
-import threading
+import warnings
 from plum.port import DynamicOutputPort
 from plum.process import Process, ProcessSpec
 from plum.process_listener import ProcessListener
+import plum.tracing as tracing
 import plum.util as util
+from plum.util import override
 
 
 class ProcessLink(object):
@@ -37,6 +39,10 @@ class ProcessLink(object):
     def sink_port(self):
         return self._sink_port
 
+    @property
+    def sink(self):
+        return "{}:{}".format(self._sink_process, self._sink_port)
+
     def __str__(self):
         return "{}:{} => {}:{}".format(
             self.source_process, self.source_port,
@@ -121,6 +127,7 @@ class WorkflowSpec(ProcessSpec):
     def __init__(self):
         super(WorkflowSpec, self).__init__()
         self._processes = {}
+        # {source: [links]}, an output can go to any number of inputs
         self._outgoing_links = {}
         self._incoming_links = {}
 
@@ -141,7 +148,7 @@ class WorkflowSpec(ProcessSpec):
 
     def exposed_inputs(self, process_name):
         proc = self.get_process(process_name)
-        for name, port in proc.spec().raw_inputs.iteritems():
+        for name, port in proc.spec().inputs.iteritems():
             self.input_port(name, port)
             self.link(":{}".format(name),
                       "{}:{}".format(process_name, name))
@@ -167,17 +174,48 @@ class WorkflowSpec(ProcessSpec):
         else:
             return []
 
+    def get_links(self, output):
+        """
+        :return: The links from an output, there may be none
+        :rtype: list
+        """
+        return self._outgoing_links.get(output, [])
+
     def get_link(self, output):
-        return self._outgoing_links[output]
+        """
+        Deprecated, an output can have more than one link, use
+        :func:`get_links`.
+
+        :return: The first link from an output
+        :raises KeyError: If the output has no links
+        """
+        warnings.warn("get_link is deprecated, use get_links",
+                      DeprecationWarning, stacklevel=2)
+        links = self.get_links(output)
+        if not links:
+            raise KeyError(output)
+        return links[0]
+
+    def remove_links(self, output):
+        """
+        Remove all the links from an output.
+        """
+        for link in self._outgoing_links.pop(output):
+            self._incoming_links[link.sink].remove(link)
 
     def remove_link(self, output):
-        self._outgoing_links.pop(output)
+        """
+        Deprecated, use :func:`remove_links`.
+        """
+        warnings.warn("remove_link is deprecated, use remove_links",
+                      DeprecationWarning, stacklevel=2)
+        self.remove_links(output)
 
     def link(self, source, sink):
-        if source in self.links:
-            raise ValueError("Link from {} already exists, remove first")
-
         link = ProcessLink(source, sink)
+        if any(l.sink == link.sink for l in self.get_links(source)):
+            raise ValueError(
+                "Link from {} to {} already exists".format(source, sink))
 
         if not link.source_process:
             # Use workflow input port
@@ -200,12 +238,50 @@ class WorkflowSpec(ProcessSpec):
 
         # TODO: Check type compatibility of source and sink
 
-        self._outgoing_links[source] = link
-        self._incoming_links.setdefault(sink, []).append(link)
+        self._outgoing_links.setdefault(source, []).append(link)
+        self._incoming_links.setdefault(link.sink, []).append(link)
         return link
 
 
+class _SubprocessListener(ProcessListener):
+    """
+    Passes the messages from the subprocesses of a workflow on to it.  The
+    workflow can't be added as a listener itself as its on_output_emitted is
+    the one from Process.
+    """
+
+    def __init__(self, workflow):
+        self._workflow = workflow
+
+    @override
+    def on_process_run(self, process):
+        self._workflow.on_process_run(process)
+
+    @override
+    def on_output_emitted(self, process, output_port, value, dynamic):
+        self._workflow._on_subprocess_output(
+            process, output_port, value, dynamic)
+
+    @override
+    def on_process_finish(self, process):
+        self._workflow.on_process_finish(process)
+
+    @override
+    def on_process_stop(self, process):
+        self._workflow.on_process_stop(process)
+
+    @override
+    def on_process_fail(self, process):
+        self._workflow.on_process_fail(process)
+
+
 class Workflow(Process, ProcessListener):
+    """
+    A process made up of other processes with the outputs of some linked to
+    the inputs of others.  The subprocesses are run, one at a time, as soon
+    as all their linked inputs have a value.  If one of them fails the
+    workflow fails with the same exception.
+    """
     __metaclass__ = ABCMeta
 
     # Static class stuff ######################
@@ -213,56 +289,32 @@ class Workflow(Process, ProcessListener):
 
     ###########################################
 
-    def __init__(self):
-        super(Workflow, self).__init__()
+    def __init__(self, inputs, pid, logger=None):
+        super(Workflow, self).__init__(inputs, pid, logger)
         self._workflow_evt_helper = util.EventHelper(WorkflowListener)
+        self._subprocess_listener = _SubprocessListener(self)
+        # {local name: process} of the subprocesses that have been started
         self._process_instances = {}
         self._input_buffer = {}
-        self._num_running_subprocs = util.ThreadSafeCounter()
-        self._wait_event = None
 
-        # Create all our subprocess classes
-        for name, proc_class in self.spec().processes.iteritems():
-            proc = proc_class.new()
-            proc.add_process_listener(self)
-            self._process_instances[name] = proc
+    def add_workflow_listener(self, listener):
+        self._workflow_evt_helper.add_listener(listener)
+
+    def remove_workflow_listener(self, listener):
+        self._workflow_evt_helper.remove_listener(listener)
 
     # From ProcessListener ##########################
     def on_process_run(self, process):
         self._on_subprocess_starting(process)
 
-    def on_output_emitted(self, process, output_port, value, dynamic):
-        local_name = self.get_local_name(process)
-        if dynamic:
-            source = local_name + ":" + DynamicOutputPort.NAME
-        else:
-            source = local_name + ":" + output_port
-        try:
-            link = self.spec().get_link(source)
-            if not link.sink_process:
-                self.out(link.sink_port, value)
-            else:
-                proc = self._process_instances[link.sink_process]
-                self._push_value(link, value)
-
-                # If the process receiving this input is ready then run it
-                try:
-                    inputs = self._generate_inputs_for(proc)
-                    self._launch_subprocess(proc, inputs)
-                except ValueError:
-                    # Not ready to run
-                    self._on_value_buffered(link, value)
-
-            sink = "{}:{}".format(link.sink_process, link.sink_port)
-        except KeyError:
-            # The output isn't connected, nae dramas
-            sink = None
+    def on_process_finish(self, process):
+        self._on_subprocess_finished(process)
 
     def on_process_stop(self, process):
         self._on_subprocess_finalising(process)
 
-    def on_process_finish(self, process):
-        self._on_subprocess_finished(process)
+    def on_process_fail(self, process):
+        self._on_subprocess_finalising(process)
     ##################################################
 
     def _run(self, **kwargs):
@@ -272,23 +324,22 @@ class Workflow(Process, ProcessListener):
         self._run_workflow(**kwargs)
 
         self._workflow_evt_helper.fire_event(
-            WorkflowListener.on_workflow_finished, self)
+            WorkflowListener.on_workflow_finished, self, self.outputs)
 
     def _run_workflow(self, **kwargs):
         self._initialise_inputs(**kwargs)
 
-        self._wait_event = threading.Event()
-
-        for proc in self._process_instances.itervalues():
-            try:
-                inputs = self._generate_inputs_for(proc)
-                self._launch_subprocess(proc, inputs)
-            except ValueError:
-                pass
-
-        # Wait for all subprocess to finish
-        self._wait_event.wait()
-        self._wait_event = None
+        # Keep going while running a subprocess makes others ready
+        waiting = set(self.spec().processes)
+        launched = True
+        while waiting and launched:
+            launched = False
+            for name in sorted(waiting):
+                links = self._get_ready_links(name)
+                if links is not None:
+                    waiting.remove(name)
+                    self._launch_subprocess(name, self._pop_inputs(links))
+                    launched = True
 
     def get_local_name(self, process):
         for name, proc in self._process_instances.iteritems():
@@ -298,44 +349,73 @@ class Workflow(Process, ProcessListener):
 
     def _initialise_inputs(self, **kwargs):
         for key, value in kwargs.iteritems():
-            try:
-                # Push the input value to the links
-                link = self.spec().get_link(":{}".format(key))
+            # Push the input value to the links, if it isn't connected then
+            # nae dramas
+            for link in self.spec().get_links(":{}".format(key)):
                 self._push_value(link, value)
-            except KeyError:
-                # The input isn't connected, nae dramas
-                pass
 
-    def _generate_inputs_for(self, proc):
+    def _on_subprocess_output(self, process, output_port, value, dynamic):
+        local_name = self.get_local_name(process)
+        if dynamic:
+            source = local_name + ":" + DynamicOutputPort.NAME
+        else:
+            source = local_name + ":" + output_port
+
+        for link in self.spec().get_links(source):
+            if not link.sink_process:
+                self.out(link.sink_port, value)
+            else:
+                self._push_value(link, value)
+                if self._get_ready_links(link.sink_process) is None:
+                    # Not ready to run
+                    self._on_value_buffered(link, value)
+
+    def _get_ready_links(self, name):
+        """
+        :return: The links into the inputs of a subprocess if they all have a
+            value, otherwise None
+        """
         ready_links = []
-        for input_name in proc.spec().raw_inputs:
-            sink = "{}:{}".format(self.get_local_name(proc), input_name)
+        proc_class = self.spec().get_process(name)
+        for input_name in proc_class.spec().inputs:
+            sink = "{}:{}".format(name, input_name)
             for link in self.spec().get_incoming_links(sink):
-                if str(link) in self._input_buffer:
-                    ready_links.append(link)
-                else:
-                    raise ValueError(
-                        "Cannot generate inputs for process as not all links "
-                        "have a value ready.")
-        # All the links have ready values so get them
-        return {link.sink_port: self._pop_value(link) for link in ready_links}
+                if str(link) not in self._input_buffer:
+                    return None
+                ready_links.append(link)
+        return ready_links
+
+    def _pop_inputs(self, links):
+        inputs = {}
+        for link in links:
+            value = self._pop_value(link)
+            inputs[link.sink_port] = value
+            self._on_value_consumed(link, value)
+        return inputs
 
     def _push_value(self, link, value):
-        self._input_buffer[str(link)] = value
+        with tracing.span("push value", "workflow", link=str(link)):
+            self._input_buffer[str(link)] = value
 
     def _pop_value(self, link):
-        value = self._input_buffer.pop(str(link))
-        return value
-
-    def _launch_subprocess(self, proc, inputs):
-        self._num_running_subprocs.increment()
-        self.get_exec_engine().submit(proc, inputs).add_done_callback(
-            self._subproc_done)
-
-    def _subproc_done(self, fut):
-        self._num_running_subprocs.decrement()
-        if self._num_running_subprocs.value == 0:
-            self._wait_event.set()
+        with tracing.span("pop value", "workflow", link=str(link)):
+            return self._input_buffer.pop(str(link))
+
+    def _launch_subprocess(self, name, inputs):
+        with tracing.span("launch subprocess", "workflow",
+                          workflow=str(self.pid), subprocess=name):
+            proc = self.spec().get_process(name).new(
+                inputs, logger=self.logger)
+            self._process_instances[name] = proc
+            proc.add_process_listener(self._subprocess_listener)
+            proc.play()
+
+        # Its outputs are needed by the rest, so don't carry on without them
+        if proc.has_failed():
+            raise proc.get_exception()
+        if not proc.has_finished():
+            raise RuntimeError(
+                "Subprocess '{}' stopped without finishing".format(name))
 
     # Workflow messages #################################################
     # Make sure to call the superclass if your override any of these ####
@@ -0,0 +1,88 @@
+from unittest import TestCase
+import threading
+from plum.persistence.coalescing_writer import CoalescingWriter
+
+
+class _Recorder(object):
+    def __init__(self):
+        self.written = []
+        self.lock = threading.Lock()
+        # Cleared to hold up writing
+        self.go = threading.Event()
+        self.go.set()
+
+    def __call__(self, key, value):
+        self.go.wait()
+        with self.lock:
+            self.written.append((key, value))
+
+
+class TestCoalescingWriter(TestCase):
+    def test_write(self):
+        recorder = _Recorder()
+        writer = CoalescingWriter(recorder)
+        writer.submit('a', 1)
+        writer.flush()
+        self.assertEqual(recorder.written, [('a', 1)])
+        writer.close()
+
+    def test_coalesce(self):
+        recorder = _Recorder()
+        writer = CoalescingWriter(recorder, interval=60.)
+        for i in range(10):
+            writer.submit('a', i)
+            writer.submit('b', -i)
+        # Nothing is due yet
+        self.assertEqual(recorder.written, [])
+
+        writer.flush()
+        self.assertEqual(recorder.written, [('a', 9), ('b', -9)])
+        writer.close()
+
+    def test_in_order(self):
+        recorder = _Recorder()
+        writer = CoalescingWriter(recorder, num_threads=4)
+        recorder.go.clear()
+        writer.submit('a', 0)
+        # Superseded while the first is being written
+        for i in range(1, 10):
+            writer.submit('a', i)
+        recorder.go.set()
+        writer.flush()
+
+        values = [value for key, value in recorder.written]
+        self.assertEqual(values[-1], 9)
+        self.assertEqual(values, sorted(values))
+        writer.close()
+
+    def test_flush_key(self):
+        recorder = _Recorder()
+        writer = CoalescingWriter(recorder, interval=60.)
+        writer.submit('a', 1)
+        writer.submit('b', 2)
+        writer.flush('b')
+        self.assertEqual(recorder.written, [('b', 2)])
+        writer.close()
+        self.assertEqual(recorder.written, [('b', 2), ('a', 1)])
+
+    def test_discard(self):
+        recorder = _Recorder()
+        writer = CoalescingWriter(recorder, interval=60.)
+        writer.submit('a', 1)
+        writer.discard('a')
+        writer.close()
+        self.assertEqual(recorder.written, [])
+
+    def test_exception(self):
+        written = []
+
+        def write(key, value):
+            if value is None:
+                raise ValueError()
+            written.append(key)
+
+        writer = CoalescingWriter(write)
+        writer.submit('a', None)
+        writer.submit('b', 1)
+        writer.close()
+        self.assertEqual(written, ['b'])
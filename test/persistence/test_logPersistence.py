@@ -0,0 +1,159 @@
+from unittest import TestCase
+import glob
+import os.path
+import shutil
+import tempfile
+from plum.persistence.bundle import Bundle
+from plum.persistence.log_persistence import LogPersistence, RUNNING, \
+    FINISHED, FAILED
+from plum.process import Process
+from plum.process_monitor import MONITOR
+from plum.test_utils import ProcessWithCheckpoint, WaitForSignalProcess, \
+    ExceptionProcess, TwoCheckpointThenException
+
+
+class TestLogPersistence(TestCase):
+    def setUp(self):
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+        self.store_dir = tempfile.mkdtemp()
+        self.persistence = LogPersistence(directory=self.store_dir)
+
+    def tearDown(self):
+        self.persistence.close()
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+        shutil.rmtree(self.store_dir)
+
+    def test_persist_process(self):
+        proc = ProcessWithCheckpoint.new()
+        self.persistence.persist_process(proc)
+        self.assertEqual(self.persistence.get_pids(), [proc.pid])
+
+        b = Bundle()
+        proc.save_instance_state(b)
+        self.assertEqual(self.persistence.load_checkpoint(proc.pid), b)
+        self.assertEqual(self.persistence.load_all_checkpoints(), [b])
+
+    def test_waiting_process(self):
+        proc = WaitForSignalProcess.new()
+        self.persistence.persist_process(proc)
+        proc.play(block_on_wait=False)
+
+        loaded = Process.load(self.persistence.load_checkpoint(proc.pid))
+        self.assertIs(loaded.__class__, WaitForSignalProcess)
+        self.assertEqual(loaded.state, proc.state)
+
+        proc.continue_()
+        proc.play()
+
+    def test_finished(self):
+        proc = ProcessWithCheckpoint.new()
+        self.persistence.persist_process(proc)
+        proc.play()
+        self.assertEqual(self.persistence.get_pids(), [])
+        self.assertEqual(self.persistence.get_pids(FINISHED), [proc.pid])
+        self.assertEqual(self.persistence.get_status(proc.pid), FINISHED)
+        self.assertTrue(
+            self.persistence.load_checkpoint(proc.pid)[
+                Process.BundleKeys.FINISHED.value])
+
+    def test_failed(self):
+        proc = TwoCheckpointThenException.new()
+        self.persistence.persist_process(proc)
+        proc.play()
+        self.assertEqual(self.persistence.get_pids(FAILED), [proc.pid])
+        self.assertEqual(self.persistence.get_pids(RUNNING), [])
+        # The last checkpoint before failing is kept
+        self.assertIsNotNone(self.persistence.load_checkpoint(proc.pid))
+
+    def test_not_kept(self):
+        persistence = LogPersistence(
+            directory=tempfile.mkdtemp(dir=self.store_dir),
+            keep_finished=False, keep_failed=False)
+        try:
+            finishes = ProcessWithCheckpoint.new()
+            fails = ExceptionProcess.new()
+            for proc in (finishes, fails):
+                persistence.persist_process(proc)
+                proc.play()
+            self.assertEqual(persistence.get_pids(None), [])
+            with self.assertRaises(ValueError):
+                persistence.load_checkpoint(finishes.pid)
+        finally:
+            persistence.close()
+
+        # Still gone when the log is read back
+        persistence = LogPersistence(directory=persistence.directory)
+        try:
+            self.assertEqual(persistence.get_pids(None), [])
+        finally:
+            persistence.close()
+
+    def test_recover(self):
+        procs = [ProcessWithCheckpoint.new() for _ in range(3)]
+        for proc in procs:
+            self.persistence.persist_process(proc)
+        procs[0].play()
+        self.persistence.close()
+
+        segment = glob.glob(os.path.join(self.store_dir, "*.log"))[0]
+        size = os.path.getsize(segment)
+        # A torn write at the end
+        with open(segment, 'ab') as f:
+            f.write('\x01\x02\x03')
+
+        self.persistence = LogPersistence(directory=self.store_dir)
+        self.assertItemsEqual(
+            self.persistence.get_pids(), [p.pid for p in procs[1:]])
+        self.assertEqual(self.persistence.get_pids(FINISHED), [procs[0].pid])
+        self.assertEqual(os.path.getsize(segment), size)
+        self.assertEqual(len(self.persistence.load_all_checkpoints()), 2)
+
+    def test_compact(self):
+        self.persistence.close()
+        self.persistence = LogPersistence(
+            directory=self.store_dir, max_segment_size=1024,
+            compact_ratio=2.)
+
+        procs = [WaitForSignalProcess.new() for _ in range(3)]
+        for proc in procs:
+            self.persistence.persist_process(proc)
+        for _ in range(20):
+            for proc in procs:
+                self.persistence.save(proc)
+        num_segments = len(glob.glob(os.path.join(self.store_dir, "*.log")))
+        self.assertGreater(num_segments, 2)
+
+        self.persistence.compact()
+        self.assertEqual(
+            len(glob.glob(os.path.join(self.store_dir, "*.log"))), 2)
+        self.assertEqual(len(self.persistence.load_all_checkpoints()), 3)
+
+        # And it should all be there when read back
+        self.persistence.close()
+        self.persistence = LogPersistence(directory=self.store_dir)
+        self.assertItemsEqual(
+            self.persistence.get_pids(), [p.pid for p in procs])
+        for proc in procs:
+            b = Bundle()
+            proc.save_instance_state(b)
+            self.assertEqual(self.persistence.load_checkpoint(proc.pid), b)
+
+    def test_compact_saved_after_remove(self):
+        self.persistence.close()
+        self.persistence = LogPersistence(
+            directory=self.store_dir, max_segment_size=1,
+            compact_ratio=2., keep_finished=False)
+
+        proc = ProcessWithCheckpoint.new()
+        self.persistence.persist_process(proc)
+        proc.play()
+        # Removed when it finished, now saved again
+        self.assertEqual(self.persistence.get_pids(None), [])
+        self.persistence.save(proc)
+
+        self.persistence.compact()
+        self.assertEqual(self.persistence.get_pids(), [proc.pid])
+
+        self.persistence.close()
+        self.persistence = LogPersistence(directory=self.store_dir)
+        self.assertEqual(self.persistence.get_pids(), [proc.pid])
@@ -1,12 +1,73 @@
 
 from unittest import TestCase
+import gc
+import pickle
+from plum.persistence.bundle import Bundle
 from plum.persistence.pickle_persistence import PicklePersistence
+from plum.process import Process, ProcessState
+from plum.process_listener import ProcessListener
 from plum.process_monitor import MONITOR
 from plum.test_utils import ProcessWithCheckpoint, WaitForSignalProcess
+from plum.util import override
+from plum.wait_ons import Checkpoint, wait_until
 import os.path
 import threading
 
 
+class ManySteps(Process):
+    @classmethod
+    def define(cls, spec):
+        super(ManySteps, cls).define(spec)
+        spec.input('big')
+        spec.input('steps', default=5, required=False)
+        spec.dynamic_output()
+
+    def __init__(self, inputs, pid, logger=None):
+        super(ManySteps, self).__init__(inputs, pid, logger)
+        self._step = 0
+
+    @override
+    def _run(self, big, steps):
+        return Checkpoint(), self.step
+
+    def step(self, wait_on):
+        self.out('out{}'.format(self._step), self._step)
+        self._step += 1
+        if self._step < self.inputs.steps:
+            return Checkpoint(), self.step
+
+    @override
+    def save_instance_state(self, bundle):
+        super(ManySteps, self).save_instance_state(bundle)
+        bundle['step'] = self._step
+
+    @override
+    def load_instance_state(self, bundle):
+        super(ManySteps, self).load_instance_state(bundle)
+        self._step = bundle['step']
+
+
+class _SnapshotOnFinish(ProcessListener):
+    def __init__(self):
+        self.bundle = None
+
+    @override
+    def on_process_finish(self, process):
+        self.bundle = Bundle()
+        process.save_instance_state(self.bundle)
+
+
+def _num_records(filename):
+    num = 0
+    with open(filename, 'rb') as f:
+        while True:
+            try:
+                pickle.load(f)
+            except EOFError:
+                return num
+            num += 1
+
+
 class TestPicklePersistence(TestCase):
     def setUp(self):
         import tempfile
@@ -78,6 +139,149 @@ class TestPicklePersistence(TestCase):
         self.pickle_persistence.save(proc)
         self.assertTrue(os.path.isfile(running_path))
 
+    def test_delta(self):
+        persistence = PicklePersistence(
+            running_directory=self.store_dir, delta=True,
+            finished_directory=os.path.join(self.store_dir, 'finished'))
+        proc = ManySteps.new({'big': range(10000)})
+        persistence.persist_process(proc)
+        running_path = persistence.get_running_path(proc.pid)
+        full_size = os.path.getsize(running_path)
+
+        snapshot = _SnapshotOnFinish()
+        proc.add_process_listener(snapshot)
+        proc.play()
+
+        finished_path = os.path.join(
+            persistence.finished_directory, persistence.pickle_filename(proc.pid))
+        # The inputs should only have been written once
+        self.assertLess(os.path.getsize(finished_path), 2 * full_size)
+        self.assertGreater(_num_records(finished_path), 5)
+        self.assertEqual(
+            persistence.load_checkpoint(proc.pid), snapshot.bundle)
+
+        loaded = Process.load(persistence.load_checkpoint(proc.pid))
+        self.assertEqual(loaded.outputs, proc.outputs)
+
+    def test_delta_compaction(self):
+        persistence = PicklePersistence(
+            running_directory=self.store_dir, delta=True, compact_every=2)
+        proc = ManySteps.new({'big': 1})
+        persistence.persist_process(proc)
+        running_path = persistence.get_running_path(proc.pid)
+
+        counts = []
+
+        class Counter(ProcessListener):
+            @override
+            def on_process_wait(self, process):
+                counts.append(_num_records(running_path))
+
+        proc.add_process_listener(Counter())
+        proc.play()
+        self.assertTrue(counts)
+        self.assertLessEqual(max(counts), 3)
+
+    def test_delta_truncated(self):
+        persistence = PicklePersistence(
+            running_directory=self.store_dir, delta=True)
+        proc = WaitForSignalProcess.new()
+        persistence.persist_process(proc)
+        running_path = persistence.get_running_path(proc.pid)
+
+        snapshots = []
+
+        class Snapshots(ProcessListener):
+            @override
+            def on_process_run(self, process):
+                snapshots.append(Bundle())
+                process.save_instance_state(snapshots[-1])
+
+            @override
+            def on_process_wait(self, process):
+                self.on_process_run(process)
+
+        proc.add_process_listener(Snapshots())
+        proc.play(block_on_wait=False)
+        self.assertEqual(persistence.load_checkpoint(proc.pid), snapshots[-1])
+
+        # Chop the last delta in half, it should be as if it was never there
+        size = os.path.getsize(running_path)
+        ends = []
+        with open(running_path, 'rb') as f:
+            while f.tell() < size:
+                pickle.load(f)
+                ends.append(f.tell())
+        with open(running_path, 'r+b') as f:
+            f.truncate((ends[-2] + ends[-1]) // 2)
+        self.assertEqual(persistence.load_checkpoint(proc.pid), snapshots[0])
+
+        proc.continue_()
+        proc.play()
+
+    def test_delta_paused_dropped(self):
+        persistence = PicklePersistence(
+            running_directory=self.store_dir, delta=True)
+        proc = WaitForSignalProcess.new()
+        persistence.persist_process(proc)
+        t = threading.Thread(target=proc.play)
+        t.start()
+        self.assertTrue(wait_until(proc, ProcessState.WAITING, timeout=2))
+        proc.pause()
+        t.join(2.)
+        self.assertFalse(t.is_alive())
+        self.assertEqual(len(persistence._delta_states), 1)
+
+        del proc, t
+        gc.collect()
+        self.assertEqual(len(persistence._delta_states), 0)
+
+    def test_async(self):
+        persistence = PicklePersistence(
+            running_directory=self.store_dir, io_threads=2,
+            finished_directory=os.path.join(self.store_dir, 'finished'))
+        proc = WaitForSignalProcess.new()
+        persistence.persist_process(proc)
+
+        snapshots = []
+
+        class Snapshot(ProcessListener):
+            @override
+            def on_process_wait(self, process):
+                snapshots.append(Bundle())
+                process.save_instance_state(snapshots[-1])
+
+        proc.add_process_listener(Snapshot())
+        proc.play(block_on_wait=False)
+        self.assertEqual(persistence.load_checkpoint(proc.pid), snapshots[-1])
+
+        proc.continue_()
+        proc.play()
+        finished_path = os.path.join(
+            persistence.finished_directory, persistence.pickle_filename(proc.pid))
+        self.assertTrue(os.path.isfile(finished_path))
+        persistence.close()
+
+    def test_async_coalesce(self):
+        persistence = PicklePersistence(
+            running_directory=self.store_dir, delta=True, io_threads=1,
+            write_interval=60.,
+            finished_directory=os.path.join(self.store_dir, 'finished'))
+        proc = ManySteps.new({'big': 1})
+        persistence.persist_process(proc)
+        snapshot = _SnapshotOnFinish()
+        proc.add_process_listener(snapshot)
+        proc.play()
+
+        finished_path = os.path.join(
+            persistence.finished_directory, persistence.pickle_filename(proc.pid))
+        # The snapshot from persisting it and a delta when it finished, the
+        # checkpoints in between were superseded before being written
+        self.assertEqual(_num_records(finished_path), 2)
+        self.assertEqual(
+            persistence.load_checkpoint(proc.pid), snapshot.bundle)
+        persistence.close()
+
     def _empty_directory(self):
         import shutil
         if os.path.isdir(self.store_dir):
@@ -0,0 +1,144 @@
+from unittest import TestCase
+import os.path
+import shutil
+import tempfile
+import threading
+from plum.persistence.bundle import Bundle
+from plum.persistence.sqlite_persistence import SqlitePersistence, RUNNING, \
+    FINISHED, FAILED
+from plum.process import Process, ProcessState
+from plum.process_monitor import MONITOR
+from plum.test_utils import ProcessWithCheckpoint, WaitForSignalProcess, \
+    ExceptionProcess, TwoCheckpointThenException
+
+
+class TestSqlitePersistence(TestCase):
+    def setUp(self):
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+        self.store_dir = tempfile.mkdtemp()
+        self.persistence = SqlitePersistence(
+            database=os.path.join(self.store_dir, "plum.db"))
+
+    def tearDown(self):
+        self.persistence.close()
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+        shutil.rmtree(self.store_dir)
+
+    def test_persist_process(self):
+        proc = ProcessWithCheckpoint.new()
+        self.persistence.persist_process(proc)
+        self.assertEqual(self.persistence.get_pids(), [proc.pid])
+
+        b = Bundle()
+        proc.save_instance_state(b)
+        self.assertEqual(self.persistence.load_checkpoint(proc.pid), b)
+        self.assertEqual(self.persistence.load_all_checkpoints(), [b])
+
+    def test_waiting_process(self):
+        proc = WaitForSignalProcess.new()
+        self.persistence.persist_process(proc)
+        proc.play(block_on_wait=False)
+
+        self.assertEqual(
+            self.persistence.find_pids(state=ProcessState.WAITING),
+            [proc.pid])
+        loaded = Process.load(self.persistence.load_checkpoint(proc.pid))
+        self.assertIs(loaded.__class__, WaitForSignalProcess)
+        self.assertEqual(loaded.state, proc.state)
+
+        proc.continue_()
+        proc.play()
+
+    def test_finished(self):
+        proc = ProcessWithCheckpoint.new()
+        self.persistence.persist_process(proc)
+        proc.play()
+        self.assertEqual(self.persistence.get_pids(), [])
+        self.assertEqual(self.persistence.get_pids(FINISHED), [proc.pid])
+        self.assertEqual(self.persistence.get_status(proc.pid), FINISHED)
+        self.assertTrue(
+            self.persistence.load_checkpoint(proc.pid)[
+                Process.BundleKeys.FINISHED.value])
+
+    def test_failed(self):
+        proc = TwoCheckpointThenException.new()
+        self.persistence.persist_process(proc)
+        proc.play()
+        self.assertEqual(self.persistence.get_pids(FAILED), [proc.pid])
+        self.assertEqual(self.persistence.get_pids(RUNNING), [])
+        # The last checkpoint before failing is kept
+        self.assertIsNotNone(self.persistence.load_checkpoint(proc.pid))
+
+    def test_not_kept(self):
+        self.persistence.close()
+        self.persistence = SqlitePersistence(
+            database=self.persistence.database,
+            keep_finished=False, keep_failed=False)
+
+        finishes = ProcessWithCheckpoint.new()
+        fails = ExceptionProcess.new()
+        for proc in (finishes, fails):
+            self.persistence.persist_process(proc)
+            proc.play()
+        self.assertEqual(self.persistence.get_pids(None), [])
+        with self.assertRaises(ValueError):
+            self.persistence.load_checkpoint(finishes.pid)
+
+    def test_find_pids(self):
+        procs = [ProcessWithCheckpoint.new() for _ in range(2)] + \
+                [TwoCheckpointThenException.new() for _ in range(2)]
+        for proc in procs:
+            self.persistence.persist_process(proc)
+        for proc in procs[1:3]:
+            proc.play()
+
+        self.assertEqual(
+            self.persistence.find_pids(FAILED, TwoCheckpointThenException),
+            [procs[2].pid])
+        self.assertItemsEqual(
+            self.persistence.find_pids(class_name=ProcessWithCheckpoint),
+            [p.pid for p in procs[:2]])
+        self.assertEqual(
+            self.persistence.find_pids(
+                RUNNING, "plum.test_utils.TwoCheckpointThenException"),
+            [procs[3].pid])
+        self.assertEqual(self.persistence.get_pids(FINISHED), [procs[1].pid])
+
+    def test_reopen(self):
+        procs = [ProcessWithCheckpoint.new() for _ in range(3)]
+        for proc in procs:
+            self.persistence.persist_process(proc)
+        procs[0].play()
+        self.persistence.close()
+
+        self.persistence = SqlitePersistence(
+            database=self.persistence.database)
+        self.assertItemsEqual(
+            self.persistence.get_pids(), [p.pid for p in procs[1:]])
+        self.assertEqual(self.persistence.get_pids(FINISHED), [procs[0].pid])
+        self.assertEqual(len(self.persistence.load_all_checkpoints()), 2)
+
+    def test_many_threads(self):
+        procs = [WaitForSignalProcess.new() for _ in range(20)]
+
+        def save(proc):
+            for _ in range(5):
+                self.persistence.save(proc)
+
+        threads = [threading.Thread(target=save, args=(proc,))
+                   for proc in procs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertItemsEqual(
+            self.persistence.get_pids(), [p.pid for p in procs])
+
+    def test_flush(self):
+        procs = [ProcessWithCheckpoint.new() for _ in range(10)]
+        for proc in procs:
+            self.persistence.save(proc, wait=False)
+        self.persistence.flush()
+        self.assertItemsEqual(
+            self.persistence.get_pids(), [p.pid for p in procs])
@@ -21,3 +21,9 @@ class TestAttributesFrozendict(TestCase):
         d = AttributesFrozendict()
         with self.assertRaises(TypeError):
             d['a'] = 5
+
+    def test_from_frozendict(self):
+        value = object()
+        d = AttributesFrozendict(AttributesFrozendict({'a': value}))
+        self.assertIs(d.a, value)
+        self.assertEqual(d, {'a': value})
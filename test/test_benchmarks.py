@@ -0,0 +1,23 @@
+from benchmarks.runner import compare, get_benchmarks, run_benchmarks
+from util import TestCase
+
+
+class TestBenchmarks(TestCase):
+    def test_run_all(self):
+        # Just make sure they all still work
+        results = run_benchmarks(repeat=1, scale=0.01)
+        self.assertEqual(set(results['results'].keys()),
+                         set(get_benchmarks().keys()))
+        for name, result in results['results'].iteritems():
+            if 'skipped' not in result:
+                self.assertGreater(result['per_op'], 0, name)
+
+    def test_compare(self):
+        baseline = {'results': {
+            'a': {'per_op': 1.0}, 'b': {'per_op': 1.0}, 'c': {'skipped': ''}}}
+        results = {'results': {
+            'a': {'per_op': 1.1}, 'b': {'per_op': 1.5}, 'c': {'per_op': 1.0},
+            'd': {'per_op': 1.0}}}
+        regressions = compare(results, baseline, tolerance=0.2)
+        self.assertEqual([r[0] for r in regressions], ['b'])
+        self.assertAlmostEqual(regressions[0][3], 1.5)
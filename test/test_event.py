@@ -1,8 +1,12 @@
 
+import threading
+import time
 from util import TestCase
-from plum.event import ProcessMonitorEmitter, WaitOnProcessEvent, EmitterAggregator, EventEmitter
+from plum.event import ProcessMonitorEmitter, WaitOnProcessEvent, EmitterAggregator, EventEmitter, \
+    PollingEmitter
 from plum.test_utils import DummyProcess, ExceptionProcess
 from plum.util import ListenContext
+from plum.wait_ons import Sleep
 
 
 class _EventSaver(object):
@@ -211,6 +215,52 @@ class TestEmitterAggregator(TestCase):
         self.last = emitter, evt, body
 
 
-
-
-
+class _Poller(PollingEmitter):
+    def __init__(self, poll_interval):
+        super(_Poller, self).__init__(poll_interval)
+        self.num_polls = 0
+        self.polled = threading.Event()
+
+    def poll(self):
+        self.num_polls += 1
+        if self.num_polls == 3:
+            self.polled.set()
+
+
+class TestPollingEmitter(TestCase):
+    def test_polling(self):
+        poller = _Poller(0.01)
+        self.assertFalse(poller.is_polling())
+
+        saver = _EventSaver(poller)
+        self.assertTrue(poller.is_polling())
+        self.assertTrue(poller.polled.wait(2))
+
+        poller.stop_listening(saver.event_ocurred)
+        self.assertFalse(poller.is_polling())
+        # A poll that had already started is allowed to finish
+        time.sleep(0.02)
+        num_polls = poller.num_polls
+        time.sleep(0.05)
+        self.assertEqual(poller.num_polls, num_polls)
+
+    def test_slow_poll(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        class Blocking(PollingEmitter):
+            def poll(self):
+                started.set()
+                release.wait()
+
+        poller = Blocking(0.01)
+        saver = _EventSaver(poller)
+        try:
+            self.assertTrue(started.wait(2))
+            # A poll that blocks doesn't hold up the timer wheel
+            self.assertTrue(Sleep(0.02).wait(1))
+            # or the emitter
+            self.assertEqual(poller.num_listening(), 1)
+        finally:
+            poller.stop_listening(saver.event_ocurred)
+            release.set()
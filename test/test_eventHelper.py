@@ -0,0 +1,88 @@
+from unittest import TestCase
+from plum.process_listener import ProcessListener
+from plum.util import EventHelper, override
+
+
+class StartListener(ProcessListener):
+    def __init__(self):
+        self.events = []
+
+    @override
+    def on_process_start(self, process):
+        self.events.append('start')
+
+
+class StartStopListener(StartListener):
+    @override
+    def on_process_stop(self, process):
+        self.events.append('stop')
+
+
+class RemovingListener(ProcessListener):
+    def __init__(self, helper):
+        self.helper = helper
+        self.calls = 0
+
+    @override
+    def on_process_start(self, process):
+        self.calls += 1
+        self.helper.remove_listener(self)
+
+
+class TestEventHelper(TestCase):
+    def setUp(self):
+        self.helper = EventHelper(ProcessListener)
+
+    def test_interests(self):
+        self.assertEqual(
+            EventHelper.get_interests(StartListener, ProcessListener),
+            frozenset(['on_process_start']))
+        self.assertEqual(
+            EventHelper.get_interests(StartStopListener, ProcessListener),
+            frozenset(['on_process_start', 'on_process_stop']))
+        self.assertEqual(
+            EventHelper.get_interests(ProcessListener, ProcessListener),
+            frozenset())
+
+    def test_fire_event(self):
+        l1 = StartListener()
+        l2 = StartStopListener()
+        self.helper.add_listener(l1)
+        self.helper.add_listener(l2)
+        # Adding twice shouldn't result in two messages
+        self.helper.add_listener(l1)
+
+        self.helper.fire_event(ProcessListener.on_process_start, None)
+        self.helper.fire_event(ProcessListener.on_process_stop, None)
+        self.helper.fire_event(ProcessListener.on_process_fail, None)
+        self.assertEqual(l1.events, ['start'])
+        self.assertEqual(l2.events, ['start', 'stop'])
+
+        self.helper.remove_listener(l2)
+        self.helper.fire_event(ProcessListener.on_process_stop, None)
+        self.assertEqual(l2.events, ['start', 'stop'])
+        self.assertEqual(self.helper.listeners, frozenset([l1]))
+
+        self.helper.remove_all_listeners()
+        self.helper.fire_event(ProcessListener.on_process_start, None)
+        self.assertEqual(l1.events, ['start'])
+
+    def test_instance_hook(self):
+        events = []
+        l = ProcessListener()
+        l.on_process_run = lambda process: events.append('run')
+        self.helper.add_listener(l)
+        self.helper.fire_event(ProcessListener.on_process_run, None)
+        self.assertEqual(events, ['run'])
+
+    def test_remove_during_event(self):
+        l1 = RemovingListener(self.helper)
+        l2 = RemovingListener(self.helper)
+        self.helper.add_listener(l1)
+        self.helper.add_listener(l2)
+
+        self.helper.fire_event(ProcessListener.on_process_start, None)
+        self.helper.fire_event(ProcessListener.on_process_start, None)
+        self.assertEqual(l1.calls, 1)
+        self.assertEqual(l2.calls, 1)
+        self.assertEqual(len(self.helper.listeners), 0)
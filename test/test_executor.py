@@ -0,0 +1,163 @@
+import threading
+from unittest import TestCase
+
+from plum.exceptions import QueueFull
+from plum.executor import PriorityExecutor
+
+
+class _Clock(object):
+    def __init__(self):
+        self.time = 0.
+
+    def __call__(self):
+        return self.time
+
+
+class TestPriorityExecutor(TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.executor = PriorityExecutor(
+            max_workers=1, aging_interval=1.0, clock=self.clock)
+        # Keep the only worker busy until we've queued everything up
+        self.release = threading.Event()
+        self.executor.submit(self.release.wait)
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown(True)
+
+    def test_submit(self):
+        self.release.set()
+        self.assertEqual(self.executor.submit(lambda x: x * 2, 3).result(1), 6)
+
+    def test_exception(self):
+        def fail():
+            raise RuntimeError("Failed")
+
+        self.release.set()
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(fail).result(1)
+
+    def test_priority_order(self):
+        order = []
+        futures = [
+            self.executor.submit_with_priority(0, order.append, 'low'),
+            self.executor.submit_with_priority(2, order.append, 'high'),
+            self.executor.submit_with_priority(1, order.append, 'medium'),
+        ]
+        self.release.set()
+        for f in futures:
+            f.result(1)
+        self.assertEqual(order, ['high', 'medium', 'low'])
+
+    def test_equal_priority_is_fifo(self):
+        order = []
+        futures = [
+            self.executor.submit_with_priority(1, order.append, i)
+            for i in range(5)]
+        self.release.set()
+        for f in futures:
+            f.result(1)
+        self.assertEqual(order, range(5))
+
+    def test_aging(self):
+        order = []
+        futures = [self.executor.submit_with_priority(0, order.append, 'old')]
+        # Waited for longer than a priority of 2 is worth
+        self.clock.time = 3.
+        futures.append(
+            self.executor.submit_with_priority(2, order.append, 'new'))
+        self.release.set()
+        for f in futures:
+            f.result(1)
+        self.assertEqual(order, ['old', 'new'])
+
+    def test_submit_after_shutdown(self):
+        self.release.set()
+        self.executor.shutdown(True)
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(lambda: None)
+
+
+class TestPriorityExecutorThreads(TestCase):
+    def test_blocking_work_gets_threads(self):
+        # Each piece of work needs a thread of its own
+        executor = PriorityExecutor(max_workers=4)
+        started = [threading.Event() for _ in range(4)]
+        done = threading.Event()
+
+        def work(i):
+            started[i].set()
+            done.wait()
+
+        futures = [executor.submit(work, i) for i in range(4)]
+        for event in started:
+            self.assertTrue(event.wait(2.))
+        done.set()
+        for f in futures:
+            f.result(1)
+        executor.shutdown(True)
+
+    def test_shutdown_runs_queued_work(self):
+        executor = PriorityExecutor(max_workers=1)
+        futures = [executor.submit(lambda i=i: i) for i in range(10)]
+        executor.shutdown(True)
+        self.assertEqual([f.result(0) for f in futures], range(10))
+
+
+class TestPriorityExecutorBounded(TestCase):
+    def setUp(self):
+        self.executor = PriorityExecutor(max_workers=1, max_queue_size=2)
+        self.release = threading.Event()
+        started = threading.Event()
+
+        def block():
+            started.set()
+            self.release.wait()
+
+        self.executor.submit(block)
+        self.assertTrue(started.wait(2.))
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown(True)
+
+    def _fill(self):
+        futures = [self.executor.submit(lambda: None) for _ in range(2)]
+        self.assertEqual(self.executor.get_queue_depth(), 2)
+        return futures
+
+    def test_reject(self):
+        self._fill()
+        with self.assertRaises(QueueFull):
+            self.executor.schedule(lambda: None, block=False)
+        self.assertEqual(self.executor.get_queue_depth(), 2)
+
+    def test_timeout(self):
+        self._fill()
+        with self.assertRaises(QueueFull):
+            self.executor.schedule(lambda: None, timeout=0.05)
+
+    def test_block_until_space(self):
+        self._fill()
+        result = []
+
+        def submit():
+            result.append(self.executor.submit(lambda: 'done'))
+
+        t = threading.Thread(target=submit)
+        t.start()
+        t.join(0.1)
+        self.assertTrue(t.is_alive())
+
+        self.release.set()
+        t.join(2.)
+        self.assertFalse(t.is_alive())
+        self.assertEqual(result[0].result(1), 'done')
+
+    def test_unbounded(self):
+        self._fill()
+        future = self.executor.schedule(lambda: 'done', bounded=False)
+        self.assertEqual(self.executor.get_queue_depth(), 3)
+        self.release.set()
+        self.assertEqual(future.result(1), 'done')
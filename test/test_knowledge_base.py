@@ -0,0 +1,162 @@
+from unittest import TestCase
+import plum.knowledge_provider as knowledge_provider
+from plum.knowledge_base import KnowledgeBase
+from plum.knowledge_provider import KnowledgeProvider
+from plum.process import Process
+from plum.util import fullname, override
+
+
+class Adder(Process):
+    @classmethod
+    def define(cls, spec):
+        super(Adder, cls).define(spec)
+        spec.deterministic()
+        spec.input('a')
+        spec.output('sum')
+
+    def _run(self, a):
+        raise RuntimeError("Should have been fast-forwarded")
+
+
+class DictProvider(KnowledgeProvider):
+    """
+    A provider that knows about processes stored in a dictionary of
+    {pid: (classname, inputs, outputs)} and counts the queries it gets.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes if processes is not None else {}
+        self.num_queries = 0
+
+    @override
+    def get_input(self, pid, port_name):
+        try:
+            return self.get_inputs(pid)[port_name]
+        except KeyError:
+            raise ValueError()
+
+    @override
+    def get_inputs(self, pid):
+        return self._get(pid)[1]
+
+    @override
+    def get_outputs(self, pid):
+        return self._get(pid)[2]
+
+    @override
+    def get_pids_from_classname(self, classname):
+        self.num_queries += 1
+        pids = [pid for pid, proc in self.processes.iteritems()
+                if proc[0] == classname]
+        if not pids:
+            raise ValueError()
+        return pids
+
+    def _get(self, pid):
+        self.num_queries += 1
+        try:
+            return self.processes[pid]
+        except KeyError:
+            raise ValueError()
+
+
+class TestKnowledgeBase(TestCase):
+    def setUp(self):
+        self.p1 = DictProvider({
+            1: ('Adder', {'a': 1}, {'sum': 2}),
+            2: ('Adder', {'a': 2}, {'sum': 3}),
+        })
+        self.p2 = DictProvider({
+            3: ('Adder', {'a': 1}, {'sum': 2}),
+            4: ('Other', {}, {}),
+        })
+        self.kb = KnowledgeBase()
+        self.kb.add_provider(self.p1)
+        self.kb.add_provider(self.p2)
+
+    def test_get_by_pid(self):
+        self.assertEqual(self.kb.get_inputs(3), {'a': 1})
+        self.assertEqual(self.kb.get_outputs(3), {'sum': 2})
+        self.assertEqual(self.kb.get_output(1, 'sum'), 2)
+
+        # Now we know who knows about pid 3 the first provider isn't asked
+        num_queries = self.p1.num_queries
+        self.kb.get_outputs(3)
+        self.assertEqual(self.p1.num_queries, num_queries)
+
+    def test_unknown_pid(self):
+        with self.assertRaises(ValueError):
+            self.kb.get_inputs(5)
+        num_queries = self.p1.num_queries + self.p2.num_queries
+
+        # The miss should be remembered
+        with self.assertRaises(ValueError):
+            self.kb.get_inputs(5)
+        self.assertEqual(self.p1.num_queries + self.p2.num_queries,
+                         num_queries)
+
+        # Until it is invalidated
+        self.p2.processes[5] = ('Other', {'b': 1}, {})
+        self.kb.invalidate_pid(5)
+        self.assertEqual(self.kb.get_inputs(5), {'b': 1})
+
+    def test_unknown_port(self):
+        with self.assertRaises(ValueError):
+            self.kb.get_input(3, 'b')
+        # Only the port that couldn't be found is remembered as unknown
+        self.assertEqual(self.kb.get_input(3, 'a'), 1)
+        with self.assertRaises(ValueError):
+            self.kb.get_input(3, 'b')
+
+    def test_get_pids_from_classname(self):
+        self.assertEqual(
+            sorted(self.kb.get_pids_from_classname('Adder')), [1, 2, 3])
+        with self.assertRaises(ValueError):
+            self.kb.get_pids_from_classname('Unknown')
+
+    def test_get_pids_from_inputs(self):
+        self.assertEqual(
+            sorted(self.kb.get_pids_from_inputs('Adder', {'a': 1})), [1, 3])
+        self.assertEqual(self.kb.get_pids_from_inputs('Adder', {'a': 2}), [2])
+
+        # Further queries should be answered from the index
+        num_queries = self.p1.num_queries + self.p2.num_queries
+        with self.assertRaises(ValueError):
+            self.kb.get_pids_from_inputs('Adder', {'a': 3})
+        self.assertEqual(
+            sorted(self.kb.get_pids_from_inputs('Adder', {'a': 1})), [1, 3])
+        self.assertEqual(self.p1.num_queries + self.p2.num_queries,
+                         num_queries)
+
+    def test_invalidate_classname(self):
+        self.assertEqual(self.kb.get_pids_from_inputs('Adder', {'a': 2}), [2])
+
+        self.p2.processes[6] = ('Adder', {'a': 2}, {'sum': 3})
+        self.assertEqual(self.kb.get_pids_from_inputs('Adder', {'a': 2}), [2])
+        self.kb.invalidate_classname('Adder')
+        self.assertEqual(
+            sorted(self.kb.get_pids_from_inputs('Adder', {'a': 2})), [2, 6])
+
+    def test_add_provider_invalidates(self):
+        with self.assertRaises(ValueError):
+            self.kb.get_pids_from_classname('New')
+        self.kb.add_provider(DictProvider({7: ('New', {}, {})}))
+        self.assertEqual(self.kb.get_pids_from_classname('New'), [7])
+
+
+class TestFastForward(TestCase):
+    def setUp(self):
+        kb = KnowledgeBase()
+        kb.add_provider(DictProvider({
+            1: (fullname(Adder), {'a': 1}, {'sum': 2})}))
+        knowledge_provider.set_global_provider(kb)
+
+    def tearDown(self):
+        knowledge_provider.set_global_provider(None)
+
+    def test_fast_forward(self):
+        self.assertEqual(Adder.run(a=1), {'sum': 2})
+
+        p = Adder.new({'a': 2})
+        p.play()
+        self.assertTrue(p.has_failed())
@@ -0,0 +1,141 @@
+import threading
+from plum.loop import EventLoop, LoopManager
+from plum.process import ProcessState
+from plum.test_utils import DummyProcess, DummyProcessWithOutput, \
+    WaitForSignalProcess
+from plum.wait_ons import wait_until
+from util import TestCase
+
+
+class TestEventLoop(TestCase):
+    def test_call_soon_order(self):
+        loop = EventLoop()
+        called = []
+        for i in range(3):
+            loop.call_soon(called.append, i)
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+        self.assertEqual(called, [0, 1, 2])
+        self.assertFalse(loop.is_running())
+
+    def test_exception_in_callback(self):
+        loop = EventLoop()
+        called = []
+
+        def raise_():
+            raise RuntimeError("Cope with this")
+
+        loop.call_soon(raise_)
+        loop.call_soon(called.append, True)
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+        self.assertEqual(called, [True])
+
+
+class TestLoopManager(TestCase):
+    def setUp(self):
+        super(TestLoopManager, self).setUp()
+        self.manager = LoopManager()
+        self.loop_thread = None
+
+    def tearDown(self):
+        if self.loop_thread is not None:
+            self.manager.loop.stop()
+            self.safe_join(self.loop_thread)
+        self.manager.shutdown()
+        super(TestLoopManager, self).tearDown()
+
+    def test_run_until_complete(self):
+        future = self.manager.launch(DummyProcessWithOutput)
+        outputs = self.manager.loop.run_until_complete(future)
+        self.assertEqual(outputs, {'default': 5})
+        self.assertEqual(self.manager.get_num_processes(), 0)
+
+    def test_waiting_processes_on_one_thread(self):
+        self._run_loop_in_thread()
+        num_threads = threading.active_count()
+
+        procs = [WaitForSignalProcess.new() for i in range(0, 10)]
+        futures = [self.manager.start(p) for p in procs]
+        self.assertTrue(wait_until(procs, ProcessState.WAITING, timeout=2))
+
+        # None of them should be holding on to a thread
+        self.assertEqual(threading.active_count(), num_threads)
+        for p in procs:
+            self.assertTrue(p.is_playing())
+
+        for p in procs:
+            p.continue_()
+        for f in futures:
+            self.assertTrue(f.wait(timeout=2))
+        for p in procs:
+            self.assertEqual(p.state, ProcessState.STOPPED)
+            self.assertTrue(p.has_finished())
+
+    def test_pause_play(self):
+        self._run_loop_in_thread()
+
+        p = WaitForSignalProcess.new()
+        future = self.manager.start(p)
+        self.assertTrue(wait_until(p, ProcessState.WAITING, timeout=2))
+
+        self.assertTrue(future.pause(timeout=2))
+        self.assertFalse(p.is_playing())
+
+        # Continuing shouldn't play it while it's paused
+        p.continue_()
+        self.assertFalse(future.wait(timeout=0.2))
+        self.assertEqual(p.state, ProcessState.WAITING)
+
+        future.play()
+        self.assertTrue(future.wait(timeout=2))
+        self.assertTrue(p.has_finished())
+
+    def test_pause_step_scheduled(self):
+        self._run_loop_in_thread()
+
+        p = WaitForSignalProcess.new()
+        self.manager.start(p)
+        self.assertTrue(wait_until(p, ProcessState.WAITING, timeout=2))
+
+        paused = []
+        done = threading.Event()
+
+        def play_then_pause():
+            # Playing schedules a step, the pause should be acted on by it
+            self.manager.play(p.pid)
+            paused.append(self.manager.pause(p.pid))
+            done.set()
+
+        self.manager.loop.call_soon(play_then_pause)
+        self.assertTrue(done.wait(timeout=2))
+        self.assertEqual(paused, [True])
+
+        # By the time this is called the step has been taken
+        stepped = threading.Event()
+        self.manager.loop.call_soon(stepped.set)
+        self.assertTrue(stepped.wait(timeout=2))
+        self.assertFalse(p.is_playing())
+        self.assertEqual(p.state, ProcessState.WAITING)
+
+    def test_abort(self):
+        self._run_loop_in_thread()
+
+        p = WaitForSignalProcess.new()
+        future = self.manager.start(p)
+        self.assertTrue(wait_until(p, ProcessState.WAITING, timeout=2))
+
+        self.assertTrue(future.abort(timeout=2))
+        self.assertTrue(p.has_aborted())
+        self.assertEqual(p.state, ProcessState.STOPPED)
+
+    def test_loop_not_running(self):
+        p = DummyProcess.new()
+        future = self.manager.start(p)
+        self.assertFalse(future.wait(timeout=0.1))
+        self.manager.loop.run_until_complete(future)
+        self.assertTrue(p.has_finished())
+
+    def _run_loop_in_thread(self):
+        self.loop_thread = threading.Thread(target=self.manager.loop.run_forever)
+        self.loop_thread.start()
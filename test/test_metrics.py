@@ -0,0 +1,100 @@
+import gc
+import threading
+import time
+from plum.metrics import Histogram, ProcessMetrics
+from plum.process_monitor import MONITOR
+from plum.test_utils import DummyProcess, ExceptionProcess, \
+    WaitForSignalProcess
+from plum.util import fullname
+from plum.wait_ons import wait_until
+from plum.process import ProcessState
+from util import TestCase
+
+
+class TestHistogram(TestCase):
+    def test_empty(self):
+        snapshot = Histogram().snapshot()
+        self.assertEqual(snapshot['count'], 0)
+        self.assertIsNone(snapshot['mean'])
+        self.assertIsNone(snapshot['p50'])
+
+    def test_add(self):
+        h = Histogram()
+        for value in [0.001, 0.002, 0.003, 1.0]:
+            h.add(value)
+        snapshot = h.snapshot()
+        self.assertEqual(snapshot['count'], 4)
+        self.assertAlmostEqual(snapshot['total'], 1.006)
+        self.assertEqual(snapshot['min'], 0.001)
+        self.assertEqual(snapshot['max'], 1.0)
+        self.assertEqual(sum(c for b, c in snapshot['buckets']), 4)
+
+        # Percentiles are bucket upper bounds so are always at least as big
+        self.assertGreaterEqual(snapshot['p50'], 0.002)
+        self.assertLess(snapshot['p50'], 0.004)
+        self.assertEqual(snapshot['p99'], 1.0)
+
+
+class TestProcessMetrics(TestCase):
+    def setUp(self):
+        super(TestProcessMetrics, self).setUp()
+        self.metrics = ProcessMetrics()
+        MONITOR.start_listening(self.metrics)
+
+    def tearDown(self):
+        MONITOR.stop_listening(self.metrics)
+        super(TestProcessMetrics, self).tearDown()
+
+    def test_simple(self):
+        p = DummyProcess.new()
+        time.sleep(0.01)
+        p.play()
+        DummyProcess.run()
+
+        snapshot = self.metrics.snapshot()[fullname(DummyProcess)]
+        self.assertEqual(snapshot[ProcessMetrics.QUEUE_DELAY]['count'], 2)
+        self.assertGreaterEqual(
+            snapshot[ProcessMetrics.QUEUE_DELAY]['max'], 0.01)
+        self.assertEqual(snapshot[ProcessMetrics.RUN_TIME]['count'], 2)
+        self.assertEqual(snapshot[ProcessMetrics.WAIT_TIME]['count'], 0)
+        self.assertEqual(snapshot[ProcessMetrics.LIFETIME]['count'], 2)
+
+    def test_fail(self):
+        ExceptionProcess.new().play()
+        snapshot = self.metrics.snapshot()[fullname(ExceptionProcess)]
+        self.assertEqual(snapshot[ProcessMetrics.LIFETIME]['count'], 1)
+
+    def test_wait(self):
+        p = WaitForSignalProcess.new()
+        t = threading.Thread(target=p.play)
+        t.start()
+        self.assertTrue(wait_until(p, ProcessState.WAITING, timeout=2))
+        time.sleep(0.05)
+        p.continue_()
+        self.safe_join(t)
+
+        snapshot = self.metrics.snapshot()[fullname(WaitForSignalProcess)]
+        self.assertEqual(snapshot[ProcessMetrics.WAIT_TIME]['count'], 1)
+        self.assertGreaterEqual(
+            snapshot[ProcessMetrics.WAIT_TIME]['max'], 0.05)
+        # One before the wait and one after
+        self.assertEqual(snapshot[ProcessMetrics.RUN_TIME]['count'], 2)
+
+    def test_reset(self):
+        DummyProcess.run()
+        self.assertTrue(self.metrics.snapshot())
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(), {})
+
+    def test_paused_dropped(self):
+        p = WaitForSignalProcess.new()
+        t = threading.Thread(target=p.play)
+        t.start()
+        self.assertTrue(wait_until(p, ProcessState.WAITING, timeout=2))
+        p.pause()
+        self.safe_join(t)
+        self.assertEqual(len(self.metrics._procs), 1)
+
+        del p, t
+        gc.collect()
+        self.assertEqual(len(self.metrics._procs), 0)
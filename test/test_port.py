@@ -1,6 +1,12 @@
+import unittest
 from unittest import TestCase
 
-from plum.port import InputPort
+from plum.port import InputPort, ArrayInputPort, ArrayOutputPort
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class TestProcessSpec(TestCase):
@@ -9,4 +15,39 @@ class TestProcessSpec(TestCase):
         self.assertEqual(ip.default, 5)
 
         with self.assertRaises(ValueError):
-            InputPort('test', default=4, valid_type=str)
\ No newline at end of file
+            InputPort('test', default=4, valid_type=str)
+
+    def test_falsy_default(self):
+        ip = InputPort('test', default=0)
+        self.assertEqual(ip.default, 0)
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestArrayPort(TestCase):
+    def test_dtype(self):
+        port = ArrayInputPort('test', dtype='float64')
+        self.assertTrue(port.validate(numpy.zeros(3))[0])
+        self.assertFalse(port.validate(numpy.zeros(3, dtype=int))[0])
+        self.assertFalse(port.validate([0., 0., 0.])[0])
+
+    def test_shape(self):
+        port = ArrayInputPort('test', shape=(None, 3))
+        self.assertTrue(port.validate(numpy.zeros((5, 3)))[0])
+        self.assertFalse(port.validate(numpy.zeros((5, 2)))[0])
+        self.assertFalse(port.validate(numpy.zeros(3))[0])
+
+    def test_optional(self):
+        port = ArrayInputPort('test', dtype=int, required=False)
+        self.assertTrue(port.validate(None)[0])
+
+    def test_array_default(self):
+        default = numpy.arange(3)
+        port = ArrayInputPort('test', default=default)
+        self.assertIs(port.default, default)
+        with self.assertRaises(ValueError):
+            ArrayInputPort('test', dtype=float, default=default)
+
+    def test_output(self):
+        port = ArrayOutputPort('test', dtype=int, shape=(2,))
+        self.assertTrue(port.validate(numpy.arange(2))[0])
+        self.assertFalse(port.validate(numpy.arange(3))[0])
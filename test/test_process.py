@@ -1,6 +1,8 @@
 import threading
+import unittest
 from plum.persistence.bundle import Bundle
-from plum.process import Process, ProcessState
+from plum.process import Process, ProcessState, FunctionProcess, \
+    BatchedFunctionProcess
 from plum.process_monitor import MONITOR
 from plum.test_utils import DummyProcess, ExceptionProcess, TwoCheckpoint, \
     DummyProcessWithOutput, TEST_PROCESSES, ProcessSaver, check_process_against_snapshots, \
@@ -10,6 +12,11 @@ from plum.util import override
 from plum.wait_ons import wait_until
 from util import TestCase
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class ForgetToCallParent(Process):
     @override
@@ -130,6 +137,45 @@ class TestProcess(TestCase):
         p = Proc.new()
         self.assertEqual(p.inputs['input'], 5)
 
+    def test_new_many(self):
+        class Proc(DummyProcess):
+            @classmethod
+            def define(cls, spec):
+                super(Proc, cls).define(spec)
+                spec.input("input", default=5, required=False)
+
+        procs = Proc.new_many([{'input': 2}, None])
+        self.assertEqual(len(procs), 2)
+        self.assertEqual(procs[0].inputs['input'], 2)
+        self.assertEqual(procs[1].inputs['input'], 5)
+        self.assertNotEqual(procs[0].pid, procs[1].pid)
+        for p in procs:
+            self.assertEqual(p.state, ProcessState.CREATED)
+
+        # Nothing should be created if any of the inputs are invalid
+        with self.assertRaises(ValueError):
+            Proc.new_many([{'input': 2}, {'a': 5}])
+
+    def test_new_many_chunked(self):
+        created = []
+
+        class Proc(DummyProcess):
+            def __init__(self, inputs, pid, logger=None):
+                super(Proc, self).__init__(inputs, pid, logger)
+                created.append(self)
+
+        chunks = Proc.new_many_chunked([None] * 5, 2)
+        self.assertEqual(created, [])
+        self.assertEqual(len(next(chunks)), 2)
+        self.assertEqual(len(created), 2)
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertEqual(len(created), 5)
+
+        # The inputs are validated straight away
+        with self.assertRaises(ValueError):
+            Proc.new_many_chunked([None, {'a': 5}], 1)
+        self.assertEqual(len(created), 5)
+
     def test_run(self):
         p = DummyProcessWithOutput.new()
         p.play()
@@ -303,6 +349,38 @@ class TestProcess(TestCase):
         self.safe_join(t, 5)
         self.assertFalse(t.is_alive())
 
+    def test_play_no_block_on_wait(self):
+        p = WaitForSignalProcess.new()
+        p.play(block_on_wait=False)
+
+        # Should have returned while waiting but still be playing
+        self.assertEqual(p.state, ProcessState.WAITING)
+        self.assertTrue(p.is_playing())
+        self.assertIn(p.pid, MONITOR.get_pids())
+
+        # Playing again without the wait being done should do nothing
+        p.play(block_on_wait=False)
+        self.assertEqual(p.state, ProcessState.WAITING)
+
+        p.continue_()
+        p.play(block_on_wait=False)
+        self.assertEqual(p.state, ProcessState.STOPPED)
+        self.assertFalse(p.is_playing())
+
+    def test_pause_suspended(self):
+        p = WaitForSignalProcess.new()
+        p.play(block_on_wait=False)
+        self.assertTrue(p.is_playing())
+
+        p.pause()
+        p.play(block_on_wait=False)
+        self.assertFalse(p.is_playing())
+        self.assertEqual(p.state, ProcessState.WAITING)
+
+        p.continue_()
+        p.play()
+        self.assertEqual(p.state, ProcessState.STOPPED)
+
     def test_exception_in_on_playing(self):
         class P(DummyProcess):
             def on_playing(self):
@@ -341,3 +419,119 @@ class TestProcess(TestCase):
                          "Snapshot:\n{}\n"
                          "Loaded:\n{}".format(
                              proc.__class__, snapshot.outputs, proc.outputs))
+
+
+def _add(a, b=1):
+    return a + b
+
+
+class TestFunctionProcess(TestCase):
+    def test_function(self):
+        Add = FunctionProcess.build(_add)
+        self.assertEqual(Add.run(a=2, b=3), {'value': 5})
+
+    def test_batched(self):
+        Add = BatchedFunctionProcess.build(_add, chunk_size=2)
+        self.assertEqual(
+            Add.run(a=[1, 2, 3, 4, 5], b=10),
+            {'value': [11, 12, 13, 14, 15]})
+        self.assertEqual(
+            Add.run(a=(1, 2, 3), b=[1, 2, 3]), {'value': [2, 4, 6]})
+        self.assertEqual(Add.run(a=[], b=1), {'value': []})
+
+    def test_batched_lengths_mismatch(self):
+        proc = BatchedFunctionProcess.build(_add).new(
+            {'a': [1, 2], 'b': [1, 2, 3]})
+        proc.play()
+        self.assertTrue(proc.has_failed())
+        self.assertIsInstance(proc.get_exception(), ValueError)
+
+    def test_batched_errors(self):
+        def invert(a):
+            return 1. / a
+
+        Invert = BatchedFunctionProcess.build(invert, chunk_size=2)
+        outputs = Invert.run(a=[1, 0, 2, 4])
+        # Only the value that failed is missing
+        self.assertEqual(outputs['value'], [1., None, .5, .25])
+        self.assertEqual(outputs['errors'].keys(), [1])
+        self.assertIsInstance(outputs['errors'][1], ZeroDivisionError)
+        self.assertEqual(Invert.run(a=[1, 2]), {'value': [1., .5]})
+
+        # With nothing to map over the one call failing is the process failing
+        proc = Invert.new({'a': 0})
+        proc.play()
+        self.assertTrue(proc.has_failed())
+        self.assertIsInstance(proc.get_exception(), ZeroDivisionError)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_batched_array_errors(self):
+        calls = []
+
+        def check(a):
+            calls.append(len(a))
+            if (a < 0).any():
+                raise ValueError("Negative")
+            return a * 2
+
+        Check = BatchedFunctionProcess.build(
+            check, chunk_size=4, vectorised=True)
+        outputs = Check.run(a=numpy.array([1, 2, -1, 3, 4, 5]))
+        result = outputs['value']
+        self.assertIsInstance(result, numpy.ma.MaskedArray)
+        self.assertEqual(result.tolist(), [2, 4, None, 6, 8, 10])
+        self.assertEqual(outputs['errors'].keys(), [2])
+        # The chunk with the bad value is retried a value at a time
+        self.assertEqual(calls, [4, 1, 1, 1, 1, 2])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_batched_array(self):
+        Add = BatchedFunctionProcess.build(_add, chunk_size=3)
+        result = Add.run(a=numpy.arange(10), b=1)['value']
+        self.assertIsInstance(result, numpy.ndarray)
+        self.assertTrue(numpy.array_equal(result, numpy.arange(1, 11)))
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_batched_vectorised(self):
+        calls = []
+
+        def add(a, b):
+            calls.append(len(a))
+            return a + b
+
+        Add = BatchedFunctionProcess.build(add, chunk_size=4, vectorised=True)
+        result = Add.run(a=numpy.arange(10), b=numpy.arange(10))['value']
+        self.assertTrue(numpy.array_equal(result, numpy.arange(10) * 2))
+        self.assertEqual(calls, [4, 4, 2])
+
+
+class _ArrayProcess(Process):
+    @classmethod
+    def define(cls, spec):
+        super(_ArrayProcess, cls).define(spec)
+        spec.input_array('a', dtype=float)
+        spec.output_array('b', dtype=float)
+
+    @override
+    def _run(self, a):
+        self.out('b', a)
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestArrayProcess(TestCase):
+    def test_by_reference(self):
+        a = numpy.zeros(10)
+        proc = _ArrayProcess.new({'a': a})
+        self.assertIs(proc.inputs.a, a)
+        proc.play()
+        self.assertIs(proc.outputs['b'], a)
+
+        # Loading from a bundle shouldn't copy the arrays either
+        bundle = Bundle()
+        proc.save_instance_state(bundle)
+        self.assertIs(bundle[Process.BundleKeys.INPUTS.value]['a'], a)
+        self.assertIs(Process.load(bundle).outputs['b'], a)
+
+    def test_wrong_dtype(self):
+        with self.assertRaises(ValueError):
+            _ArrayProcess.new({'a': numpy.zeros(10, dtype=int)})
@@ -1,8 +1,12 @@
 
 from unittest import TestCase
+from plum.process import ProcessState
 from plum.process_monitor import MONITOR, ProcessMonitorListener
-from plum.util import override
-from plum.test_utils import DummyProcess, ExceptionProcess
+from plum.processes import ProcessWithChildren
+from plum.util import override, fullname
+from plum.test_utils import DummyProcess, ExceptionProcess, \
+    WaitForSignalProcess
+from plum.wait_ons import WaitOnProcess
 
 
 class EventTracker(ProcessMonitorListener):
@@ -29,6 +33,14 @@ class EventTracker(ProcessMonitorListener):
         self.stopped_called = False
 
 
+class ParentProcess(ProcessWithChildren):
+    @override
+    def _run(self):
+        self.child = WaitForSignalProcess.new()
+        self.add_child(self.child)
+        return WaitOnProcess(self.child), None
+
+
 class TestProcessMonitor(TestCase):
     def setUp(self):
         self.assertEqual(len(MONITOR.get_pids()), 0)
@@ -68,3 +80,51 @@ class TestProcessMonitor(TestCase):
             self.assertFalse(l.stopped_called)
             self.assertTrue(l.failed_called)
 
+    def test_indexes(self):
+        procs = [WaitForSignalProcess.new() for _ in range(3)]
+        for p in procs:
+            p.play(block_on_wait=False)
+
+        self.assertEqual(MONITOR.get_num_processes(ProcessState.WAITING), 3)
+        self.assertEqual(
+            MONITOR.get_num_processes(class_name=WaitForSignalProcess), 3)
+        self.assertEqual(
+            MONITOR.get_num_processes(
+                ProcessState.WAITING, fullname(WaitForSignalProcess)), 3)
+        self.assertEqual(MONITOR.get_num_processes(ProcessState.RUNNING), 0)
+        self.assertEqual(
+            set(MONITOR.get_pids_in_state(ProcessState.WAITING)),
+            {p.pid for p in procs})
+        self.assertEqual(
+            set(MONITOR.find_processes(class_name=WaitForSignalProcess)),
+            set(procs))
+
+        procs[0].continue_()
+        procs[0].play()
+        self.assertEqual(MONITOR.get_num_processes(ProcessState.WAITING), 2)
+        self.assertNotIn(procs[0].pid, MONITOR.get_pids_of_class(
+            WaitForSignalProcess))
+
+        for p in procs[1:]:
+            p.continue_()
+            p.play()
+        self.assertEqual(MONITOR.get_num_processes(ProcessState.WAITING), 0)
+        self.assertEqual(MONITOR.get_pids_of_class(WaitForSignalProcess), [])
+
+    def test_parent_index(self):
+        parent = ParentProcess.new()
+        parent.play(block_on_wait=False)
+        child = parent.child
+        self.assertEqual(MONITOR.get_child_pids(parent.pid), [])
+
+        child.play(block_on_wait=False)
+        self.assertEqual(MONITOR.get_child_pids(parent.pid), [child.pid])
+        self.assertEqual(
+            MONITOR.find_pids(ProcessState.WAITING, parent_pid=parent.pid),
+            [child.pid])
+
+        child.continue_()
+        child.play()
+        self.assertEqual(MONITOR.get_child_pids(parent.pid), [])
+        parent.play()
+        self.assertEqual(MONITOR.get_num_processes(), 0)
@@ -1,6 +1,11 @@
 import unittest
 from plum.process import ProcessSpec
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class StrSubtype(str):
     pass
@@ -72,4 +77,76 @@ class TestProcessSpec(unittest.TestCase):
         self.assertTrue(valid, msg)
 
         valid, msg = self.spec.validate(inputs={'b': 'b'})
-        self.assertTrue(valid, msg)
\ No newline at end of file
+        self.assertTrue(valid, msg)
+
+    def test_fill_defaults(self):
+        self.spec.input("a", default=5, required=False)
+        self.spec.input("b")
+
+        self.assertEqual(self.spec.fill_defaults({'b': 1}), {'a': 5, 'b': 1})
+        self.assertEqual(
+            self.spec.fill_defaults({'a': 2, 'b': 1}), {'a': 2, 'b': 1})
+        with self.assertRaises(ValueError):
+            self.spec.fill_defaults({'a': 2})
+
+    def test_lookup_output(self):
+        self.spec.output("a")
+        self.assertEqual(self.spec.lookup_output("a"),
+                         (self.spec.get_output("a"), False))
+        self.assertIsNone(self.spec.lookup_output("b"))
+
+        self.spec.dynamic_output()
+        self.assertEqual(self.spec.lookup_output("b"),
+                         (self.spec.get_dynamic_output(), True))
+
+    def test_validate_outputs(self):
+        self.spec.output("a", valid_type=int)
+        self.spec.optional_output("b")
+
+        self.assertTrue(self.spec.validate_outputs({'a': 5})[0])
+        self.assertFalse(self.spec.validate_outputs({})[0])
+        self.assertFalse(self.spec.validate_outputs({'a': 'a'})[0])
+
+    def test_sealed(self):
+        self.spec.input("a", required=False)
+        self.spec.output("b")
+        self.spec.seal()
+        self.assertTrue(self.spec.sealed)
+
+        with self.assertRaises(RuntimeError):
+            self.spec.input("c")
+        with self.assertRaises(RuntimeError):
+            self.spec.default_priority(1)
+
+        # The compiled spec should behave the same as before sealing
+        self.assertTrue(self.spec.validate({'a': 1})[0])
+        self.assertFalse(self.spec.validate({'c': 1})[0])
+        self.assertEqual(self.spec.lookup_output("b"),
+                         (self.spec.get_output("b"), False))
+        self.assertIsNone(self.spec.lookup_output("c"))
+
+    def test_falsy_default(self):
+        # Defaults that are falsy are still defaults, only None means no default
+        self.spec.input("a", default=0)
+        self.spec.input("b", default='')
+        self.spec.input("c", default=False, required=True)
+        self.spec.input("d", default=None, required=False)
+
+        self.assertEqual(
+            self.spec.fill_defaults({}), {'a': 0, 'b': '', 'c': False})
+        self.assertEqual(self.spec.fill_defaults({'c': True}),
+                         {'a': 0, 'b': '', 'c': True})
+        self.assertTrue(str(self.spec.get_input("a")).endswith(",0"))
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_arrays(self):
+        self.spec.input_array("a", dtype=float, shape=(None, 2))
+        self.spec.output_array("b", dtype=int)
+        self.spec.seal()
+
+        a = numpy.zeros((4, 2))
+        self.assertTrue(self.spec.validate({'a': a})[0])
+        self.assertFalse(self.spec.validate({'a': a.astype(int)})[0])
+        self.assertFalse(self.spec.validate({'a': numpy.zeros(2)})[0])
+        self.assertIs(self.spec.fill_defaults({'a': a})['a'], a)
+        self.assertTrue(self.spec.validate_outputs({'b': numpy.arange(2)})[0])
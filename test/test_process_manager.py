@@ -1,13 +1,39 @@
 
 from unittest import TestCase
+import logging
+import threading
 import time
-from plum.process import ProcessState
+from plum.exceptions import QueueFull, TimeoutError
+from plum.process import Process, ProcessState
 from plum.process_monitor import MONITOR, ProcessMonitorListener
-from plum.process_manager import ProcessManager
-from plum.test_utils import DummyProcess, WaitForSignalProcess
+from plum.process_manager import ProcessManager, as_completed, wait, \
+    gather, FIRST_COMPLETED, FIRST_EXCEPTION
+from plum.test_utils import DummyProcess, DummyProcessWithOutput, \
+    WaitForSignalProcess, ExceptionProcess
+from plum.util import override
 from plum.wait_ons import wait_until, wait_until_stopped, WaitOnState, WaitRegion
 
 
+class _RecordRun(Process):
+    ORDER = []
+
+    @classmethod
+    def define(cls, spec):
+        super(_RecordRun, cls).define(spec)
+        spec.dynamic_input()
+
+    @override
+    def _run(self, name):
+        self.ORDER.append(name)
+
+
+class _UrgentRecordRun(_RecordRun):
+    @classmethod
+    def define(cls, spec):
+        super(_UrgentRecordRun, cls).define(spec)
+        spec.default_priority(10)
+
+
 class TestProcessManager(TestCase):
     def setUp(self):
         self.assertEqual(len(MONITOR.get_pids()), 0)
@@ -107,6 +133,27 @@ class TestProcessManager(TestCase):
         self.assertTrue(self.manager.pause_all(timeout=2))
         self.assertTrue(self.manager.abort_all(timeout=2))
 
+    def test_launch_many(self):
+        futures = self.manager.launch_many(
+            DummyProcessWithOutput, ({'a': i} for i in range(0, 10)),
+            chunk_size=3)
+        self.assertEqual(len(futures), 10)
+        self.assertEqual(futures.results(timeout=2), [{'default': 5}] * 10)
+        self.assertTrue(futures.done())
+        self.assertEqual(futures.num_done(), 10)
+        self.assertEqual(futures[0].result(), {'default': 5})
+
+    def test_launch_many_invalid(self):
+        with self.assertRaises(ValueError):
+            self.manager.launch_many(DummyProcess, [{}, {'a': 5}])
+        self.assertEqual(self.manager.get_num_processes(), 0)
+
+    def test_launch_many_not_started(self):
+        self.manager.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.manager.launch_many(DummyProcess, [None] * 3)
+        self.assertEqual(self.manager.get_num_processes(), 0)
+
     def test_future_pid(self):
         p = DummyProcess.new()
         future = self.manager.start(p)
@@ -138,3 +185,343 @@ class TestProcessManager(TestCase):
         future.play()
         time.sleep(1)
         self.assertTrue(p.is_playing())
+
+
+class TestProcessManagerNoBlockOnWait(TestCase):
+    def setUp(self):
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+        self.manager = ProcessManager(max_threads=2, block_on_wait=False)
+
+    def tearDown(self):
+        self.manager.shutdown()
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+
+    def test_more_waiting_than_threads(self):
+        procs = []
+        for i in range(0, 10):
+            procs.append(WaitForSignalProcess.new())
+            self.manager.start(procs[-1])
+
+        # With blocking waits only two of these could ever get to WAITING
+        self.assertTrue(wait_until(procs, ProcessState.WAITING, timeout=2))
+        for p in procs:
+            self.assertTrue(p.is_playing())
+
+        for p in procs:
+            p.continue_()
+        self.assertTrue(wait_until_stopped(procs, timeout=2))
+        for p in procs:
+            self.assertTrue(p.has_finished())
+        self.assertEqual(self.manager.get_num_processes(), 0)
+
+    def test_pause_play(self):
+        p = WaitForSignalProcess.new()
+        future = self.manager.start(p)
+        self.assertTrue(wait_until(p, ProcessState.WAITING, timeout=2))
+
+        self.assertTrue(future.pause(timeout=2))
+        self.assertFalse(p.is_playing())
+
+        # Shouldn't carry on while paused
+        p.continue_()
+        self.assertFalse(wait_until_stopped(p, timeout=0.2))
+
+        future.play()
+        self.assertTrue(wait_until_stopped(p, timeout=2))
+        self.assertTrue(p.has_finished())
+
+    def test_abort(self):
+        p = WaitForSignalProcess.new()
+        future = self.manager.start(p)
+        self.assertTrue(wait_until(p, ProcessState.WAITING, timeout=2))
+
+        self.assertTrue(future.abort(timeout=2))
+        self.assertTrue(p.has_aborted())
+        self.assertEqual(p.state, ProcessState.STOPPED)
+
+    def test_pause_all(self):
+        procs = []
+        for i in range(0, 10):
+            procs.append(WaitForSignalProcess.new())
+            self.manager.start(procs[-1])
+        self.assertTrue(wait_until(procs, ProcessState.WAITING, timeout=2))
+
+        self.assertTrue(self.manager.pause_all(timeout=2))
+        for p in procs:
+            self.assertFalse(p.is_playing())
+            self.assertEqual(p.state, ProcessState.WAITING)
+
+    def test_launch_many(self):
+        futures = self.manager.launch_many(
+            WaitForSignalProcess, [None] * 10, chunk_size=4)
+        procs = self.manager.get_processes()
+        self.assertTrue(wait_until(procs, ProcessState.WAITING, timeout=2))
+        self.assertFalse(futures.wait(timeout=0.1))
+
+        for p in procs:
+            p.continue_()
+        self.assertTrue(futures.wait(timeout=2))
+        self.assertEqual(futures.exceptions(), [None] * 10)
+        self.assertTrue(wait_until_stopped(procs, timeout=2))
+
+    def test_launch_many_not_started(self):
+        self.manager.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.manager.launch_many(DummyProcess, [None] * 3, chunk_size=2)
+        self.assertEqual(self.manager.get_num_processes(), 0)
+
+    def test_launch_many_abort(self):
+        futures = self.manager.launch_many(WaitForSignalProcess, [None] * 5)
+        self.assertTrue(wait_until(
+            self.manager.get_processes(), ProcessState.WAITING, timeout=2))
+        self.assertTrue(futures.abort(timeout=2))
+        self.assertTrue(futures.wait(timeout=2))
+
+
+class TestProcessManagerPriority(TestCase):
+    def setUp(self):
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+        self.manager = ProcessManager(max_threads=1)
+        # Occupy the only thread so that everything else gets queued
+        self.blocker = WaitForSignalProcess.new()
+        self.manager.start(self.blocker)
+        self.assertTrue(wait_until(self.blocker, ProcessState.WAITING, 2))
+        _RecordRun.ORDER = []
+
+    def tearDown(self):
+        self.manager.shutdown()
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+
+    def _run_queued(self, futures):
+        self.blocker.continue_()
+        for future in futures:
+            future.result(timeout=2)
+
+    def test_launch_priority(self):
+        futures = [
+            self.manager.launch(_RecordRun, {'name': 'low'}, priority=-1),
+            self.manager.launch(_RecordRun, {'name': 'normal'}),
+            self.manager.launch(_RecordRun, {'name': 'high'}, priority=5),
+        ]
+        self._run_queued(futures)
+        self.assertEqual(_RecordRun.ORDER, ['high', 'normal', 'low'])
+
+    def test_spec_default_priority(self):
+        futures = [
+            self.manager.launch(_RecordRun, {'name': 'normal'}),
+            self.manager.launch(_UrgentRecordRun, {'name': 'urgent'}),
+            self.manager.launch(
+                _UrgentRecordRun, {'name': 'overridden'}, priority=-1),
+        ]
+        self._run_queued(futures)
+        self.assertEqual(_RecordRun.ORDER, ['urgent', 'normal', 'overridden'])
+
+    def test_launch_many_priority(self):
+        low = self.manager.launch_many(
+            _RecordRun, [{'name': 'low'}] * 3, priority=-1)
+        high = self.manager.launch_many(
+            _RecordRun, [{'name': 'high'}] * 3, priority=1)
+        self.blocker.continue_()
+        self.assertTrue(low.wait(timeout=2))
+        self.assertTrue(high.wait(timeout=2))
+        self.assertEqual(_RecordRun.ORDER, ['high'] * 3 + ['low'] * 3)
+
+
+class _BlockInRun(Process):
+    """
+    Holds on to its thread until released.
+    """
+    RELEASE = threading.Event()
+    RUNNING = threading.Event()
+
+    @override
+    def _run(self):
+        self.RUNNING.set()
+        self.RELEASE.wait()
+
+
+class TestProcessManagerBounded(TestCase):
+    def setUp(self):
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+        _BlockInRun.RELEASE.clear()
+        _BlockInRun.RUNNING.clear()
+
+    def tearDown(self):
+        _BlockInRun.RELEASE.set()
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+
+    def _test_bounded(self, manager):
+        # Occupy the only thread, and then the only space on the queue
+        blocker = manager.launch(_BlockInRun)
+        self.assertTrue(_BlockInRun.RUNNING.wait(2))
+        queued = manager.launch(DummyProcess)
+        self.assertEqual(manager.get_queue_depth(), 1)
+        num_procs = manager.get_num_processes()
+
+        with self.assertRaises(QueueFull):
+            manager.launch(DummyProcess, block=False)
+        with self.assertRaises(QueueFull):
+            manager.launch(DummyProcess, timeout=0.05)
+        # The rejected processes shouldn't have been kept
+        self.assertEqual(manager.get_num_processes(), num_procs)
+
+        _BlockInRun.RELEASE.set()
+        blocker.result(timeout=2)
+        queued.result(timeout=2)
+        manager.shutdown()
+
+    def test_block_on_wait(self):
+        self._test_bounded(ProcessManager(max_threads=1, max_queue_size=1))
+
+    def test_no_block_on_wait(self):
+        self._test_bounded(ProcessManager(
+            max_threads=1, block_on_wait=False, max_queue_size=1))
+
+
+class TestProcessManagerStopAll(TestCase):
+    def setUp(self):
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+        _BlockInRun.RELEASE.clear()
+
+    def tearDown(self):
+        _BlockInRun.RELEASE.set()
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+
+    def _test_single_deadline(self, manager):
+        waiting = [WaitForSignalProcess.new() for _ in range(3)]
+        for p in waiting:
+            manager.start(p)
+        self.assertTrue(wait_until(waiting, ProcessState.WAITING, timeout=2))
+        # These won't respond until they are released
+        stuck = [_BlockInRun.new() for _ in range(5)]
+        for p in stuck:
+            manager.start(p)
+        self.assertTrue(wait_until(stuck, ProcessState.RUNNING, timeout=2))
+
+        start = time.time()
+        report = manager.pause_all(timeout=0.2)
+        # Each process should not get a timeout of its own
+        self.assertLess(time.time() - start, 0.6)
+        self.assertFalse(report)
+        self.assertEqual(report.num_processes, 8)
+        self.assertItemsEqual(report.failed, [p.pid for p in stuck])
+
+        _BlockInRun.RELEASE.set()
+        report = manager.pause_all(timeout=2)
+        self.assertTrue(report)
+        self.assertEqual(report.failed, [])
+        self.assertTrue(manager.shutdown(timeout=2))
+
+    def test_single_deadline(self):
+        self._test_single_deadline(ProcessManager())
+
+    def test_shutdown_timed_out(self):
+        manager = ProcessManager()
+        p = _FailInRun.new()
+        manager.start(p)
+        self.assertTrue(wait_until(p, ProcessState.RUNNING, timeout=2))
+        self.assertFalse(manager.shutdown(timeout=0.1))
+
+        # Failing after the manager has forgotten about it is fine
+        handler = _ListHandler()
+        logger = logging.getLogger('plum')
+        logger.addHandler(handler)
+        try:
+            _BlockInRun.RELEASE.set()
+            self.assertTrue(wait_until(p, ProcessState.FAILED, timeout=2))
+        finally:
+            logger.removeHandler(handler)
+        self.assertEqual(handler.records, [])
+
+
+class _FailInRun(_BlockInRun):
+    @override
+    def _run(self):
+        super(_FailInRun, self)._run()
+        raise RuntimeError("Released")
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestFutureComposition(TestCase):
+    def setUp(self):
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+        self.manager = ProcessManager(block_on_wait=False)
+
+    def tearDown(self):
+        self.manager.shutdown()
+        self.assertEqual(len(MONITOR.get_pids()), 0)
+
+    def test_as_completed(self):
+        p = WaitForSignalProcess.new()
+        waiting = self.manager.start(p)
+        quick = self.manager.launch(DummyProcessWithOutput)
+
+        completed = as_completed([waiting, quick], timeout=2)
+        self.assertIs(next(completed), quick)
+        self.assertFalse(waiting.done())
+
+        # The quick one can finish before the other one has started waiting
+        self.assertTrue(wait_until(p, ProcessState.WAITING, timeout=2))
+        p.continue_()
+        self.assertIs(next(completed), waiting)
+        with self.assertRaises(StopIteration):
+            next(completed)
+
+    def test_as_completed_timeout(self):
+        future = self.manager.start(WaitForSignalProcess.new())
+        with self.assertRaises(TimeoutError):
+            list(as_completed([future], timeout=0.1))
+        self.assertTrue(future.abort(timeout=2))
+
+    def test_wait_first_completed(self):
+        waiting = self.manager.start(WaitForSignalProcess.new())
+        quick = self.manager.launch(DummyProcess)
+
+        done, not_done = wait([waiting, quick], timeout=2,
+                              return_when=FIRST_COMPLETED)
+        self.assertEqual(done, {quick})
+        self.assertEqual(not_done, {waiting})
+
+        self.assertTrue(waiting.abort(timeout=2))
+        done, not_done = wait([waiting, quick], timeout=2)
+        self.assertEqual(done, {waiting, quick})
+        self.assertEqual(not_done, set())
+
+    def test_wait_first_exception(self):
+        waiting = self.manager.start(WaitForSignalProcess.new())
+        failing = self.manager.launch(ExceptionProcess)
+
+        done, not_done = wait([waiting, failing], timeout=2,
+                              return_when=FIRST_EXCEPTION)
+        self.assertEqual(done, {failing})
+        self.assertIsInstance(failing.exception(), RuntimeError)
+        self.assertTrue(waiting.abort(timeout=2))
+
+    def test_gather_then(self):
+        futures = [self.manager.launch(DummyProcessWithOutput)
+                   for _ in range(3)]
+        gathered = gather(futures)
+        self.assertEqual(gathered.result(timeout=2), [{'default': 5}] * 3)
+
+        doubled = futures[0].then(lambda outputs: outputs['default'] * 2)
+        self.assertEqual(doubled.result(timeout=2), 10)
+
+    def test_gather_exception(self):
+        waiting = self.manager.start(WaitForSignalProcess.new())
+        failing = self.manager.launch(ExceptionProcess)
+
+        gathered = gather([waiting, failing])
+        # Shouldn't have to wait for the other process
+        with self.assertRaises(RuntimeError):
+            gathered.result(timeout=2)
+        with self.assertRaises(RuntimeError):
+            failing.then(lambda outputs: outputs).result(timeout=2)
+        self.assertTrue(waiting.abort(timeout=2))
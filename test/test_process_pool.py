@@ -0,0 +1,79 @@
+from unittest import TestCase
+from plum.exceptions import Unsupported
+from plum.process import ProcessState
+from plum.process_listener import ProcessListener
+from plum.process_pool import ProcessPoolManager
+from plum.test_utils import DummyProcessWithOutput, ExceptionProcess, \
+    TwoCheckpoint
+from plum.util import override
+
+
+class EventRecorder(ProcessListener):
+    def __init__(self):
+        self.events = []
+        self.outputs = {}
+
+    @override
+    def on_process_run(self, process):
+        self.events.append('run')
+
+    @override
+    def on_process_wait(self, process):
+        self.events.append('wait')
+
+    @override
+    def on_output_emitted(self, process, output_port, value, dynamic):
+        self.outputs[output_port] = value
+
+    @override
+    def on_process_finish(self, process):
+        self.events.append('finish')
+
+    @override
+    def on_process_stop(self, process):
+        self.events.append('stop')
+
+
+class TestProcessPoolManager(TestCase):
+    def setUp(self):
+        self.manager = ProcessPoolManager(max_processes=2)
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_launch(self):
+        futures = [self.manager.launch(DummyProcessWithOutput)
+                   for i in range(0, 4)]
+        remotes = [self.manager.get_process(f.pid) for f in futures]
+        for future in futures:
+            self.assertEqual(future.result(timeout=10), {'default': 5})
+        for remote in remotes:
+            self.assertTrue(remote.wait(timeout=10))
+        self.assertEqual(self.manager.get_num_processes(), 0)
+
+    def test_events_forwarded(self):
+        p = TwoCheckpoint.new()
+        recorder = EventRecorder()
+
+        future = self.manager.start(p)
+        remote = self.manager.get_process(p.pid)
+        remote.add_process_listener(recorder)
+
+        self.assertEqual(future.result(timeout=10), {'test': 5})
+        self.assertTrue(remote.wait(timeout=10))
+        self.assertEqual(remote.state, ProcessState.STOPPED)
+        self.assertTrue(remote.has_finished())
+        self.assertIn('finish', recorder.events)
+        self.assertEqual(recorder.events[-1], 'stop')
+        self.assertEqual(recorder.outputs, {'test': 5})
+
+    def test_exception(self):
+        future = self.manager.launch(ExceptionProcess)
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=10)
+
+    def test_no_control(self):
+        future = self.manager.launch(DummyProcessWithOutput)
+        with self.assertRaises(Unsupported):
+            future.pause(timeout=1)
+        future.result(timeout=10)
@@ -0,0 +1,82 @@
+import threading
+import uuid
+from unittest import TestCase
+
+from plum.registry import ShardedRegistry
+
+
+class TestShardedRegistry(TestCase):
+    def setUp(self):
+        self.registry = ShardedRegistry(num_shards=4)
+
+    def test_mapping(self):
+        r = self.registry
+        for i in range(10):
+            r[i] = str(i)
+        self.assertEqual(len(r), 10)
+        self.assertIn(3, r)
+        self.assertEqual(r[3], '3')
+        self.assertEqual(r.get(11, 'default'), 'default')
+        with self.assertRaises(KeyError):
+            r[11]
+
+        self.assertEqual(r.pop(3), '3')
+        self.assertIsNone(r.pop(3, None))
+        with self.assertRaises(KeyError):
+            r.pop(3)
+        del r[4]
+        self.assertEqual(sorted(r), [0, 1, 2, 5, 6, 7, 8, 9])
+        self.assertEqual(sorted(r.values()),
+                         [str(i) for i in [0, 1, 2, 5, 6, 7, 8, 9]])
+
+    def test_add(self):
+        self.assertTrue(self.registry.add('a', 1))
+        self.assertFalse(self.registry.add('a', 2))
+        self.assertEqual(self.registry['a'], 1)
+
+    def test_clear(self):
+        self.registry.update((i, i) for i in range(5))
+        self.assertEqual(sorted(self.registry.clear()),
+                         [(i, i) for i in range(5)])
+        self.assertEqual(len(self.registry), 0)
+
+    def test_snapshot(self):
+        self.registry.update((i, i) for i in range(5))
+        # Changing the registry while iterating is fine
+        for key in self.registry:
+            del self.registry[key]
+        self.assertEqual(len(self.registry), 0)
+
+    def test_uuid_keys_spread(self):
+        # The default pids, they only differ in their high bits
+        registry = ShardedRegistry(num_shards=16)
+        registry.update((uuid.uuid1(), None) for _ in range(1600))
+        sizes = [len(shard) for shard in registry._shards]
+        self.assertGreater(min(sizes), 50)
+
+    def test_concurrent(self):
+        num_threads = 4
+        per_thread = 1000
+        errors = []
+
+        def churn(offset):
+            try:
+                for i in range(offset, offset + per_thread):
+                    self.assertTrue(self.registry.add(i, i))
+                    if i % 2:
+                        self.registry.pop(i)
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=churn, args=(i * per_thread,))
+                   for i in range(num_threads)]
+        for t in threads:
+            t.start()
+        while any(t.is_alive() for t in threads):
+            for key, value in self.registry.items():
+                self.assertEqual(key, value)
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.registry), num_threads * per_thread / 2)
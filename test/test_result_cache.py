@@ -0,0 +1,140 @@
+import shutil
+import tempfile
+import unittest
+from plum.process import Process
+import plum.result_cache as result_cache
+from plum.result_cache import LruResultCache, DiskResultCache, \
+    TieredResultCache, make_key
+from plum.util import fingerprint, fullname
+from util import TestCase
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Adder(Process):
+    num_runs = 0
+
+    @classmethod
+    def define(cls, spec):
+        super(Adder, cls).define(spec)
+        spec.deterministic()
+        spec.input('a')
+        spec.input('b', default=1, required=False)
+        spec.output('sum')
+
+    def _run(self, a, b):
+        Adder.num_runs += 1
+        self.out('sum', a + b)
+
+
+class TestFingerprint(TestCase):
+    def test_stable(self):
+        self.assertEqual(fingerprint({'a': 1, 'b': [1, 2.5, None]}),
+                         fingerprint({'b': [1, 2.5, None], 'a': 1}))
+        self.assertEqual(fingerprint('a'), fingerprint(u'a'))
+        self.assertEqual(fingerprint(set([1, 2, 3])),
+                         fingerprint(set([3, 2, 1])))
+
+    def test_different(self):
+        self.assertNotEqual(fingerprint(1), fingerprint('1'))
+        self.assertNotEqual(fingerprint([1, 2]), fingerprint((1, 2)))
+        self.assertNotEqual(fingerprint({'a': 1}), fingerprint({'a': 2}))
+        self.assertNotEqual(fingerprint(True), fingerprint(1))
+
+    def test_unpicklable(self):
+        with self.assertRaises(ValueError):
+            fingerprint(lambda: None)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_array(self):
+        a = numpy.arange(12.).reshape(3, 4)
+        self.assertEqual(fingerprint(a), fingerprint(a.copy()))
+        # A non-contiguous view with the same values
+        self.assertEqual(fingerprint(a.T.copy()), fingerprint(a.T))
+        self.assertNotEqual(fingerprint(a), fingerprint(a.reshape(4, 3)))
+        self.assertNotEqual(fingerprint(a), fingerprint(a.astype('float32')))
+
+
+class TestResultCaches(TestCase):
+    def setUp(self):
+        super(TestResultCaches, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(TestResultCaches, self).tearDown()
+
+    def test_lru(self):
+        cache = LruResultCache(max_size=2)
+        cache.put('a', {'x': 1})
+        cache.put('b', {'x': 2})
+        # Use a so that b is the least recently used
+        self.assertEqual(cache.get('a'), {'x': 1})
+        cache.put('c', {'x': 3})
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), {'x': 3})
+
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+
+    def test_disk(self):
+        cache = DiskResultCache(self.directory)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', {'x': 1})
+        self.assertEqual(DiskResultCache(self.directory).get('a'), {'x': 1})
+
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+
+    def test_tiered(self):
+        cache = TieredResultCache(max_size=1, directory=self.directory)
+        cache.put('a', {'x': 1})
+        cache.put('b', {'x': 2})
+
+        # 'a' has been pushed out of memory but should still be on disk
+        self.assertEqual(cache.get('a'), {'x': 1})
+        self.assertEqual(TieredResultCache(directory=self.directory).get('b'),
+                         {'x': 2})
+
+
+class TestFastForward(TestCase):
+    def setUp(self):
+        super(TestFastForward, self).setUp()
+        result_cache.set_global_cache(LruResultCache())
+        Adder.num_runs = 0
+
+    def tearDown(self):
+        result_cache.set_global_cache(None)
+        super(TestFastForward, self).tearDown()
+
+    def test_fast_forward(self):
+        self.assertEqual(Adder.run(a=1), {'sum': 2})
+        self.assertEqual(Adder.num_runs, 1)
+
+        # Same inputs (including the default) so should be replayed
+        self.assertEqual(Adder.run(a=1, b=1), {'sum': 2})
+        self.assertEqual(Adder.num_runs, 1)
+
+        self.assertEqual(Adder.run(a=1, b=2), {'sum': 3})
+        self.assertEqual(Adder.num_runs, 2)
+
+    def test_no_cache(self):
+        result_cache.set_global_cache(None)
+        Adder.run(a=1)
+        Adder.run(a=1)
+        self.assertEqual(Adder.num_runs, 2)
+
+    def test_key(self):
+        p = Adder.new({'a': 1})
+        self.assertEqual(
+            result_cache.get_global_cache().get(
+                make_key(fullname(Adder), {'a': 1, 'b': 1})),
+            None)
+        p.play()
+        self.assertIsNotNone(
+            result_cache.get_global_cache().get(
+                make_key(fullname(Adder), {'a': 1, 'b': 1})))
@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from plum.persistence.pickle_persistence import PicklePersistence
+from plum.process_monitor import MONITOR
+from plum.test_utils import DummyProcess, WaitForSignalProcess
+import plum.tracing as tracing
+from plum.tracing import Tracer
+from plum.wait_ons import wait_until
+from plum.process import ProcessState
+from util import TestCase
+
+
+class TestTracer(TestCase):
+    def setUp(self):
+        super(TestTracer, self).setUp()
+        self.tracer = Tracer()
+        tracing.set_tracer(self.tracer)
+
+    def tearDown(self):
+        tracing.set_tracer(None)
+        super(TestTracer, self).tearDown()
+
+    def test_span(self):
+        with tracing.span("test", "testing", value=5):
+            pass
+        tracing.instant("point", "testing")
+
+        events = self.tracer.get_events()
+        span = [e for e in events if e['name'] == 'test'][0]
+        self.assertEqual(span['ph'], 'X')
+        self.assertEqual(span['args'], {'value': 5})
+        self.assertGreaterEqual(span['dur'], 0)
+        self.assertEqual(span['tid'], threading.current_thread().ident)
+
+        instant = [e for e in events if e['name'] == 'point'][0]
+        self.assertEqual(instant['ph'], 'i')
+
+        # The thread should have been named
+        names = [e for e in events if e['ph'] == 'M']
+        self.assertEqual(len(names), 1)
+        self.assertEqual(names[0]['args']['name'],
+                         threading.current_thread().name)
+
+    def test_no_tracer(self):
+        tracing.set_tracer(None)
+        with tracing.span("test", "testing"):
+            pass
+        tracing.instant("point", "testing")
+        self.assertEqual(self.tracer.get_events(), [])
+
+    def test_process_transitions(self):
+        p = DummyProcess.new()
+        p.play()
+
+        transitions = [e for e in self.tracer.get_events()
+                       if e.get('cat') == 'transition']
+        self.assertEqual([e['name'] for e in transitions],
+                         ['_perform_start', '_perform_finish'])
+        for e in transitions:
+            self.assertEqual(e['args']['pid'], str(p.pid))
+
+    def test_waiting_process(self):
+        p = WaitForSignalProcess.new()
+        t = threading.Thread(target=p.play, name="player")
+        t.start()
+        self.assertTrue(wait_until(p, ProcessState.WAITING, timeout=2))
+        p.continue_()
+        self.safe_join(t)
+
+        events = self.tracer.get_events()
+        self.assertIn('_perform_wait', [e['name'] for e in events])
+        self.assertIn('reacquire state lock', [e['name'] for e in events])
+        self.assertIn('player', [e['args']['name'] for e in events
+                                 if e['ph'] == 'M'])
+
+    def test_checkpoint_save(self):
+        directory = tempfile.mkdtemp()
+        persistence = PicklePersistence(running_directory=directory)
+        try:
+            persistence.save(DummyProcess.new())
+        finally:
+            MONITOR.stop_listening(persistence)
+            shutil.rmtree(directory)
+
+        self.assertIn('save checkpoint',
+                      [e['name'] for e in self.tracer.get_events()])
+
+    def test_write(self):
+        DummyProcess.new().play()
+        fd, filename = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            self.tracer.write(filename)
+            with open(filename) as f:
+                trace = json.load(f)
+        finally:
+            os.remove(filename)
+
+        self.assertEqual(len(trace['traceEvents']),
+                         len(self.tracer.get_events()))
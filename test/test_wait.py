@@ -1,5 +1,118 @@
+import threading
+import time
 import unittest
+from plum.wait import TimerWheel
+from plum.wait_ons import WaitForSignal
 
 
 class MyTestCase(unittest.TestCase):
-    pass
\ No newline at end of file
+    pass
+
+
+class TestWaitOn(unittest.TestCase):
+    def test_done_callback(self):
+        w = WaitForSignal()
+        called = []
+        w.add_done_callback(called.append)
+        self.assertEqual(called, [])
+
+        w.continue_()
+        self.assertEqual(called, [w])
+
+        # Already done, should be called straight away
+        w.add_done_callback(called.append)
+        self.assertEqual(called, [w, w])
+
+    def test_done_callback_exception(self):
+        def raise_(wait_on):
+            raise RuntimeError("Cope with this")
+
+        w = WaitForSignal()
+        called = []
+        w.add_done_callback(raise_)
+        w.add_done_callback(called.append)
+        w.continue_()
+        self.assertTrue(w.is_done())
+        self.assertEqual(called, [w])
+
+
+class TestTimerWheel(unittest.TestCase):
+    def setUp(self):
+        # Small so that timers have to cascade down levels and overflow
+        self.wheel = TimerWheel(tick=0.002, wheel_size=4, num_levels=2)
+        self.lock = threading.Lock()
+        self.called = []
+        self.all_called = threading.Event()
+
+    def tearDown(self):
+        self.wheel.shutdown()
+
+    def _callback(self, name, when, expected):
+        with self.lock:
+            self.called.append((name, when, time.time()))
+            if len(self.called) == expected:
+                self.all_called.set()
+
+    def test_call_later(self):
+        # Covers the first level, the second level and the overflow heap
+        delays = [0.05, 0.008, 0.03, 0.016, 0.1, 0.0]
+        now = time.time()
+        for delay in delays:
+            self.wheel.call_at(
+                now + delay, self._callback, delay, now + delay, len(delays))
+        self.assertEqual(self.wheel.num_pending(), len(delays))
+
+        self.assertTrue(self.all_called.wait(2))
+        self.assertEqual([c[0] for c in self.called], sorted(delays))
+        for name, when, called_at in self.called:
+            self.assertGreaterEqual(called_at, when)
+        self.assertEqual(self.wheel.num_pending(), 0)
+
+    def test_cancel(self):
+        timer = self.wheel.call_later(0.01, self._callback, 'cancelled', 0, 1)
+        self.wheel.call_later(0.02, self._callback, 'called', 0, 1)
+        self.assertTrue(timer.cancel())
+        self.assertFalse(timer.cancel())
+        self.assertTrue(timer.cancelled())
+        self.assertEqual(self.wheel.num_pending(), 1)
+
+        self.assertTrue(self.all_called.wait(2))
+        time.sleep(0.02)
+        self.assertEqual([c[0] for c in self.called], ['called'])
+
+    def test_exception(self):
+        def raise_():
+            raise RuntimeError("Cope with this")
+
+        self.wheel.call_later(0, raise_)
+        self.wheel.call_later(0.005, self._callback, 'called', 0, 1)
+        self.assertTrue(self.all_called.wait(2))
+
+    def test_idle(self):
+        self.wheel.call_later(0, self._callback, 'first', 0, 1)
+        self.assertTrue(self.all_called.wait(2))
+        # The wheel should catch up after doing nothing for a while
+        time.sleep(0.05)
+        self.all_called.clear()
+        self.called = []
+        start = time.time()
+        self.wheel.call_later(0.01, self._callback, 'second', 0, 1)
+        self.assertTrue(self.all_called.wait(2))
+        self.assertLess(self.called[0][2] - start, 0.5)
+
+    def test_sleeps_until_due(self):
+        clock_calls = []
+
+        def clock():
+            clock_calls.append(None)
+            return time.time()
+
+        wheel = TimerWheel(tick=0.002, wheel_size=64, num_levels=2,
+                           clock=clock)
+        try:
+            wheel.call_later(0.1, self._callback, 'called', 0, 1)
+            self.assertTrue(self.all_called.wait(2))
+        finally:
+            wheel.shutdown()
+        # Waking up every tick would look at the clock at least 50 times
+        self.assertLess(len(clock_calls), 20)
@@ -1,7 +1,12 @@
 
+import threading
+import time
 from util import TestCase
+from plum.persistence.bundle import Bundle
 from plum.process import ProcessState
-from plum.wait_ons import WaitOnState
+from plum.wait import WaitOn, get_timer_wheel
+from plum.wait_ons import WaitOnState, WaitUntil, Sleep, WaitOnAll, \
+    WaitOnAny, WaitForSignal
 from plum.test_utils import WaitForSignalProcess, DummyProcess
 from plum.process_manager import ProcessManager
 
@@ -38,3 +43,127 @@ class TestWaitOnState(TestCase):
         w.interrupt()
         self.manager.start(p)
         self.assertFalse(w.wait(0.2))
+
+
+class TestWaitUntil(TestCase):
+    def test_sleep(self):
+        start = time.time()
+        w = Sleep(0.05)
+        self.assertFalse(w.is_done())
+        self.assertTrue(w.wait(2))
+        self.assertGreaterEqual(time.time(), start + 0.05)
+
+    def test_wait_until_passed(self):
+        self.assertTrue(WaitUntil(time.time() - 1).wait(2))
+
+    def test_save_load(self):
+        w = Sleep(0.1)
+        b = Bundle()
+        w.save_instance_state(b)
+        self.assertEqual(b[WaitUntil.END_TIME], w.end_time)
+
+        loaded = WaitOn.create_from(b)
+        self.assertIsInstance(loaded, Sleep)
+        self.assertEqual(loaded.end_time, w.end_time)
+        self.assertTrue(loaded.wait(2))
+        self.assertGreaterEqual(time.time(), w.end_time)
+
+    def test_interrupt(self):
+        wheel = get_timer_wheel()
+        num_pending = wheel.num_pending()
+        w = Sleep(0.1)
+        self.assertEqual(wheel.num_pending(), num_pending + 1)
+        w.interrupt()
+        self.assertEqual(wheel.num_pending(), num_pending)
+        # Waiting again puts it back on the wheel
+        self.assertTrue(w.wait(2))
+
+    def test_reload(self):
+        wheel = get_timer_wheel()
+        num_pending = wheel.num_pending()
+        w = Sleep(10)
+        b = Bundle()
+        w.save_instance_state(b)
+        # Loading the state again doesn't leave the old timeout behind
+        w.load_instance_state(b)
+        self.assertEqual(wheel.num_pending(), num_pending + 1)
+        w.interrupt()
+        self.assertEqual(wheel.num_pending(), num_pending)
+
+    def test_load_done(self):
+        w = WaitUntil(time.time())
+        self.assertTrue(w.wait(2))
+        b = Bundle()
+        w.save_instance_state(b)
+        self.assertTrue(WaitOn.create_from(b).is_done())
+
+    def test_timeout_once(self):
+        w = Sleep(10)
+        w.interrupt()
+        calls = []
+
+        def done(success=True, msg=None):
+            calls.append(success)
+            # Give the other timeouts a chance to get in before we are done
+            time.sleep(0.01)
+            Sleep.done(w, success, msg)
+
+        w.done = done
+        threads = [threading.Thread(target=w._timeout) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [True])
+        self.assertTrue(w.is_done())
+
+
+class TestCompoundWaitOns(TestCase):
+    def test_wait_on_all(self):
+        signals = [WaitForSignal() for _ in range(3)]
+        w = WaitOnAll(signals)
+        self.assertFalse(w.wait(0.01))
+        for signal in signals:
+            self.assertFalse(w.is_done())
+            signal.continue_()
+        # Should be done as soon as the last child is, no one has to wait
+        self.assertTrue(w.is_done())
+        self.assertTrue(w.wait(0))
+
+    def test_wait_on_any(self):
+        signals = [WaitForSignal() for _ in range(3)]
+        w = WaitOnAny(signals)
+        self.assertFalse(w.wait(0.01))
+        signals[1].continue_()
+        self.assertTrue(w.is_done())
+        self.assertTrue(w.wait(0))
+        # The rest finishing shouldn't matter
+        signals[0].continue_()
+        signals[2].continue_()
+        self.assertTrue(w.wait(0))
+
+    def test_already_done(self):
+        done = WaitForSignal()
+        done.continue_()
+        self.assertTrue(WaitOnAll([done, done]).is_done())
+        self.assertTrue(WaitOnAny([done, WaitForSignal()]).is_done())
+        self.assertTrue(WaitOnAll([]).is_done())
+
+    def test_wait_from_other_thread(self):
+        signals = [WaitForSignal() for _ in range(2)]
+        w = WaitOnAll(signals)
+        Sleep(0.02).add_done_callback(lambda _: signals[0].continue_())
+        Sleep(0.04).add_done_callback(lambda _: signals[1].continue_())
+        self.assertTrue(w.wait(2))
+
+    def test_save_load(self):
+        signal = WaitForSignal()
+        signal.continue_()
+        w = WaitOnAll([signal, WaitUntil(time.time() + 0.05)])
+        self.assertFalse(w.is_done())
+
+        b = Bundle()
+        w.save_instance_state(b)
+        loaded = WaitOn.create_from(b)
+        self.assertIsInstance(loaded, WaitOnAll)
+        self.assertTrue(loaded.wait(2))
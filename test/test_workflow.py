@@ -0,0 +1,139 @@
+import warnings
+from util import TestCase
+from plum.process import Process
+import plum.tracing as tracing
+from plum.tracing import Tracer
+from plum.workflow import Workflow, WorkflowListener
+
+
+class Add(Process):
+    @classmethod
+    def define(cls, spec):
+        super(Add, cls).define(spec)
+        spec.input('a')
+        spec.input('b')
+        spec.output('value')
+
+    def _run(self, a, b):
+        self.out('value', a + b)
+
+
+class Fail(Process):
+    @classmethod
+    def define(cls, spec):
+        super(Fail, cls).define(spec)
+        spec.input('a')
+        spec.input('b')
+        spec.output('value')
+
+    def _run(self, a, b):
+        raise ValueError("Can't add {} and {}".format(a, b))
+
+
+class Diamond(Workflow):
+    @classmethod
+    def define(cls, spec):
+        super(Diamond, cls).define(spec)
+        spec.process(Add, 'left')
+        spec.process(Add, 'right')
+        spec.process(Add, 'bottom')
+        spec.exposed_inputs('left')
+        spec.link('left:value', 'right:a')
+        spec.link(':b', 'right:b')
+        spec.link('left:value', 'bottom:a')
+        spec.link('right:value', 'bottom:b')
+        spec.exposed_outputs('bottom')
+
+
+class TestWorkflow(TestCase):
+    def test_diamond(self):
+        # left = 1 + 2, right = left + 2, bottom = left + right
+        self.assertEqual(Diamond.run(a=1, b=2), {'value': 8})
+
+    def test_events(self):
+        events = []
+
+        class Listener(WorkflowListener):
+            def on_subprocess_finished(self, workflow, subproc):
+                events.append(workflow.get_local_name(subproc))
+
+            def on_value_buffered(self, workflow, link, value):
+                events.append(str(link))
+
+        wf = Diamond.new({'a': 1, 'b': 2})
+        wf.add_workflow_listener(Listener())
+        wf.play()
+        self.assertEqual(
+            events, ['left:value => bottom:a', 'left', 'right', 'bottom'])
+
+    def test_tracing(self):
+        tracer = Tracer()
+        tracing.set_tracer(tracer)
+        try:
+            Diamond.run(a=1, b=2)
+        finally:
+            tracing.set_tracer(None)
+
+        events = [e for e in tracer.get_events()
+                  if e.get('cat') == 'workflow']
+        launches = [e['args']['subprocess'] for e in events
+                    if e['name'] == 'launch subprocess']
+        self.assertItemsEqual(launches, ['left', 'right', 'bottom'])
+        # Everything is recorded as a span with a duration
+        for e in events:
+            self.assertEqual(e['ph'], 'X')
+            self.assertGreaterEqual(e['dur'], 0)
+
+    def test_duplicate_link(self):
+        spec = Diamond.spec()
+        with self.assertRaises(ValueError):
+            spec.link('left:value', 'right:a')
+
+    def test_fan_out(self):
+        links = Diamond.spec().get_links('left:value')
+        self.assertItemsEqual(
+            [link.sink for link in links], ['right:a', 'bottom:a'])
+
+    def test_subprocess_fails(self):
+        class FailingDiamond(Diamond):
+            @classmethod
+            def define(cls, spec):
+                super(FailingDiamond, cls).define(spec)
+                spec.process(Fail, 'right')
+
+        finished = []
+
+        class Listener(WorkflowListener):
+            def on_subprocess_finished(self, workflow, subproc):
+                finished.append(workflow.get_local_name(subproc))
+
+        wf = FailingDiamond.new({'a': 1, 'b': 2})
+        wf.add_workflow_listener(Listener())
+        wf.play()
+        self.assertTrue(wf.has_failed())
+        self.assertIsInstance(wf.get_exception(), ValueError)
+        # Nothing after the failed subprocess is run
+        self.assertEqual(finished, ['left'])
+
+    def test_deprecated_link_api(self):
+        class Chain(Workflow):
+            @classmethod
+            def define(cls, spec):
+                super(Chain, cls).define(spec)
+                spec.process(Add, 'first')
+                spec.process(Add, 'second')
+                spec.exposed_inputs('first')
+                spec.link('first:value', 'second:a')
+                spec.link(':b', 'second:b')
+
+        spec = Chain.spec()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertEqual(
+                spec.get_link('first:value').sink, 'second:a')
+            spec.remove_link('first:value')
+        self.assertEqual(len(caught), 2)
+        self.assertTrue(
+            all(issubclass(w.category, DeprecationWarning) for w in caught))
+        self.assertEqual(spec.get_links('first:value'), [])
+        self.assertEqual(spec.get_incoming_links('second:a'), [])